@@ -1,7 +1,15 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'astrocalendar_backend.settings')
 app = Celery('astrocalendar_backend')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def reset_ephemeris_after_fork(**kwargs):
+    # Each prefork child opens its own kernel handles instead of sharing the parent's.
+    from astronomical_events.services.ephemeris import reset_ephemeris_registry
+    reset_ephemeris_registry()
@@ -33,6 +33,22 @@ ASTRONOMY_API_SECRET= config('ASTRONOMY_API_SECRET')
 #API URLS
 SUNRISE_SUNSET_URL = config('SunRise_SunSet_URL')
 
+# Skyfield ephemeris
+SKYFIELD_DATA_DIR = config('SKYFIELD_DATA_DIR', default=str(BASE_DIR))
+SKYFIELD_EPHEMERIS = config('SKYFIELD_EPHEMERIS', default='de421.bsp')
+
+# Moon phases: 'skyfield' computes locally, 'farmsense' calls the remote API
+MOON_PHASE_PROVIDER = config('MOON_PHASE_PROVIDER', default='skyfield')
+MOON_PHASE_FARMSENSE_FALLBACK = config('MOON_PHASE_FARMSENSE_FALLBACK', default=True, cast=bool)
+
+# Shared HTTP client (astronomical_events.services.http_client)
+HTTP_CACHE_DIR = config('HTTP_CACHE_DIR', default=str(BASE_DIR / 'http_cache'))
+HTTP_CACHE_ENABLED = config('HTTP_CACHE_ENABLED', default=True, cast=bool)
+HTTP_MAX_RETRIES = config('HTTP_MAX_RETRIES', default=3, cast=int)
+HTTP_RETRY_BACKOFF = config('HTTP_RETRY_BACKOFF', default=1.0, cast=float)
+HTTP_POOL_SIZE = config('HTTP_POOL_SIZE', default=10, cast=int)
+HTTP_ASYNC_HOST_CONCURRENCY = config('HTTP_ASYNC_HOST_CONCURRENCY', default=4, cast=int)
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
@@ -157,6 +173,43 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+# Per-location refresh fan-out (astronomical_events.tasks.fan_out). Its subtasks go to their own queue,
+# served by a worker started with that pool size and one message prefetched per process:
+#   celery -A astrocalendar_backend worker -Q refresh --concurrency $REFRESH_CONCURRENCY --prefetch-multiplier 1
+REFRESH_QUEUE = config('REFRESH_QUEUE', default='refresh')
+REFRESH_CONCURRENCY = config('REFRESH_CONCURRENCY', default=8, cast=int)
+CELERY_TASK_ROUTES = {'astronomical_events.tasks.refresh_location_*': {'queue': REFRESH_QUEUE}}
+REFRESH_MAX_RETRIES = config('REFRESH_MAX_RETRIES', default=3, cast=int)
+REFRESH_RETRY_BACKOFF = config('REFRESH_RETRY_BACKOFF', default=5, cast=int)
+REFRESH_RETRY_BACKOFF_MAX = config('REFRESH_RETRY_BACKOFF_MAX', default=300, cast=int)
+# Days ahead of today that update_daily_astronomical_data keeps materialised
+REFRESH_HORIZON_DAYS = config('REFRESH_HORIZON_DAYS', default=60, cast=int)
+# Time grid spacing for the VisibilityDetail engine (astronomical_events.services.visibility)
+VISIBILITY_STEP_MINUTES = config('VISIBILITY_STEP_MINUTES', default=5, cast=int)
+# In-memory nearest-location index (astronomical_events.services.locations)
+LOCATION_INDEX_TTL = config('LOCATION_INDEX_TTL', default=300, cast=int)
+# set-location reuses a known location this close instead of inserting a new one
+LOCATION_MATCH_KM = config('LOCATION_MATCH_KM', default=5.0, cast=float)
+# Seconds a /moonphases/calendar/ year stays in the shared cache (writes to MoonPhase or Location invalidate it sooner)
+MOON_CALENDAR_CACHE_TTL = config('MOON_CALENDAR_CACHE_TTL', default=24 * 3600, cast=int)
+# Items per /timeline/ page (default and the most a client may ask for)
+TIMELINE_PAGE_SIZE = config('TIMELINE_PAGE_SIZE', default=500, cast=int)
+TIMELINE_MAX_PAGE_SIZE = config('TIMELINE_MAX_PAGE_SIZE', default=1000, cast=int)
+
+# Cache shared by web workers, fetch commands and Celery workers (astronomical_events.services.response_cache):
+# the Celery Redis on its own db index. Set CACHE_URL empty to turn response caching off (DummyCache);
+# a per-process cache would never see the version bumps made by the writers in other processes.
+CACHE_URL = config('CACHE_URL', default='redis://localhost:6379/1')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL,
+    } if CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+# Seconds a cached list response is kept; writes invalidate it sooner through namespace versions
+RESPONSE_CACHE_TTL = config('RESPONSE_CACHE_TTL', default=6 * 3600, cast=int)
 CELERY_BEAT_SCHEDULE = {
     'update_astronomical_data': {
         'task': 'astronomical_events.tasks.update_daily_astronomical_data',
@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class AstronomicalEventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'astronomical_events'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .models import (
+            ApiSource, CelestialEvent, EarthOrbitEvent, Eclipse, EventImage, Location, MoonPhase, PlanetaryEvent, SunData,
+        )
+        from .services.api_sources import invalidate_api_sources
+        from .services.locations import invalidate_location_index
+        from .services.response_cache import invalidate_responses
+
+        post_save.connect(invalidate_location_index, sender=Location, dispatch_uid='location_index_save')
+        post_delete.connect(invalidate_location_index, sender=Location, dispatch_uid='location_index_delete')
+        post_save.connect(invalidate_api_sources, sender=ApiSource, dispatch_uid='api_sources_save')
+        post_delete.connect(invalidate_api_sources, sender=ApiSource, dispatch_uid='api_sources_delete')
+        # Every model a cached endpoint reads (see CachedListMixin in views)
+        for model in (CelestialEvent, MoonPhase, Eclipse, PlanetaryEvent, EarthOrbitEvent, SunData, EventImage, Location):
+            label = model._meta.model_name
+            post_save.connect(invalidate_responses, sender=model, dispatch_uid=f'response_cache_{label}_save')
+            post_delete.connect(invalidate_responses, sender=model, dispatch_uid=f'response_cache_{label}_delete')
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from astronomical_events.models import CelestialEvent, Location
+from astronomical_events.services.visibility import refresh_visibility
+
+class Command(BaseCommand):
+    help = 'Computes VisibilityDetail for every event in a date range at every location'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', type=str, help='First date YYYY-MM-DD (default: today)')
+        parser.add_argument('--days', type=int, default=365, help='Number of days of events (default: 365)')
+        parser.add_argument('--event-types', type=str, nargs='+', help='Only these event types (default: all)')
+        parser.add_argument('--location', type=str, help='Only this location name (default: all locations)')
+        parser.add_argument('--step-minutes', type=int, help='Time grid spacing (default: VISIBILITY_STEP_MINUTES)')
+
+    def handle(self, *args, **options):
+        start = datetime.now(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        if options['start_date']:
+            try:
+                start = datetime.strptime(options['start_date'], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+            except ValueError as e:
+                raise CommandError(f'Invalid date format: {e}')
+
+        events = CelestialEvent.objects.filter(
+            date_time__gte=start, date_time__lt=start + timedelta(days=options['days'])
+        ).order_by('date_time')
+        if options['event_types']:
+            events = events.filter(event_type__in=options['event_types'])
+
+        locations = Location.objects.all()
+        if options['location']:
+            locations = locations.filter(name=options['location'])
+            if not locations.exists():
+                raise CommandError(f"Location '{options['location']}' not found.")
+
+        result = refresh_visibility(events, locations, options['step_minutes'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Visibility for {result['events']} events at {result['locations']} locations: "
+            f"{result['inserted']} created, {result['updated']} updated in {result['seconds']:.2f}s"
+        ))
@@ -4,11 +4,58 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from astronomy import Time, Body, Constellation, ConstellationInfo, GeoVector, EquatorFromVector
+import time
 import traceback
+import django
 
 from ...models import CelestialEvent, PlanetaryEvent, ApiSource, Location
+from ...services.api_sources import get_api_source
+from ...services.constellations import PLANETS, find_constellation_transitions, transition_record
+from ...services.ephemeris import reset_ephemeris_registry
+from ...services.ingestion import ingest_events
+
+# Map body names to objects
+BODY_MAP = {
+    'Sun': Body.Sun, 'Moon': Body.Moon, 'Mercury': Body.Mercury, 'Venus': Body.Venus,
+    'Mars': Body.Mars, 'Jupiter': Body.Jupiter, 'Saturn': Body.Saturn,
+    'Uranus': Body.Uranus, 'Neptune': Body.Neptune
+}
+
+
+def _vectorised_records(transitions: List[dict], body_name: str) -> List[dict]:
+    return [
+        transition_record(
+            body_name, transition['ut'], transition['old'], transition['new'],
+            {'right_ascension': transition['right_ascension'],
+             'declination': transition['declination']},
+        )
+        for transition in transitions
+    ]
+
+
+def _init_worker():
+    django.setup()
+    reset_ephemeris_registry()
+
+
+def _track_body(engine: str, body_name: str, start_ut: float, days: int,
+                increment: float, verbose: bool) -> Tuple[List[dict], float]:
+    """
+    Compute one body's transition records in a worker process, and the seconds
+    that took there (not counting time queued in the pool); nothing is written here.
+    """
+    started = time.perf_counter()
+    if engine == 'vectorised':
+        transitions = find_constellation_transitions([body_name], start_ut, days, increment)
+        return _vectorised_records(transitions[body_name], body_name), time.perf_counter() - started
+    start_time = Time(start_ut)
+    records = Command().track_body_safely(
+        BODY_MAP[body_name], start_time, start_time.AddDays(days), increment, verbose
+    )
+    return records, time.perf_counter() - started
 
 
 class Command(BaseCommand):
@@ -22,6 +69,10 @@ class Command(BaseCommand):
                           help='Celestial bodies to track')
         parser.add_argument('--start-date', type=str, help='Start date in YYYY-MM-DD format')
         parser.add_argument('--increment', type=float, default=0.1, help='Day increment for tracking')
+        parser.add_argument('--engine', choices=['vectorised', 'stepwise'], default='vectorised',
+                          help='vectorised: batched Skyfield search over all bodies; stepwise: per-step astronomy-engine scan')
+        parser.add_argument('--workers', type=int, default=1,
+                          help='Worker processes; each computes one body while this process writes the results')
         parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
         parser.add_argument('--skip-errors', action='store_true', help='Skip bodies with errors')
 
@@ -42,14 +93,13 @@ class Command(BaseCommand):
         increment = options['increment']
         verbose = options['verbose']
         skip_errors = options['skip_errors']
+        engine = options['engine']
+        workers = max(1, options['workers'])
 
         self.stdout.write(self.style.SUCCESS('Starting constellation tracking...'))
 
         # Setup API source
-        api_source, _ = ApiSource.objects.get_or_create(
-            name="Astronomy Library",
-            defaults={'base_url': 'https://github.com/cosinekitty/astronomy'}
-        )
+        api_source = get_api_source("Astronomy Library")
 
         # Setup location
         location = None
@@ -70,47 +120,88 @@ class Command(BaseCommand):
         else:
             start_time = Time.Now()
 
-        stop_time = start_time.AddDays(days)
-
-        # Map body names to objects
-        body_map = {
-            'Sun': Body.Sun, 'Moon': Body.Moon, 'Mercury': Body.Mercury, 'Venus': Body.Venus,
-            'Mars': Body.Mars, 'Jupiter': Body.Jupiter, 'Saturn': Body.Saturn,
-            'Uranus': Body.Uranus, 'Neptune': Body.Neptune
-        }
-
-        # Process each body
-        total_events = 0
         for body_name in body_names:
-            if body_name not in body_map:
+            if body_name not in BODY_MAP:
                 self.stdout.write(self.style.WARNING(f'Unknown body: {body_name}. Skipping.'))
-                continue
-
-            body = body_map[body_name]
-            self.stdout.write(f'Tracking {body_name}...')
+        body_names = [body_name for body_name in body_names if body_name in BODY_MAP]
 
+        # Bodies are computed independently (in parallel with --workers); this process is the only writer
+        total_events = 0
+        tracked = 0
+        for body_name, events, elapsed, error in self.iter_body_records(
+            engine, body_names, start_time, days, increment, verbose, workers
+        ):
+            tracked += 1
+            progress = f'[{tracked}/{len(body_names)}]'
             try:
-                events = self.track_body_safely(
-                    body, start_time, stop_time, increment, api_source, location, verbose
+                if error is not None:
+                    raise error
+                result = ingest_events(
+                    PlanetaryEvent if body_name in PLANETS else CelestialEvent,
+                    ({**event, 'api_source': api_source, 'location': location} for event in events),
+                    update_existing=False,
+                )
+                total_events += result['inserted']
+                self.stdout.write(
+                    f'{progress} {body_name}: {len(events)} transitions in {elapsed:.2f}s, '
+                    f'created {result["inserted"]} events'
                 )
-                total_events += len(events)
-                self.stdout.write(f'  Created {len(events)} events for {body_name}')
             
             except Exception as e:
-                error_msg = f'Error tracking {body_name}: {str(e)}'
+                error_msg = f'{progress} Error tracking {body_name}: {str(e)}'
                 if skip_errors:
                     self.stdout.write(self.style.WARNING(error_msg + ' (skipping)'))
                     if verbose:
-                        self.stdout.write(traceback.format_exc())
+                        self.stdout.write(''.join(traceback.format_exception(e)))
                     continue
                 else:
                     self.stdout.write(self.style.ERROR(error_msg))
                     if verbose:
-                        self.stdout.write(traceback.format_exc())
+                        self.stdout.write(''.join(traceback.format_exception(e)))
                     raise CommandError(error_msg)
 
         self.stdout.write(self.style.SUCCESS(f'Successfully created {total_events} events'))
 
+    def iter_body_records(self, engine: str, body_names: List[str], start_time: Time, days: int,
+                          increment: float, verbose: bool,
+                          workers: int) -> Iterator[Tuple[str, List[dict], float, Optional[Exception]]]:
+        """Yield (body, records, seconds, error) per body, in completion order"""
+        if workers > 1 and len(body_names) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(body_names)), initializer=_init_worker) as pool:
+                futures = {
+                    pool.submit(_track_body, engine, body_name, start_time.ut, days, increment, verbose): body_name
+                    for body_name in body_names
+                }
+                for future in as_completed(futures):
+                    try:
+                        records, elapsed = future.result()
+                        yield futures[future], records, elapsed, None
+                    except Exception as e:
+                        yield futures[future], [], 0.0, e
+            return
+
+        transitions = {}
+        if engine == 'vectorised':
+            # One shared time grid and Earth position for all bodies
+            started = time.perf_counter()
+            transitions = find_constellation_transitions(body_names, start_time.ut, days, increment)
+            if verbose:
+                self.stdout.write(f'Computed transitions for {len(body_names)} bodies in {time.perf_counter() - started:.2f}s')
+
+        for body_name in body_names:
+            self.stdout.write(f'Tracking {body_name}...')
+            started = time.perf_counter()
+            try:
+                if engine == 'vectorised':
+                    events = _vectorised_records(transitions[body_name], body_name)
+                else:
+                    events = self.track_body_safely(
+                        BODY_MAP[body_name], start_time, start_time.AddDays(days), increment, verbose
+                    )
+                yield body_name, events, time.perf_counter() - started, None
+            except Exception as e:
+                yield body_name, [], time.perf_counter() - started, e
+
     def safe_constellation(self, body: Body, time: Time) -> Optional[ConstellationInfo]:
         """Safely get constellation, returning None if there's an error"""
         try:
@@ -125,8 +216,7 @@ class Command(BaseCommand):
             return None
 
     def track_body_safely(self, body: Body, start_time: Time, stop_time: Time, 
-                         increment: float, api_source: ApiSource, 
-                         location: Optional[Location], verbose: bool) -> List[CelestialEvent]:
+                         increment: float, verbose: bool) -> List[dict]:
         """Track constellation changes with error handling"""
         
         events = []
@@ -164,13 +254,11 @@ class Command(BaseCommand):
                     tx, cx = self.find_transition_safely(body, c1, t1, t2)
                     
                     if tx is not None and cx is not None:
-                        event = self.create_event_safely(
-                            body, tx, c1, cx, api_source, location, verbose
-                        )
+                        event = self.build_event_record(body, tx, c1, cx, verbose)
                         if event:
                             events.append(event)
                             if verbose:
-                                self.stdout.write(f'  Created: {event.name}')
+                                self.stdout.write(f'  Found: {event["name"]}')
                         c1 = cx
                         t1 = tx
                     else:
@@ -226,27 +314,12 @@ class Command(BaseCommand):
         except Exception:
             return None, None
 
-    def create_event_safely(self, body: Body, time: Time, old_const: ConstellationInfo, 
-                           new_const: ConstellationInfo, api_source: ApiSource, 
-                           location: Optional[Location], verbose: bool) -> Optional[CelestialEvent]:
-        """Safely create a CelestialEvent"""
+    def build_event_record(self, body: Body, time: Time, old_const: ConstellationInfo,
+                           new_const: ConstellationInfo, verbose: bool) -> Optional[dict]:
+        """Safely build the field values for a transition event"""
         try:
-            # Convert time to datetime
-            timestamp = time.ut * 86400.0 + 946684800.0
-            dt = datetime.fromtimestamp(timestamp)
-            dt = timezone.make_aware(dt)
-            
-            # Create external ID
-            external_id = f"constellation_{body.name}_{time.ut:.6f}"
-            
-            # Check if already exists
-            if CelestialEvent.objects.filter(external_id=external_id).exists():
-                if verbose:
-                    self.stdout.write(f'  Event {external_id} already exists')
-                return None
-            
             # Get coordinates
-            coordinates = {'constellation_symbol': new_const.symbol}
+            coordinates = {}
             try:
                 vec = GeoVector(body, time, False)
                 equ = EquatorFromVector(vec)
@@ -257,44 +330,14 @@ class Command(BaseCommand):
             except Exception:
                 pass  # Use basic coordinates
             
-            # Create event
-            event = CelestialEvent.objects.create(
-                name=f"{body.name} enters {new_const.name}",
-                event_type='planetary_event' if body.name in ['Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn', 'Uranus', 'Neptune'] else 'conjunction',
-                date_time=dt,
-                description=f"{body.name} leaves {old_const.name} and enters {new_const.name}",
-                external_id=external_id,
-                raw_api_data={
-                    'body': body.name,
-                    'transition_time_ut': time.ut,
-                    'old_constellation': {'symbol': old_const.symbol, 'name': old_const.name},
-                    'new_constellation': {'symbol': new_const.symbol, 'name': new_const.name}
-                },
-                api_source=api_source,
-                location=location,
-                coordinates=coordinates,
-                importance_level=2,
-                viewing_difficulty='easy'
+            return transition_record(
+                body.name, time.ut,
+                (old_const.symbol, old_const.name),
+                (new_const.symbol, new_const.name),
+                coordinates,
             )
             
-            # Create PlanetaryEvent if needed
-            if body.name in ['Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn', 'Uranus', 'Neptune']:
-                try:
-                    PlanetaryEvent.objects.create(
-                        celestialevent_ptr=event,
-                        planet_name=body.name,
-                        constellation=new_const.name,
-                        apparent_magnitude=0.0,
-                        right_ascension=coordinates.get('right_ascension', 0.0),
-                        declination=coordinates.get('declination', 0.0)
-                    )
-                except Exception as e:
-                    if verbose:
-                        self.stdout.write(f'  Warning: Could not create PlanetaryEvent: {e}')
-            
-            return event
-            
         except Exception as e:
             if verbose:
-                self.stdout.write(f'  Error creating event: {e}')
-            return None
\ No newline at end of file
+                self.stdout.write(f'  Error building event: {e}')
+            return None
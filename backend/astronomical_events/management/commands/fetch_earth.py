@@ -1,24 +1,44 @@
+from datetime import date, datetime
 from django.core.management.base import BaseCommand
 from astronomical_events.models import EarthOrbitEvent
 from astronomical_events.services.fetch_earth_events import get_annotated_earth_positions
+from astronomical_events.services.ingestion import ingest_events
 
 class Command(BaseCommand):
     help = 'Fetches Earth orbit data from API and saves it to the database'
 
-    events = get_annotated_earth_positions(2025)
-    for e in events:
-        EarthOrbitEvent.objects.create(
-            phenom=e['phenom'],
-            date=f"{e['year']}-{e['month']:02d}-{e['day']:02d}",
-            time=e['time'],
-            season=e['season'],
-            distance_million_km=e['distance_million_km'],
-            orbital_speed_km_s=e['orbital_speed_km_s'],
-            solar_irradiance_w_m2=e['solar_irradiance_w_m2'],
-            eccentricity=e['eccentricity'],
-            heliocentric_longitude=e['heliocentric_longitude'],
-            true_anomaly=e['true_anomaly'],
-            solar_declination=e['solar_declination'],
-            day_length_hours=e['day_length_equator'],
-            overview=e['overview']
-        )
\ No newline at end of file
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            default=datetime.now().year,
+            help='Year to fetch (default: current year)'
+        )
+
+    def handle(self, *args, **options):
+        year = options['year']
+        events = get_annotated_earth_positions(year)
+        rows = (
+            {
+                'phenom': e['phenom'],
+                'date': date(e['year'], e['month'], e['day']),
+                'time': e['time'],
+                'season': e['season'],
+                'distance_million_km': e['distance_million_km'],
+                'orbital_speed_km_s': e['orbital_speed_km_s'],
+                'solar_irradiance_w_m2': e['solar_irradiance_w_m2'],
+                'eccentricity': e['eccentricity'],
+                'heliocentric_longitude': e['heliocentric_longitude'],
+                'true_anomaly': e['true_anomaly'],
+                'solar_declination': e['solar_declination'],
+                'day_length_hours': e['day_length_equator'],
+                'overview': e['overview'],
+            }
+            for e in events
+        )
+        result = ingest_events(EarthOrbitEvent, rows, key_fields=('phenom', 'date'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Earth orbit events for {year}: {result['inserted']} created, {result['updated']} updated "
+            f"in {result['seconds']:.3f}s"
+        ))
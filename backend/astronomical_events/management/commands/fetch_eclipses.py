@@ -1,15 +1,37 @@
-import requests
 from requests.auth import HTTPBasicAuth
+from concurrent.futures import ProcessPoolExecutor
 from django.core.management.base import BaseCommand
-from datetime import datetime
-from ...models import ApiSource, Eclipse, Location
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import transaction
+from ...models import ApiSource, CelestialEvent, Eclipse, Location, VisibilityDetail
+from ...services.api_sources import get_api_source
+from ...services.async_fetch import iter_fetch
+from ...services.eclipses import (
+    eclipse_record, find_global_solar_eclipses, find_local_solar_eclipses, find_lunar_eclipses,
+    lunar_contact_altitudes, visibility_record,
+)
+from ...services.ephemeris import reset_ephemeris_registry
+from ...services.ingestion import ingest_events
 from django.utils.timezone import make_aware
 from django.conf import settings
 import uuid
 import logging
+import django
 
 logger = logging.getLogger(__name__)
 
+
+def _init_worker():
+    django.setup()
+    reset_ephemeris_registry()
+
+
+def _site_eclipses(lunar, start, end, latitude, longitude, elevation):
+    """Every lunar eclipse and the locally seen solar eclipses for one site, each with its contact altitudes"""
+    altitudes = lunar_contact_altitudes(lunar, latitude, longitude, elevation)
+    solar = find_local_solar_eclipses(latitude, longitude, elevation, start, end)
+    return list(zip(lunar, altitudes)) + [(eclipse, eclipse['altitudes']) for eclipse in solar]
+
 class Command(BaseCommand):
     help = "Fetch eclipse events and store them in the database"
 
@@ -19,264 +41,489 @@ class Command(BaseCommand):
         parser.add_argument('--elevation', type=int, default=10)
         parser.add_argument('--from_date', type=str, default='2025-01-01')
         parser.add_argument('--to_date', type=str, default='2025-12-31')
+        parser.add_argument('--all-locations', action='store_true',
+                            help='Fetch for every Location concurrently; one shared eclipse plus per-location visibility')
+        parser.add_argument('--chunk-days', type=int, default=366,
+                            help='Split the date range into requests of this many days, fetched concurrently')
+        parser.add_argument('--provider', choices=['astronomyapi', 'local'], default='astronomyapi',
+                            help='astronomyapi: remote lunar eclipses; local: lunar and solar eclipses computed offline')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes for --provider local --all-locations; each computes one location')
         parser.add_argument('--debug', action='store_true', help='Enable debug output')
 
-    def handle(self, *args, **options):
-        # Use environment variables or settings for credentials
-        APP_ID = getattr(settings, 'ASTRONOMY_API_ID', None)
-        APP_SECRET = getattr(settings, 'ASTRONOMY_API_SECRET', None)
-        
-        if not APP_ID or not APP_SECRET:
-            self.stderr.write("Missing API credentials. Set ASTRONOMY_API_ID and ASTRONOMY_API_SECRET in settings.")
-            return
-        
-        body = "moon"
-        url = f"https://api.astronomyapi.com/api/v2/bodies/events/{body}"
-        auth = HTTPBasicAuth(APP_ID, APP_SECRET)
-        params = {
-            "latitude": str(options["latitude"]),
-            "longitude": str(options["longitude"]),
-            "elevation": str(options["elevation"]),
-            "from_date": options["from_date"],
-            "to_date": options["to_date"],
-            "time": "12:00:00",
-            "output": "rows"
-        }
+    def date_chunks(self, from_date, to_date, chunk_days):
+        start = datetime.strptime(from_date, '%Y-%m-%d').date()
+        end = datetime.strptime(to_date, '%Y-%m-%d').date()
+        while start <= end:
+            chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+            yield start.isoformat(), chunk_end.isoformat()
+            start = chunk_end + timedelta(days=1)
+
+    def iter_events(self, jobs, debug):
+        """Parse responses as they complete and yield (job, body_name, event) for every event"""
+        for job, res, error in iter_fetch(jobs):
+            period = f"{job['params']['from_date']}..{job['params']['to_date']}"
+            if job.get('location'):
+                period = f"{job['location'].name} {period}"
+            if error:
+                self.stderr.write(f"Network error for {period}: {error}")
+                continue
 
-        try:
-            self.stdout.write(f"Making API request to: {url}")
-            res = requests.get(url, params=params, auth=auth, timeout=30)
-            
             if res.status_code != 200:
-                self.stderr.write(f"API request failed: {res.status_code}")
+                self.stderr.write(f"API request failed for {period}: {res.status_code}")
                 self.stderr.write(f"Response: {res.text}")
-                return
+                continue
 
             response_data = res.json()
-            
-            if options['debug']:
+
+            if debug:
                 self.stdout.write(f"Full API response: {response_data}")
 
             if 'data' not in response_data:
                 self.stderr.write("API response missing 'data' field")
                 self.stderr.write(f"Response keys: {list(response_data.keys())}")
-                return
+                continue
 
             rows = response_data.get('data', {}).get('rows', [])
-            self.stdout.write(f"Found {len(rows)} rows of data")
-
-            if not rows:
-                self.stdout.write("No eclipse data found for the specified parameters")
-                return
-
-            api_source, _ = ApiSource.objects.get_or_create(
-                name="AstronomyAPI", 
-                defaults={"base_url": "https://api.astronomyapi.com"}
-            )
-
-            created_count = 0
-            updated_count = 0
+            self.stdout.write(f"Found {len(rows)} rows of data for {period}")
 
             for i, row in enumerate(rows):
-                if options['debug']:
+                if debug:
                     self.stdout.write(f"Processing row {i+1}: {row}")
 
                 body_name = row.get('body', {}).get('name', 'moon')
                 events = row.get('events', [])
-                
+
                 if not events:
                     self.stdout.write(f"No events found in row {i+1}")
                     continue
 
                 for event in events:
-                    try:
-                        event_type = event.get('type', 'unknown')
-                        obscuration = event.get('extraInfo', {}).get('obscuration', 0.0)
-                        highlights = event.get('eventHighlights', {})
-                        peak = highlights.get('peak', {}).get('date')
-                        peak_altitude = highlights.get('peak', {}).get('altitude')
-
-                        partial_begin_altitude = highlights.get('partialStart', {}).get('altitude')
-                        total_begin_altitude = highlights.get('fullStart', {}).get('altitude')
-                        total_end_altitude = highlights.get('fullEnd', {}).get('altitude')
-                        partial_end_altitude = highlights.get('partialEnd', {}).get('altitude')
-
-                        duration_seconds = None
-                        penumbral_start = highlights.get('penumbralStart', {}).get('date')
-                        penumbral_end = highlights.get('penumbralEnd', {}).get('date')
-                        
-                        if penumbral_start and penumbral_end:
-                            try:
-                                start_time = datetime.fromisoformat(penumbral_start)
-                                end_time = datetime.fromisoformat(penumbral_end)
-                                duration_seconds = int((end_time - start_time).total_seconds())
-                            except (ValueError, TypeError):
-                                pass
-
-                        if peak:
-                            external_id = f"{event_type}_{peak.split('T')[0]}_{options['latitude']}_{options['longitude']}"
-                        else:
-                            self.stdout.write(f"Skipping event without peak date: {event}")
-                            continue
-
-                        if not peak:
-                            self.stdout.write(f"Skipping event without peak date: {event}")
-                            continue
-
-                        try:
-                            peak_time = datetime.fromisoformat(peak)
-                            if peak_time.tzinfo is None:
-                                peak_time = make_aware(peak_time)
-                        except (ValueError, TypeError) as e:
-                            self.stderr.write(f"Date parsing error for {peak}: {e}")
-                            continue
-
-                        eclipse_type_map = {
-                            "penumbral_lunar_eclipse": "lunar_penumbral",
-                            "partial_lunar_eclipse": "lunar_partial", 
-                            "total_lunar_eclipse": "lunar_total"
-                        }
-                        eclipse_type = eclipse_type_map.get(event_type.lower(), "lunar_partial")
-
-                        eclipse_type_display = event_type.replace('_', ' ').title()
-                        eclipse_name = f"{body_name} {eclipse_type_display}"
-
-                        totality_duration_seconds = None
-                        if eclipse_type == "lunar_total":
-                            full_start = highlights.get('fullStart', {}).get('date')
-                            full_end = highlights.get('fullEnd', {}).get('date')
-                            
-                            if full_start and full_end:
-                                try:
-                                    start_time = datetime.fromisoformat(full_start)
-                                    end_time = datetime.fromisoformat(full_end)
-                                    totality_duration_seconds = int((end_time - start_time).total_seconds())
-                                    
-                                    if options['debug']:
-                                        self.stdout.write(f"Totality duration: {full_start} to {full_end} = {totality_duration_seconds} seconds")
-                                except (ValueError, TypeError) as e:
-                                    if options['debug']:
-                                        self.stdout.write(f"Totality duration calculation failed: {e}")
-                                    pass
-
-                        description_parts = [f"{eclipse_type_display} with {obscuration*100:.1f}% obscuration"]
-                        if peak_altitude:
-                            description_parts.append(f"Peak altitude: {peak_altitude:.1f}°")
-                        if duration_seconds:
-                            hours = duration_seconds // 3600
-                            minutes = (duration_seconds % 3600) // 60
-                            if hours > 0:
-                                description_parts.append(f"Duration: {hours}h {minutes}m")
-                            else:
-                                description_parts.append(f"Duration: {minutes}m")
-                        
-                        description = ". ".join(description_parts) + "."
-
-                        overview_parts = []
-                        
-                        # Add eclipse type explanation
-                        if eclipse_type == "lunar_total":
-                            overview_parts.append("A total lunar eclipse occurs when the Moon passes completely through Earth's shadow, causing it to take on a reddish color often called a 'Blood Moon'.")
-                        elif eclipse_type == "lunar_partial":
-                            overview_parts.append("A partial lunar eclipse occurs when only part of the Moon passes through Earth's shadow, creating a partial darkening effect.")
-                        else:
-                            overview_parts.append("A penumbral lunar eclipse occurs when the Moon passes through Earth's penumbral shadow, causing a subtle darkening that may be difficult to notice.")
-                        
-                        if penumbral_start and penumbral_end:
-                            try:
-                                start_dt = datetime.fromisoformat(penumbral_start)
-                                end_dt = datetime.fromisoformat(penumbral_end)
-                                overview_parts.append(f"The eclipse begins at {start_dt.strftime('%H:%M')} local time and ends at {end_dt.strftime('%H:%M')} local time.")
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        if eclipse_type == "lunar_total" and highlights.get('partialStart') and highlights.get('fullStart'):
-                            try:
-                                partial_start_dt = datetime.fromisoformat(highlights['partialStart']['date'])
-                                full_start_dt = datetime.fromisoformat(highlights['fullStart']['date'])
-                                full_end_dt = datetime.fromisoformat(highlights['fullEnd']['date'])
-                                partial_end_dt = datetime.fromisoformat(highlights['partialEnd']['date'])
-                                
-                                overview_parts.append(f"The partial eclipse phase begins at {partial_start_dt.strftime('%H:%M')}, totality starts at {full_start_dt.strftime('%H:%M')}, reaches maximum at {peak_time.strftime('%H:%M')}, totality ends at {full_end_dt.strftime('%H:%M')}, and the partial phase ends at {partial_end_dt.strftime('%H:%M')}.")
-                            except (ValueError, TypeError, KeyError):
-                                pass
-
-                        if peak_altitude:
-                            if peak_altitude > 60:
-                                altitude_desc = "high in the sky"
-                            elif peak_altitude > 30:
-                                altitude_desc = "well above the horizon"
-                            elif peak_altitude > 15:
-                                altitude_desc = "moderately high"
-                            else:
-                                altitude_desc = "low on the horizon"
-                            
-                            overview_parts.append(f"At peak eclipse, the Moon will be {altitude_desc} at {peak_altitude:.1f}° altitude.")
-                        
-                        overview_parts.append("This eclipse will be visible from your location, weather permitting.")
-
-                        if eclipse_type == "lunar_total":
-                            overview_parts.append("Total lunar eclipses are safe to observe with the naked eye and are spectacular through binoculars or telescopes.")
-                        elif eclipse_type == "lunar_partial":
-                            overview_parts.append("Partial lunar eclipses are easily visible to the naked eye and make for excellent photography opportunities.")
-                        else:
-                            overview_parts.append("Penumbral eclipses are subtle and may require careful observation to notice the dimming effect.")
-
-                        overview = " ".join(overview_parts)
-
-                        eclipse_data = {
-                            "name": f"{body_name.title()} {event_type.title()} Eclipse",
-                            "event_type": "eclipse",
-                            "date_time": peak_time,
-                            "description": overview,
-                            "raw_api_data": event,
-                            "api_source": api_source,
-                            "eclipse_type": eclipse_type,
-                            "obscuration_percentage": obscuration * 100,
-                            "coordinates": {
-                                "latitude": options["latitude"],
-                                "longitude": options["longitude"]
-                            },
-                            "visibility_regions": ["Local"],
-                            "importance_level": 2,
-                            "partial_begin_altitude" : partial_begin_altitude,
-                            "total_begin_altitude": total_begin_altitude,
-                            "peak_altitude":peak_altitude,
-                            "total_end_altitude":total_end_altitude,
-                            "partial_end_altitude":partial_end_altitude,
-                            "duration_seconds": totality_duration_seconds,
-                        }
-                        
-
-                        eclipse, created = Eclipse.objects.update_or_create(
-                            external_id=external_id,
-                            defaults=eclipse_data
-                        )
-
-                        if created:
-                            created_count += 1
-                            self.stdout.write(f"Created eclipse: {eclipse.name}")
-                        else:
-                            updated_count += 1
-                            self.stdout.write(f"Updated eclipse: {eclipse.name}")
-
-                    except Exception as e:
-                        self.stderr.write(f"Error processing event: {e}")
-                        if options['debug']:
-                            import traceback
-                            traceback.print_exc()
-                        continue
+                    yield job, body_name, event
+
+    def safe_build_eclipse(self, event, body_name, latitude, longitude, api_source, debug):
+        try:
+            return self.build_eclipse(event, body_name, latitude, longitude, api_source, debug)
+        except Exception as e:
+            self.stderr.write(f"Error processing event: {e}")
+            if debug:
+                import traceback
+                traceback.print_exc()
+            return None
+
+    def eclipse_rows(self, jobs, api_source, debug):
+        """Yield Eclipse rows for ingest_events as responses arrive"""
+        for job, body_name, event in self.iter_events(jobs, debug):
+            eclipse = self.safe_build_eclipse(
+                event, body_name, job['latitude'], job['longitude'], api_source, debug
+            )
+            if eclipse:
+                yield eclipse
+
+    def location_visibility(self, event):
+        """VisibilityDetail values from the Moon's altitude at each eclipse contact seen from one location"""
+        highlights = event.get('eventHighlights', {})
+        contacts = sorted(
+            (datetime.fromisoformat(highlight['date']), name, highlight.get('altitude'))
+            for name, highlight in highlights.items()
+            if isinstance(highlight, dict) and highlight.get('date')
+        )
+        above = [when for when, _, altitude in contacts if altitude is not None and altitude > 0]
+        notes = ", ".join(
+            f"{name} {altitude:.1f}°" for _, name, altitude in contacts if altitude is not None
+        )
+        return {
+            "visible": bool(above),
+            "best_viewing_start": above[0] if above else None,
+            "best_viewing_end": above[-1] if above else None,
+            "notes": f"Moon altitude at {notes}" if notes else "",
+        }
 
+    def fetch_all_locations(self, jobs, api_source, debug):
+        """
+        One global Eclipse per event (keyed on type and UTC peak date) plus a
+        VisibilityDetail per location carrying that site's altitudes.
+        """
+        eclipses, visibility = {}, {}
+        for job, body_name, event in self.iter_events(jobs, debug):
+            location = job['location']
+            peak = event.get('eventHighlights', {}).get('peak', {}).get('date')
+            if not peak:
+                self.stdout.write(f"Skipping event without peak date: {event}")
+                continue
+            try:
+                peak_day = datetime.fromisoformat(peak).astimezone(dt_timezone.utc).date()
+            except (ValueError, TypeError) as e:
+                self.stderr.write(f"Date parsing error for {peak}: {e}")
+                continue
+            external_id = f"{event.get('type', 'unknown')}_{peak_day.isoformat()}"
+
+            if external_id not in eclipses:
+                # Location-specific altitudes live on VisibilityDetail, not on the shared event
+                highlights = {
+                    name: {key: value for key, value in highlight.items() if key != 'altitude'}
+                    if isinstance(highlight, dict) else highlight
+                    for name, highlight in event.get('eventHighlights', {}).items()
+                }
+                eclipse = self.safe_build_eclipse(
+                    {**event, 'eventHighlights': highlights}, body_name, None, None, api_source, debug
+                )
+                if not eclipse:
+                    continue
+                eclipse.update({"external_id": external_id, "coordinates": {}, "visibility_regions": []})
+                eclipses[external_id] = eclipse
+
+            detail = self.location_visibility(event)
+            if detail["visible"]:
+                eclipses[external_id]["visibility_regions"].append(location.name)
+            visibility[(external_id, location.id)] = {
+                **detail,
+                "location_id": location.id,
+                "light_pollution_level": location.light_pollution_level,
+            }
+
+        return self.save_shared(eclipses, visibility)
+
+    def save_shared(self, eclipses, visibility):
+        """Upsert shared eclipses keyed by external_id and their {(external_id, location_id): detail} rows together"""
+        with transaction.atomic():
+            eclipse_result = ingest_events(Eclipse, eclipses.values())
+            event_ids = dict(
+                CelestialEvent.objects.filter(external_id__in=list(eclipses)).values_list('external_id', 'id')
+            )
+            visibility_result = ingest_events(
+                VisibilityDetail,
+                ({**detail, "celestial_event_id": event_ids[external_id]}
+                 for (external_id, _), detail in visibility.items()),
+                key_fields=('celestial_event_id', 'location_id'),
+            )
+        return eclipse_result, visibility_result
+
+    def site_results(self, sites, lunar, start, end, workers):
+        """Yield (location, [(eclipse, altitudes), ...]) per site, computed in worker processes when workers > 1"""
+        if workers > 1 and len(sites) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(sites)), initializer=_init_worker) as pool:
+                futures = [
+                    (location, pool.submit(_site_eclipses, lunar, start, end, latitude, longitude, elevation))
+                    for latitude, longitude, elevation, location in sites
+                ]
+                for location, future in futures:
+                    yield location, future.result()
+            return
+        for latitude, longitude, elevation, location in sites:
+            yield location, _site_eclipses(lunar, start, end, latitude, longitude, elevation)
+
+    def compute_local(self, sites, options):
+        """
+        Lunar and solar eclipses from astronomy-engine without any network access.
+        A single site gets its own rows with contact altitudes (as the AstronomyAPI
+        path does); --all-locations gets shared eclipses plus per-location visibility.
+        """
+        start = datetime.strptime(options["from_date"], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+        end = datetime.strptime(options["to_date"], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc) + timedelta(days=1)
+        api_source = get_api_source("Astronomy Library")
+        lunar = find_lunar_eclipses(start, end)
+
+        if not options["all_locations"]:
+            latitude, longitude, elevation, _ = sites[0]
+            rows = []
+            for eclipse, altitudes in _site_eclipses(lunar, start, end, latitude, longitude, elevation):
+                record = eclipse_record(eclipse, altitudes, latitude, longitude)
+                visible = visibility_record(eclipse, altitudes)["visible"]
+                rows.append({**record, "api_source": api_source, "visibility_regions": ["Local"] if visible else []})
+            result = ingest_events(Eclipse, rows)
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Eclipse events processed successfully! Created: {created_count}, Updated: {updated_count}"
+                    f"{len(rows)} eclipses computed locally. Created: {result['inserted']}, Updated: {result['updated']}"
+                )
+            )
+            return
+
+        shared = lunar + find_global_solar_eclipses(start, end)
+        eclipses = {}
+        for eclipse in shared:
+            record = eclipse_record(eclipse)
+            eclipses[record["external_id"]] = {**record, "api_source": api_source, "visibility_regions": []}
+
+        def shared_id(eclipse):
+            # A local solar eclipse can differ in kind and peak time from the global one it belongs to
+            same_body = (candidate for candidate in shared if candidate['body'] == eclipse['body'])
+            match = min(same_body, key=lambda candidate: abs(candidate['peak'] - eclipse['peak']), default=None)
+            if match is None or abs(match['peak'] - eclipse['peak']) > timedelta(days=1):
+                return None
+            return eclipse_record(match)["external_id"]
+
+        visibility = {}
+        for location, results in self.site_results(sites, lunar, start, end, max(1, options["workers"])):
+            for eclipse, altitudes in results:
+                external_id = shared_id(eclipse)
+                if external_id is None:
+                    continue
+                detail = visibility_record(eclipse, altitudes)
+                if detail["visible"]:
+                    eclipses[external_id]["visibility_regions"].append(location.name)
+                visibility[(external_id, location.id)] = {
+                    **detail,
+                    "location_id": location.id,
+                    "light_pollution_level": location.light_pollution_level,
+                }
+
+        eclipse_result, visibility_result = self.save_shared(eclipses, visibility)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(eclipses)} eclipses computed locally for {len(sites)} locations: "
+                f"{eclipse_result['inserted']} created, {eclipse_result['updated']} updated; visibility rows: "
+                f"{visibility_result['inserted']} created, {visibility_result['updated']} updated"
+            )
+        )
+
+    def handle(self, *args, **options):
+        sites = [(options["latitude"], options["longitude"], options["elevation"], None)]
+        if options["all_locations"]:
+            sites = [
+                (float(location.latitude), float(location.longitude), location.elevation_meters, location)
+                for location in Location.objects.all()
+            ]
+            if not sites:
+                self.stderr.write("No locations found in database")
+                return
+
+        if options["provider"] == "local":
+            self.compute_local(sites, options)
+            return
+
+        # Use environment variables or settings for credentials
+        APP_ID = getattr(settings, 'ASTRONOMY_API_ID', None)
+        APP_SECRET = getattr(settings, 'ASTRONOMY_API_SECRET', None)
+        
+        if not APP_ID or not APP_SECRET:
+            self.stderr.write("Missing API credentials. Set ASTRONOMY_API_ID and ASTRONOMY_API_SECRET in settings.")
+            return
+        
+        body = "moon"
+        url = f"https://api.astronomyapi.com/api/v2/bodies/events/{body}"
+        auth = HTTPBasicAuth(APP_ID, APP_SECRET)
+
+        chunks = list(self.date_chunks(options["from_date"], options["to_date"], options["chunk_days"]))
+        jobs = [
+            {
+                "url": url,
+                "params": {
+                    "latitude": str(latitude),
+                    "longitude": str(longitude),
+                    "elevation": str(elevation),
+                    "from_date": from_date,
+                    "to_date": to_date,
+                    "time": "12:00:00",
+                    "output": "rows"
+                },
+                "auth": auth,
+                "source": "astronomyapi",
+                "timeout": 30,
+                "latitude": latitude,
+                "longitude": longitude,
+                "location": location,
+            }
+            for latitude, longitude, elevation, location in sites
+            for from_date, to_date in chunks
+        ]
+
+        try:
+            self.stdout.write(f"Making {len(jobs)} API request(s) to: {url}")
+            api_source = get_api_source("AstronomyAPI")
+
+            if options["all_locations"]:
+                eclipse_result, visibility_result = self.fetch_all_locations(jobs, api_source, options['debug'])
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Eclipses for {len(sites)} locations: {eclipse_result['inserted']} created, "
+                        f"{eclipse_result['updated']} updated; visibility rows: {visibility_result['inserted']} "
+                        f"created, {visibility_result['updated']} updated"
+                    )
+                )
+                return
+
+            # Rows stream into the bulk writer while later chunks are still in flight
+            result = ingest_events(Eclipse, self.eclipse_rows(jobs, api_source, options['debug']))
+            for i, batch in enumerate(result['batches'], 1):
+                self.stdout.write(f"Batch {i}: {batch['rows']} rows in {batch['seconds']:.3f}s")
+
+            if not result['batches']:
+                self.stdout.write("No eclipse data found for the specified parameters")
+                return
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Eclipse events processed successfully! Created: {result['inserted']}, Updated: {result['updated']}"
                 )
             )
 
-        except requests.exceptions.RequestException as e:
-            self.stderr.write(f"Network error: {e}")
         except Exception as e:
             self.stderr.write(f"Unexpected error: {e}")
             if options['debug']:
                 import traceback
-                traceback.print_exc()
\ No newline at end of file
+                traceback.print_exc()
+
+    def build_eclipse(self, event, body_name, latitude, longitude, api_source, debug):
+        """Eclipse field values for one AstronomyAPI event, or None when it cannot be used"""
+        event_type = event.get('type', 'unknown')
+        obscuration = event.get('extraInfo', {}).get('obscuration', 0.0)
+        highlights = event.get('eventHighlights', {})
+        peak = highlights.get('peak', {}).get('date')
+        peak_altitude = highlights.get('peak', {}).get('altitude')
+
+        partial_begin_altitude = highlights.get('partialStart', {}).get('altitude')
+        total_begin_altitude = highlights.get('fullStart', {}).get('altitude')
+        total_end_altitude = highlights.get('fullEnd', {}).get('altitude')
+        partial_end_altitude = highlights.get('partialEnd', {}).get('altitude')
+
+        duration_seconds = None
+        penumbral_start = highlights.get('penumbralStart', {}).get('date')
+        penumbral_end = highlights.get('penumbralEnd', {}).get('date')
+
+        if penumbral_start and penumbral_end:
+            try:
+                start_time = datetime.fromisoformat(penumbral_start)
+                end_time = datetime.fromisoformat(penumbral_end)
+                duration_seconds = int((end_time - start_time).total_seconds())
+            except (ValueError, TypeError):
+                pass
+
+        if peak:
+            external_id = f"{event_type}_{peak.split('T')[0]}_{latitude}_{longitude}"
+        else:
+            self.stdout.write(f"Skipping event without peak date: {event}")
+            return None
+
+        if not peak:
+            self.stdout.write(f"Skipping event without peak date: {event}")
+            return None
+
+        try:
+            peak_time = datetime.fromisoformat(peak)
+            if peak_time.tzinfo is None:
+                peak_time = make_aware(peak_time)
+        except (ValueError, TypeError) as e:
+            self.stderr.write(f"Date parsing error for {peak}: {e}")
+            return None
+
+        eclipse_type_map = {
+            "penumbral_lunar_eclipse": "lunar_penumbral",
+            "partial_lunar_eclipse": "lunar_partial", 
+            "total_lunar_eclipse": "lunar_total"
+        }
+        eclipse_type = eclipse_type_map.get(event_type.lower(), "lunar_partial")
+
+        eclipse_type_display = event_type.replace('_', ' ').title()
+        eclipse_name = f"{body_name} {eclipse_type_display}"
+
+        totality_duration_seconds = None
+        if eclipse_type == "lunar_total":
+            full_start = highlights.get('fullStart', {}).get('date')
+            full_end = highlights.get('fullEnd', {}).get('date')
+
+            if full_start and full_end:
+                try:
+                    start_time = datetime.fromisoformat(full_start)
+                    end_time = datetime.fromisoformat(full_end)
+                    totality_duration_seconds = int((end_time - start_time).total_seconds())
+
+                    if debug:
+                        self.stdout.write(f"Totality duration: {full_start} to {full_end} = {totality_duration_seconds} seconds")
+                except (ValueError, TypeError) as e:
+                    if debug:
+                        self.stdout.write(f"Totality duration calculation failed: {e}")
+                    pass
+
+        description_parts = [f"{eclipse_type_display} with {obscuration*100:.1f}% obscuration"]
+        if peak_altitude:
+            description_parts.append(f"Peak altitude: {peak_altitude:.1f}°")
+        if duration_seconds:
+            hours = duration_seconds // 3600
+            minutes = (duration_seconds % 3600) // 60
+            if hours > 0:
+                description_parts.append(f"Duration: {hours}h {minutes}m")
+            else:
+                description_parts.append(f"Duration: {minutes}m")
+
+        description = ". ".join(description_parts) + "."
+
+        overview_parts = []
+
+        # Add eclipse type explanation
+        if eclipse_type == "lunar_total":
+            overview_parts.append("A total lunar eclipse occurs when the Moon passes completely through Earth's shadow, causing it to take on a reddish color often called a 'Blood Moon'.")
+        elif eclipse_type == "lunar_partial":
+            overview_parts.append("A partial lunar eclipse occurs when only part of the Moon passes through Earth's shadow, creating a partial darkening effect.")
+        else:
+            overview_parts.append("A penumbral lunar eclipse occurs when the Moon passes through Earth's penumbral shadow, causing a subtle darkening that may be difficult to notice.")
+
+        if penumbral_start and penumbral_end:
+            try:
+                start_dt = datetime.fromisoformat(penumbral_start)
+                end_dt = datetime.fromisoformat(penumbral_end)
+                overview_parts.append(f"The eclipse begins at {start_dt.strftime('%H:%M')} local time and ends at {end_dt.strftime('%H:%M')} local time.")
+            except (ValueError, TypeError):
+                pass
+
+        if eclipse_type == "lunar_total" and highlights.get('partialStart') and highlights.get('fullStart'):
+            try:
+                partial_start_dt = datetime.fromisoformat(highlights['partialStart']['date'])
+                full_start_dt = datetime.fromisoformat(highlights['fullStart']['date'])
+                full_end_dt = datetime.fromisoformat(highlights['fullEnd']['date'])
+                partial_end_dt = datetime.fromisoformat(highlights['partialEnd']['date'])
+
+                overview_parts.append(f"The partial eclipse phase begins at {partial_start_dt.strftime('%H:%M')}, totality starts at {full_start_dt.strftime('%H:%M')}, reaches maximum at {peak_time.strftime('%H:%M')}, totality ends at {full_end_dt.strftime('%H:%M')}, and the partial phase ends at {partial_end_dt.strftime('%H:%M')}.")
+            except (ValueError, TypeError, KeyError):
+                pass
+
+        if peak_altitude:
+            if peak_altitude > 60:
+                altitude_desc = "high in the sky"
+            elif peak_altitude > 30:
+                altitude_desc = "well above the horizon"
+            elif peak_altitude > 15:
+                altitude_desc = "moderately high"
+            else:
+                altitude_desc = "low on the horizon"
+
+            overview_parts.append(f"At peak eclipse, the Moon will be {altitude_desc} at {peak_altitude:.1f}° altitude.")
+
+        overview_parts.append("This eclipse will be visible from your location, weather permitting.")
+
+        if eclipse_type == "lunar_total":
+            overview_parts.append("Total lunar eclipses are safe to observe with the naked eye and are spectacular through binoculars or telescopes.")
+        elif eclipse_type == "lunar_partial":
+            overview_parts.append("Partial lunar eclipses are easily visible to the naked eye and make for excellent photography opportunities.")
+        else:
+            overview_parts.append("Penumbral eclipses are subtle and may require careful observation to notice the dimming effect.")
+
+        overview = " ".join(overview_parts)
+
+        eclipse_data = {
+            "name": f"{body_name.title()} {event_type.title()} Eclipse",
+            "event_type": "eclipse",
+            "date_time": peak_time,
+            "description": overview,
+            "raw_api_data": event,
+            "api_source": api_source,
+            "eclipse_type": eclipse_type,
+            "obscuration_percentage": obscuration * 100,
+            "coordinates": {
+                "latitude": latitude,
+                "longitude": longitude
+            },
+            "visibility_regions": ["Local"],
+            "importance_level": 2,
+            "partial_begin_altitude" : partial_begin_altitude,
+            "total_begin_altitude": total_begin_altitude,
+            "peak_altitude":peak_altitude,
+            "total_end_altitude":total_end_altitude,
+            "partial_end_altitude":partial_end_altitude,
+            "duration_seconds": totality_duration_seconds,
+        }
+
+
+        if debug:
+            self.stdout.write(f"Queued eclipse: {eclipse_data['name']}")
+        return {**eclipse_data, "external_id": external_id}
@@ -1,11 +1,11 @@
-import time
 import requests
 from django.core.management.base import BaseCommand
 from timezonefinder import TimezoneFinder
 from astrocalendar_backend import settings
 from ...models import Location  
-
-tf = TimezoneFinder()
+from ...services.async_fetch import iter_fetch
+from ...services.ingestion import ingest_events
+from ...services.locations import invalidate_location_index
 
 HEADERS = {
     "User-Agent": "DjangoAstronomyCalendarApp/1.0 (U22104273@sharjah.ac.ae)"
@@ -27,50 +27,64 @@ class Command(BaseCommand):
             help='Skip elevation fetching to speed up the process'
         )
 
-    def get_elevation(self, lat, lon):
+    def elevation_job(self, site):
+        """Google Elevation request for a geocoded site, or None when no API key is configured"""
+        GOOGLE_API_KEY = settings.GOOGLE_ELEVATION_API_KEY
+        if not GOOGLE_API_KEY:
+            return None
+        return {
+            "url": "https://maps.googleapis.com/maps/api/elevation/json",
+            "params": {"locations": f"{site['latitude']},{site['longitude']}", "key": GOOGLE_API_KEY},
+            "headers": HEADERS,
+            "source": "google-elevation",
+            "timeout": 10,
+            "site": site,
+        }
+
+    def parse_elevation(self, site, response, error):
         try:
-            GOOGLE_API_KEY = settings.GOOGLE_ELEVATION_API_KEY  
-            if GOOGLE_API_KEY:
-                url = "https://maps.googleapis.com/maps/api/elevation/json"
-                params = {"locations": f"{lat},{lon}", "key": GOOGLE_API_KEY}
-                response = requests.get(url, params=params, headers=HEADERS, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                if data.get("results"):
-                    elevation = data["results"][0].get("elevation", 0)
-                    self.stdout.write(self.style.SUCCESS(f"   🏔️  Elevation: {elevation}m (Google)"))
-                    return elevation
-            else:
-                self.stdout.write(self.style.WARNING("   ⚠️  Google Elevation API key not set."))
+            if error:
+                raise error
+            response.raise_for_status()
+            data = response.json()
+            if data.get("results"):
+                elevation = data["results"][0].get("elevation", 0)
+                self.stdout.write(self.style.SUCCESS(f"   🏔️  {site['name']} elevation: {elevation}m (Google)"))
+                return elevation
         except Exception as e:
-            self.stdout.write(self.style.WARNING(f"   ⚠️  Google Elevation failed: {e}"))
+            self.stdout.write(self.style.WARNING(f"   ⚠️  Google Elevation failed for {site['name']}: {e}"))
 
-        self.stdout.write(self.style.WARNING("   ⚠️  All elevation APIs failed, using 0m"))
+        self.stdout.write(self.style.WARNING(f"   ⚠️  All elevation APIs failed for {site['name']}, using 0m"))
         return 0
 
-    def handle(self, *args, **options):
-        countries = options['countries'] or [
-            "United Arab Emirates", "Canada", "Japan", "United Kingdom", "United States", "Egypt"
+    def geocode(self, countries, tf):
+        """Nominatim lookups for every country; geocoded sites are yielded as responses arrive"""
+        url = "https://nominatim.openstreetmap.org/search"
+        jobs = [
+            {
+                "url": url,
+                "params": {
+                    "q": country,
+                    "format": "json",
+                    "addressdetails": 1,
+                    "limit": 1,
+                    "countrycodes": "",
+                },
+                "headers": HEADERS,
+                # Nominatim's 1 request/second limit is enforced by the client
+                "source": "nominatim",
+                "timeout": 10,
+                "country": country,
+            }
+            for country in countries
         ]
-        skip_elevation = options['skip_elevation']
 
-        self.stdout.write(self.style.SUCCESS(f"🌍 Processing {len(countries)} countries..."))
-        if skip_elevation:
-            self.stdout.write(self.style.WARNING("⚠️  Skipping elevation data (--skip-elevation used)"))
-
-        for i, country in enumerate(countries, 1):
+        for i, (job, response, error) in enumerate(iter_fetch(jobs), 1):
+            country = job["country"]
             self.stdout.write(self.style.SUCCESS(f"\n[{i}/{len(countries)}] Processing: {country}"))
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                "q": country,
-                "format": "json",
-                "addressdetails": 1,
-                "limit": 1,
-                "countrycodes": "",  
-            }
-
             try:
-                response = requests.get(url, params=params, headers=HEADERS, timeout=10)
+                if error:
+                    raise error
                 response.raise_for_status()
                 data = response.json()
 
@@ -81,40 +95,59 @@ class Command(BaseCommand):
                 result = data[0]
                 lat = float(result["lat"])
                 lon = float(result["lon"])
-                country_code = result.get("address", {}).get("country_code", "").upper()
-                timezone_str = tf.timezone_at(lat=lat, lng=lon) or "UTC"
-
-                elevation = 0
-                if not skip_elevation:
-                    elevation = self.get_elevation(lat, lon)
-                else:
-                    self.stdout.write(self.style.WARNING(f"   ⏭️  Skipping elevation for {country}"))
-
-                Location.objects.update_or_create(
-                    name=country,
-                    defaults={
-                        "latitude": lat,
-                        "longitude": lon,
-                        "country_code": country_code,
-                        "timezone": timezone_str,
-                        "elevation_meters": elevation,
-                        "light_pollution_level": 0,
-                    }
-                )
-
-                self.stdout.write(self.style.SUCCESS(
-                    f"   ✅ Saved: {country} ({lat:.4f}, {lon:.4f}, {timezone_str}, {elevation}m)"
-                ))
+                yield {
+                    "name": country,
+                    "latitude": lat,
+                    "longitude": lon,
+                    "country_code": result.get("address", {}).get("country_code", "").upper(),
+                    "timezone": tf.timezone_at(lat=lat, lng=lon) or "UTC",
+                    "elevation_meters": 0,
+                    "light_pollution_level": 0,
+                }
 
             except requests.exceptions.RequestException as e:
                 self.stdout.write(self.style.ERROR(f"   ❌ Network error for {country}: {e}"))
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"   ❌ Error for {country}: {e}"))
 
-            if i % 5 == 0:
-                self.stdout.write(self.style.WARNING("   ⏸️  Pausing for 2 seconds..."))
-                time.sleep(2)
-            else:
-                time.sleep(1)
+    def with_elevations(self, sites):
+        """Elevation lookups for all sites at once; each site is yielded as soon as its lookup completes"""
+        sites = list(sites)
+        jobs = [self.elevation_job(site) for site in sites]
+        if not all(jobs):
+            self.stdout.write(self.style.WARNING("   ⚠️  Google Elevation API key not set."))
+            yield from sites
+            return
+        for job, response, error in iter_fetch(jobs):
+            yield {**job["site"], "elevation_meters": self.parse_elevation(job["site"], response, error)}
+
+    def handle(self, *args, **options):
+        countries = options['countries'] or [
+            "United Arab Emirates", "Canada", "Japan", "United Kingdom", "United States", "Egypt"
+        ]
+        skip_elevation = options['skip_elevation']
+        tf = TimezoneFinder()
+
+        self.stdout.write(self.style.SUCCESS(f"🌍 Processing {len(countries)} countries..."))
+        if skip_elevation:
+            self.stdout.write(self.style.WARNING("⚠️  Skipping elevation data (--skip-elevation used)"))
+
+        sites = self.geocode(countries, tf)
+        if not skip_elevation:
+            sites = self.with_elevations(sites)
+
+        def saved(sites):
+            for site in sites:
+                self.stdout.write(self.style.SUCCESS(
+                    f"   ✅ Located: {site['name']} ({site['latitude']:.4f}, {site['longitude']:.4f}, "
+                    f"{site['timezone']}, {site['elevation_meters']}m)"
+                ))
+                yield site
+
+        result = ingest_events(Location, saved(sites), key_fields=('name',))
+        invalidate_location_index()  # bulk writes send no post_save
 
-        self.stdout.write(self.style.SUCCESS(f"\n🎉 Completed processing {len(countries)} countries!"))
+        self.stdout.write(self.style.SUCCESS(
+            f"\n🎉 Completed processing {len(countries)} countries! "
+            f"{result['inserted']} created, {result['updated']} updated."
+        ))
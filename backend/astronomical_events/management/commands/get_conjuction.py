@@ -1,7 +1,12 @@
 from django.core.management.base import BaseCommand, CommandError
-from datetime import datetime, timedelta
-from skyfield.api import load, Topos
-from math import degrees
+from datetime import datetime
+from astronomical_events.models import CelestialEvent
+from astronomical_events.services.api_sources import get_api_source
+from astronomical_events.services.conjunctions import (
+    CATALOGUE_BODIES, conjunction_record, find_all_conjunctions, find_conjunctions, resolve_body,
+)
+from astronomical_events.services.ephemeris import get_ephemeris
+from astronomical_events.services.ingestion import ingest_events
 
 class Command(BaseCommand):
     help = 'Find planetary conjunctions in given date range for given planet pairs'
@@ -9,8 +14,13 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--start-date', required=True, type=str, help='Start date YYYY-MM-DD')
         parser.add_argument('--end-date', required=True, type=str, help='End date YYYY-MM-DD')
-        parser.add_argument('--pairs', nargs='+', required=True, help='Planet pairs like Venus-Uranus Mars-Jupiter')
-        parser.add_argument('--step-minutes', type=int, default=60, help='Step size in minutes for searching conjunction')
+        parser.add_argument('--pairs', nargs='+', help='Planet pairs like Venus-Uranus Mars-Jupiter')
+        parser.add_argument('--all-pairs', action='store_true',
+                            help='Search every pair of the Moon and planets and save conjunctions to the database')
+        parser.add_argument('--threshold', type=float, default=5.0,
+                            help='With --all-pairs, keep conjunctions closer than this many degrees (default: 5)')
+        parser.add_argument('--step-minutes', type=int, default=60,
+                            help='Coarse sampling step in minutes; minima are then refined to sub-second precision')
 
     def handle(self, *args, **options):
         start_date = options['start_date']
@@ -23,15 +33,19 @@ class Command(BaseCommand):
             end_dt = datetime.strptime(end_date, '%Y-%m-%d')
         except ValueError as e:
             raise CommandError(f'Invalid date format: {e}')
+        if step_minutes <= 0:
+            raise CommandError('--step-minutes must be positive')
+        if options['all_pairs']:
+            return self.save_all_pairs(start_dt, end_dt, step_minutes, options['threshold'])
+        if not pairs:
+            raise CommandError('Provide --pairs or --all-pairs')
 
         self.stdout.write(f'Checking conjunctions from {start_dt} to {end_dt}')
         self.stdout.write(f'Planet pairs: {pairs}')
 
-        eph = load('de440s.bsp')
-        ts = load.timescale()
-
-        earth = eph['earth']
+        eph = get_ephemeris('de440s')
 
+        valid_pairs = {}
         for pair in pairs:
             planets = pair.split('-')
             if len(planets) != 2:
@@ -39,41 +53,48 @@ class Command(BaseCommand):
                 continue
 
             planet1_name, planet2_name = planets[0].lower(), planets[1].lower()
-            if planet1_name not in eph or planet2_name not in eph:
+            try:
+                resolve_body(eph, planet1_name)
+                resolve_body(eph, planet2_name)
+            except KeyError:
                 self.stdout.write(self.style.ERROR(f'Unknown planet(s) in pair: {pair}'))
                 continue
+            valid_pairs[pair] = (planet1_name, planet2_name)
 
-            planet1 = eph[planet1_name]
-            planet2 = eph[planet2_name]
-
-            self.stdout.write(f'Finding conjunctions between {planet1_name.capitalize()} and {planet2_name.capitalize()}')
-
-            current_dt = start_dt
-            last_sep = None
-            conjunctions = []
-
-            while current_dt <= end_dt:
-                t = ts.utc(current_dt.year, current_dt.month, current_dt.day, current_dt.hour, current_dt.minute)
-                astrometric1 = earth.at(t).observe(planet1)
-                astrometric2 = earth.at(t).observe(planet2)
+        if not valid_pairs:
+            return
 
-                ra1, dec1, dist1 = astrometric1.radec()
-                ra2, dec2, dist2 = astrometric2.radec()
-
-                # Calculate angular separation in degrees
-                separation = degrees(astrometric1.separation_from(astrometric2).radians)
-
-                # Detect local minima in separation as conjunction candidates
-                if last_sep is not None and last_sep < separation:
-                    # Previous step was a minimum separation
-                    conjunction_time = current_dt - timedelta(minutes=step_minutes)
-                    conjunctions.append((conjunction_time, last_sep))
-                last_sep = separation
-                current_dt += timedelta(minutes=step_minutes)
+        results = find_conjunctions(list(valid_pairs.values()), start_dt, end_dt, step_minutes, ephemeris='de440s')
 
+        for pair, (planet1_name, planet2_name) in valid_pairs.items():
+            self.stdout.write(f'Finding conjunctions between {planet1_name.capitalize()} and {planet2_name.capitalize()}')
+            conjunctions = results[(planet1_name, planet2_name)]
             if conjunctions:
                 self.stdout.write(f'Conjunctions for {pair}:')
                 for dtc, sep in conjunctions:
-                    self.stdout.write(f'  {dtc} separation: {sep:.4f} degrees')
+                    self.stdout.write(f"  {dtc.strftime('%Y-%m-%d %H:%M:%S.%f')[:-5]} UTC separation: {sep:.4f} degrees")
             else:
                 self.stdout.write(f'No conjunctions found for {pair} in this period.')
+
+    def save_all_pairs(self, start_dt, end_dt, step_minutes, threshold):
+        self.stdout.write(
+            f'Cataloguing conjunctions under {threshold}° for {", ".join(CATALOGUE_BODIES)} '
+            f'from {start_dt} to {end_dt}'
+        )
+        results = find_all_conjunctions(start_dt, end_dt, threshold, step_minutes, ephemeris='de440s')
+
+        api_source = get_api_source("Skyfield")
+        rows = [
+            {**conjunction_record(body1, body2, moment, separation, 'de440s'), 'api_source': api_source}
+            for (body1, body2), conjunctions in results.items()
+            for moment, separation in conjunctions
+        ]
+        rows.sort(key=lambda row: row['date_time'])
+        for row in rows:
+            self.stdout.write(f"  {row['date_time']:%Y-%m-%d %H:%M:%S} UTC {row['description']}")
+
+        result = ingest_events(CelestialEvent, rows)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(rows)} conjunctions: {result['inserted']} created, {result['updated']} updated "
+            f"in {result['seconds']:.3f}s"
+        ))
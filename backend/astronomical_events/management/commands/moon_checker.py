@@ -1,7 +1,9 @@
 from django.core.management.base import BaseCommand, CommandError
 from astronomical_events.models import CelestialEvent, Location, ApiSource
 from datetime import datetime, timedelta, timezone
-from skyfield.api import load
+from astronomical_events.services.ephemeris import get_ephemeris, get_timescale
+from astronomical_events.services.api_sources import get_api_source
+from astronomical_events.services.ingestion import ingest_events
 from skyfield.searchlib import find_maxima, find_minima
 from django.utils.text import slugify
 
@@ -46,17 +48,14 @@ class Command(BaseCommand):
         except Location.DoesNotExist:
             raise CommandError(f"Location '{location_name}' not found. Please create it first.")
 
-        api_source, _ = ApiSource.objects.get_or_create(
-            name="Skyfield",
-            defaults={"base_url": "https://rhodesmill.org/skyfield/"}
-         )
+        api_source = get_api_source("Skyfield")
 
         self.stdout.write(f"Fetching Moon apogee/perigee events for {year}...")
 
-        ts = load.timescale()
+        ts = get_timescale()
         try:
             self.stdout.write("Loading Skyfield ephemeris data (this may take a moment)...")
-            eph = load('de421.bsp') # Load a planetary ephemeris
+            eph = get_ephemeris('de421') # Shared, process-wide planetary ephemeris
             self.stdout.write("Ephemeris loaded.")
         except Exception as e:
             raise CommandError(f"Failed to load Skyfield ephemeris: {e}. "
@@ -73,70 +72,34 @@ class Command(BaseCommand):
         apogee_times, apogee_distances = find_maxima(t_start, t_end, moon_distance_func)
         perigee_times, perigee_distances = find_minima(t_start, t_end, moon_distance_func)
 
-        created_count = 0
-        updated_count = 0
-
-        # Process Apogee events
-        for t, d in zip(apogee_times, apogee_distances):
-            event_dt = t.utc_datetime().astimezone(timezone.utc) # Ensure timezone-aware UTC
-            
-            name = "Moon Apogee"
-            description = f"The Moon reaches its apogee (farthest point from Earth) at a distance of {d:.2f} km."
-            external_id = f"moon_apogee_{event_dt.strftime('%Y%m%d%H%M%S')}"
-
-            obj, created = CelestialEvent.objects.update_or_create(
-                external_id=external_id,
-                defaults={
+        extrema = [
+            ('moon_apogee', "Moon Apogee", "apogee (farthest point from Earth)", apogee_times, apogee_distances),
+            ('moon_perigee', "Moon Perigee", "perigee (closest point to Earth)", perigee_times, perigee_distances),
+        ]
+
+        rows = []
+        for event_type, name, label, times, distances in extrema:
+            for t, d in zip(times, distances):
+                event_dt = t.utc_datetime().astimezone(timezone.utc) # Ensure timezone-aware UTC
+                rows.append({
+                    'external_id': f"{event_type}_{event_dt.strftime('%Y%m%d%H%M%S')}",
                     'name': name,
-                    'event_type': 'moon_apogee',
+                    'event_type': event_type,
                     'date_time': event_dt,
-                    'description': description,
-                    'raw_api_data': {'distance_km': d},
+                    'description': f"The Moon reaches its {label} at a distance of {d:.2f} km.",
+                    'raw_api_data': {'distance_km': float(d)},
                     'last_updated_from_api': datetime.now(timezone.utc),
                     'api_source': api_source,
                     'location': location, # Associate with a default location
                     'importance_level': 2,
                     'viewing_difficulty': 'easy', # Apogee/Perigee are orbital points, not visual events
                     'slug': slugify(f"{name}-{event_dt.strftime('%Y-%m-%d')}")
-                }
-            )
-            if created:
-                created_count += 1
-                self.stdout.write(self.style.SUCCESS(f"Created: {name} on {event_dt.date()} at {event_dt.time()}"))
-            else:
-                updated_count += 1
-                self.stdout.write(self.style.SUCCESS(f"Updated: {name} on {event_dt.date()} at {event_dt.time()}"))
-
-        # Process Perigee events
-        for t, d in zip(perigee_times, perigee_distances):
-            event_dt = t.utc_datetime().astimezone(timezone.utc) # Ensure timezone-aware UTC
-
-            name = "Moon Perigee"
-            description = f"The Moon reaches its perigee (closest point to Earth) at a distance of {d:.2f} km."
-            external_id = f"moon_perigee_{event_dt.strftime('%Y%m%d%H%M%S')}"
-
-            obj, created = CelestialEvent.objects.update_or_create(
-                external_id=external_id,
-                defaults={
-                    'name': name,
-                    'event_type': 'moon_perigee',
-                    'date_time': event_dt,
-                    'description': description,
-                    'raw_api_data': {'distance_km': d},
-                    'last_updated_from_api': datetime.now(timezone.utc),
-                    'api_source': api_source,
-                    'location': location, # Associate with a default location
-                    'importance_level': 2,
-                    'viewing_difficulty': 'easy',
-                    'slug': slugify(f"{name}-{event_dt.strftime('%Y-%m-%d')}")
-                }
-            )
-            if created:
-                created_count += 1
-                self.stdout.write(self.style.SUCCESS(f"Created: {name} on {event_dt.date()} at {event_dt.time()}"))
-            else:
-                updated_count += 1
-                self.stdout.write(self.style.SUCCESS(f"Updated: {name} on {event_dt.date()} at {event_dt.time()}"))
+                })
+                self.stdout.write(f"{name} on {event_dt.date()} at {event_dt.time()}")
+
+        result = ingest_events(CelestialEvent, rows)
+        created_count = result['inserted']
+        updated_count = result['updated']
 
         self.stdout.write(self.style.SUCCESS(
             f"\nFinished fetching Moon apogee/perigee events for {year}. "
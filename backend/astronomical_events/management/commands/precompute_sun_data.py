@@ -0,0 +1,35 @@
+from datetime import date, datetime
+from django.core.management.base import BaseCommand, CommandError
+from astronomical_events.models import Location
+from astronomical_events.services.sun_service import precompute_sun_data
+
+class Command(BaseCommand):
+    help = 'Precomputes sunrise/sunset data several years ahead for every location'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=3, help='Number of years to fill (default: 3)')
+        parser.add_argument('--start-date', type=str, help='First date YYYY-MM-DD (default: today)')
+        parser.add_argument('--location', type=str, help='Only this location name (default: all locations)')
+
+    def handle(self, *args, **options):
+        if options['years'] < 1:
+            raise CommandError('--years must be at least 1')
+        start_date = date.today()
+        if options['start_date']:
+            try:
+                start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+            except ValueError as e:
+                raise CommandError(f'Invalid date format: {e}')
+
+        locations = Location.objects.all()
+        if options['location']:
+            locations = locations.filter(name=options['location'])
+            if not locations.exists():
+                raise CommandError(f"Location '{options['location']}' not found.")
+
+        for summary in precompute_sun_data(options['years'], start_date, locations):
+            self.stdout.write(
+                f"{summary['location']}: {summary['start_date']} to {summary['end_date']}, "
+                f"{summary['inserted']} created, {summary['updated']} updated in {summary['seconds']:.2f}s"
+            )
+        self.stdout.write(self.style.SUCCESS('Sun data precomputed.'))
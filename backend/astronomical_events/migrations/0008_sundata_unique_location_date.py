@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:04
+
+from django.db import migrations
+
+
+def remove_duplicate_sun_data(apps, schema_editor):
+    """Keep only the most recently created SunData row per (location, date)"""
+    SunData = apps.get_model('astronomical_events', 'SunData')
+    rows = (
+        SunData.objects.filter(location__isnull=False)
+        .order_by('location_id', 'date', '-created_at', '-id')
+        .values_list('id', 'location_id', 'date')
+    )
+    duplicates, previous = [], None
+    for pk, location_id, day in rows.iterator(chunk_size=2000):
+        if (location_id, day) == previous:
+            duplicates.append(pk)
+        previous = (location_id, day)
+    for start in range(0, len(duplicates), 1000):
+        SunData.objects.filter(id__in=duplicates[start:start + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astronomical_events', '0007_alter_celestialevent_event_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_sun_data, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='sundata',
+            unique_together={('location', 'date')},
+        ),
+    ]
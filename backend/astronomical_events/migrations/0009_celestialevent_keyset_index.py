@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astronomical_events', '0008_sundata_unique_location_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='celestialevent',
+            index=models.Index(fields=['date_time', 'id'], name='celestial_e_date_ti_b1c3c6_idx'),
+        ),
+    ]
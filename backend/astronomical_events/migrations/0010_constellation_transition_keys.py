@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:58
+
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations
+
+J2000_DATETIME = datetime(2000, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def rekey_constellation_transitions(apps, schema_editor):
+    """
+    Move constellation crossings from the per-run `constellation_{body}_{ut}` key to
+    `constellation_{body}_{old}_{new}_{YYYYMMDD}` (services.constellations.transition_external_id),
+    keeping the most recently fetched row per crossing. date_time is recomputed from the
+    stored UT days, which older runs converted from midnight instead of noon J2000.
+    """
+    CelestialEvent = apps.get_model('astronomical_events', 'CelestialEvent')
+    rows = (
+        CelestialEvent.objects.filter(external_id__startswith='constellation_')
+        .order_by('-last_updated_from_api', '-id')
+        .values_list('id', 'raw_api_data')
+    )
+    keep, duplicates = {}, []
+    for pk, raw in rows.iterator(chunk_size=2000):
+        try:
+            date_time = J2000_DATETIME + timedelta(days=float(raw['transition_time_ut']))
+            key = (
+                f"constellation_{raw['body']}_{raw['old_constellation']['symbol']}_"
+                f"{raw['new_constellation']['symbol']}_{date_time:%Y%m%d}"
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+        if key in keep:
+            duplicates.append(pk)
+        else:
+            keep[key] = (pk, date_time)
+
+    for start in range(0, len(duplicates), 1000):
+        CelestialEvent.objects.filter(id__in=duplicates[start:start + 1000]).delete()
+    for key, (pk, date_time) in keep.items():
+        CelestialEvent.objects.filter(id=pk).update(external_id=key, date_time=date_time)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astronomical_events', '0009_celestialevent_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_constellation_transitions, migrations.RunPython.noop),
+    ]
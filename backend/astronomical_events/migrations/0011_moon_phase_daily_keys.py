@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:21
+
+import re
+
+from django.db import migrations
+
+PHASE_KEY = re.compile(r'^(moon_phase_.+_\d{8})_[a-z_]+$')
+
+
+def rekey_moon_phases(apps, schema_editor):
+    """
+    Drop the phase name from `moon_phase_{location}_{YYYYMMDD}_{phase}` keys, keeping
+    the most recently fetched row per location and day, so that a change of
+    provider (which may name a day's phase differently) updates it in place.
+    """
+    CelestialEvent = apps.get_model('astronomical_events', 'CelestialEvent')
+    rows = (
+        CelestialEvent.objects.filter(external_id__startswith='moon_phase_')
+        .order_by('-last_updated_from_api', '-id')
+        .values_list('id', 'external_id')
+    )
+    keep, duplicates = {}, []
+    for pk, external_id in rows.iterator(chunk_size=2000):
+        match = PHASE_KEY.match(external_id)
+        key = match.group(1) if match else external_id
+        if key in keep:
+            duplicates.append(pk)
+        else:
+            keep[key] = (pk, external_id)
+
+    for start in range(0, len(duplicates), 1000):
+        CelestialEvent.objects.filter(id__in=duplicates[start:start + 1000]).delete()
+    for key, (pk, external_id) in keep.items():
+        if key != external_id:
+            CelestialEvent.objects.filter(id=pk).update(external_id=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('astronomical_events', '0010_constellation_transition_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_moon_phases, migrations.RunPython.noop),
+    ]
@@ -89,6 +89,7 @@ class CelestialEvent(models.Model):
         db_table = 'celestial_events'
         indexes = [
             models.Index(fields=['date_time', 'event_type']),
+            models.Index(fields=['date_time', 'id']),
             models.Index(fields=['location', 'date_time']),
             models.Index(fields=['importance_level', 'date_time']),
             models.Index(fields=['is_featured']),
@@ -285,6 +286,10 @@ class SunData(models.Model):
     sunset = models.TimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # The unique (location_id, date) index also serves location + date range lookups
+        unique_together = ('location', 'date')
+
     def __str__(self):
         return f"{self.date} - Sunrise: {self.sunrise}, Sunset: {self.sunset}"
     
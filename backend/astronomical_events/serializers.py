@@ -120,6 +120,26 @@ class SunDataSerializer(serializers.ModelSerializer):
         return representation
     
 
+def time_until(moment, now=None):
+    """Relative description of moment ("in 3 days", "today", "2 days ago")"""
+    now = now or timezone.now()
+    if moment > now:
+        delta = moment - now
+        days = delta.days
+        hours = delta.seconds // 3600
+        if days > 0:
+            return f"in {days} days"
+        elif hours > 0:
+            return f"in {hours} hours"
+        return "soon"
+    days = (now - moment).days
+    if days == 0:
+        return "today"
+    elif days == 1:
+        return "yesterday"
+    return f"{days} days ago"
+
+
 class MoonPhaseSerializer(serializers.ModelSerializer):
     location_name = serializers.CharField(source='location.name', read_only=True)
     phase_display = serializers.CharField(source='get_phase_display', read_only=True)
@@ -155,28 +175,7 @@ class MoonPhaseSerializer(serializers.ModelSerializer):
         }
         representation['icon'] = icons.get(instance.phase, '🌙')
         
-        # Add relative time information
-        
-        now = timezone.now()
-        if instance.date_time > now:
-            delta = instance.date_time - now
-            days = delta.days
-            hours = delta.seconds // 3600
-            if days > 0:
-                representation['time_until'] = f"in {days} days"
-            elif hours > 0:
-                representation['time_until'] = f"in {hours} hours"
-            else:
-                representation['time_until'] = "soon"
-        else:
-            delta = now - instance.date_time
-            days = delta.days
-            if days == 0:
-                representation['time_until'] = "today"
-            elif days == 1:
-                representation['time_until'] = "yesterday"
-            else:
-                representation['time_until'] = f"{days} days ago"
+        representation['time_until'] = time_until(instance.date_time)
         
         return representation
 
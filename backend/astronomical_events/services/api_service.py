@@ -1,20 +1,22 @@
 from datetime import datetime
 import requests
 from django.conf import settings
-from ..models import SunData
+from .http_client import http_get
+from .sun_service import save_sun_data
 
 def fetch_sunrise_sunset(location, date_str):
+    """Remote fallback for sun_service: one sunrise-sunset.org request for one location and date"""
     url = settings.SUNRISE_SUNSET_URL  
     params = {
         "lat": float(location.latitude),
         "lng": float(location.longitude),
         "date": date_str,
-        "tzid": "Asia/Dubai",
+        "tzid": str(location.timezone),
         "formatted": 0  # ISO format with timezone info
     }
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = http_get(url, params=params, source='sunrise-sunset', timeout=10)
         response.raise_for_status()
         data = response.json()
 
@@ -22,16 +24,14 @@ def fetch_sunrise_sunset(location, date_str):
             print("API did not return OK status")
             return None
 
-        # Parse ISO 8601 UTC times
-        sunrise_utc = datetime.fromisoformat(data['results']['sunrise'])
-        sunset_utc = datetime.fromisoformat(data['results']['sunset'])
+        # Parse ISO 8601 times (in the location's timezone via tzid)
+        sunrise = datetime.fromisoformat(data['results']['sunrise'])
+        sunset = datetime.fromisoformat(data['results']['sunset'])
 
-        # Save to DB
-        SunData.objects.create(
-            date=date_str,
-            location=location,
-            sunrise=sunrise_utc.time(),
-            sunset=sunset_utc.time()
+        # Save to DB, replacing any existing row for this location and date
+        save_sun_data(
+            [{'date': sunrise.date(), 'sunrise': sunrise, 'sunset': sunset}],
+            location
         )
 
         return data['results']
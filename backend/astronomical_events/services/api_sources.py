@@ -0,0 +1,25 @@
+from functools import lru_cache
+from ..models import ApiSource
+
+KNOWN_SOURCES = {
+    'FarmSense': 'https://api.farmsense.net/v1/moonphases/',
+    'Skyfield': 'https://rhodesmill.org/skyfield/',
+    'AstronomyAPI': 'https://api.astronomyapi.com',
+    'Astronomy Library': 'https://github.com/cosinekitty/astronomy',
+}
+
+
+@lru_cache(maxsize=None)
+def get_api_source(name: str) -> ApiSource:
+    """
+    Resolve an ApiSource row on first use and cache it for the process.
+
+    Deleting or saving an ApiSource clears the cache (see invalidate_api_sources); call
+    get_api_source.cache_clear() when the database is reset (e.g. between tests).
+    """
+    return ApiSource.objects.get_or_create(name=name, defaults={'base_url': KNOWN_SOURCES[name]})[0]
+
+
+def invalidate_api_sources(sender=None, **kwargs):
+    """Forget cached rows; connected to ApiSource's post_save and post_delete signals"""
+    get_api_source.cache_clear()
@@ -0,0 +1,76 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+
+from .http_client import http_get
+
+# Parallel requests allowed per host; anything else gets HTTP_ASYNC_HOST_CONCURRENCY
+HOST_CONCURRENCY = {
+    'nominatim.openstreetmap.org': 1,
+    'api.farmsense.net': 8,
+    'api.astronomyapi.com': 4,
+    'maps.googleapis.com': 4,
+}
+
+_DONE = object()
+
+
+async def fetch_many(jobs: Iterable[Dict], emit) -> None:
+    """
+    Issue every job concurrently, at most HOST_CONCURRENCY[host] at a time per host,
+    and call emit((job, response, error)) as each one completes.
+
+    A job is a dict of http_get() keyword arguments (url, params, source, headers,
+    auth, timeout) plus any extra keys the caller wants back. Each request still
+    goes through http_get, so the disk cache, per-source rate limits and retries
+    apply; the blocking call runs on a thread pool sized to the total host limits.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return
+    hosts = {urlsplit(job['url']).netloc for job in jobs}
+    limits = {host: HOST_CONCURRENCY.get(host, settings.HTTP_ASYNC_HOST_CONCURRENCY) for host in hosts}
+    semaphores = {host: asyncio.Semaphore(limit) for host, limit in limits.items()}
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=sum(limits.values())) as executor:
+        async def run(job):
+            request = {key: job[key] for key in ('params', 'source', 'headers', 'auth', 'timeout') if key in job}
+            async with semaphores[urlsplit(job['url']).netloc]:
+                try:
+                    response = await loop.run_in_executor(executor, lambda: http_get(job['url'], **request))
+                    emit((job, response, None))
+                except Exception as e:
+                    emit((job, None, e))
+
+        await asyncio.gather(*(run(job) for job in jobs))
+
+
+def iter_fetch(jobs: Iterable[Dict]) -> Iterator[Tuple[Dict, requests.Response, Exception]]:
+    """
+    Synchronous bridge to fetch_many(): yields (job, response, error) in completion
+    order while the remaining requests are still in flight, so callers can feed
+    results straight into ingest_events().
+    """
+    results = queue.Queue()
+
+    def run():
+        try:
+            asyncio.run(fetch_many(jobs, results.put))
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=run, name='async-fetch', daemon=True)
+    thread.start()
+    while True:
+        item = results.get()
+        if item is _DONE:
+            break
+        yield item
+    thread.join()
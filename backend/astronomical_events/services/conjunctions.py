@@ -0,0 +1,149 @@
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .constellations import PLANETS
+from .ephemeris import get_ephemeris, get_timescale
+
+GOLDEN = (np.sqrt(5) - 1) / 2
+
+CATALOGUE_BODIES = ['Moon'] + PLANETS
+
+
+def resolve_body(eph, name: str):
+    """Look up `name` in the kernel, falling back to its barycenter (de440s has no Mars or outer-planet bodies)"""
+    name = name.lower()
+    for candidate in (name, f"{name} barycenter"):
+        if candidate in eph:
+            return eph[candidate]
+    raise KeyError(name)
+
+
+def _unit_vectors(observer, body) -> np.ndarray:
+    position = np.asarray(observer.observe(body).position.au)
+    return position / np.linalg.norm(position, axis=0)
+
+
+def _separation_deg(u1: np.ndarray, u2: np.ndarray) -> np.ndarray:
+    """Angle between unit vectors along axis -2 (xyz); atan2 keeps precision near zero separation"""
+    cross = np.linalg.norm(np.cross(u1, u2, axis=-2), axis=-2)
+    dot = np.sum(u1 * u2, axis=-2)
+    return np.degrees(np.arctan2(cross, dot))
+
+
+def sample_times(start_dt: datetime, end_dt: datetime, step_minutes: int):
+    """Skyfield Time array from start_dt to end_dt (inclusive) every step_minutes"""
+    ts = get_timescale()
+    count = int((end_dt - start_dt).total_seconds() // (step_minutes * 60)) + 1
+    minutes = start_dt.minute + np.arange(count) * step_minutes
+    return ts.utc(start_dt.year, start_dt.month, start_dt.day, start_dt.hour, minutes)
+
+
+def refine_minima(earth, bodies: Sequence, first: np.ndarray, second: np.ndarray,
+                  lo: np.ndarray, hi: np.ndarray, tolerance_seconds: float = 0.1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Golden-section search for the separation minimum of bodies[first[k]] and
+    bodies[second[k]] inside every [lo[k], hi[k]] bracket (TT Julian dates) at
+    once. Each iteration observes every involved body once over all brackets.
+    Returns (tt, separation_deg) arrays.
+    """
+    ts = get_timescale()
+    involved = np.union1d(first, second)
+    columns = np.arange(len(lo))
+
+    def separation(tt):
+        observer = earth.at(ts.tt_jd(tt))
+        vectors = np.empty((len(bodies), 3, len(tt)))
+        for k in involved:
+            vectors[k] = _unit_vectors(observer, bodies[k])
+        return _separation_deg(vectors[first, :, columns].T, vectors[second, :, columns].T)
+
+    tolerance = tolerance_seconds / 86400.0
+    c = hi - GOLDEN * (hi - lo)
+    d = lo + GOLDEN * (hi - lo)
+    fc, fd = separation(c), separation(d)
+    while np.max(hi - lo) > tolerance:
+        left = fc < fd
+        hi = np.where(left, d, hi)
+        lo = np.where(left, lo, c)
+        probe = np.where(left, hi - GOLDEN * (hi - lo), lo + GOLDEN * (hi - lo))
+        fprobe = separation(probe)
+        c, fc, d, fd = (
+            np.where(left, probe, d), np.where(left, fprobe, fd),
+            np.where(left, c, probe), np.where(left, fc, fprobe),
+        )
+
+    tt = (lo + hi) / 2
+    return tt, separation(tt)
+
+
+def find_conjunctions(pairs: Sequence[Tuple[str, str]], start_dt: datetime, end_dt: datetime,
+                      step_minutes: int = 60, ephemeris: str = 'de440s',
+                      max_separation: float = None) -> Dict[Tuple[str, str], List[Tuple[datetime, float]]]:
+    """
+    Local minima of geocentric separation for each pair between start_dt and end_dt.
+
+    Every body is observed once over a shared Time grid and all pair separations
+    come from one broadcast over the stacked (body, xyz, time) array. Sampled
+    minima of all pairs are refined together to sub-second precision; with
+    `max_separation` (degrees) only closer approaches are kept.
+    """
+    ts = get_timescale()
+    eph = get_ephemeris(ephemeris)
+    earth = eph['earth']
+
+    names = sorted({name for pair in pairs for name in pair})
+    index = {name: i for i, name in enumerate(names)}
+    bodies = [resolve_body(eph, name) for name in names]
+    first = np.array([index[pair[0]] for pair in pairs], dtype=int)
+    second = np.array([index[pair[1]] for pair in pairs], dtype=int)
+
+    t = sample_times(start_dt, end_dt, step_minutes)
+    observer = earth.at(t)
+    vectors = np.stack([_unit_vectors(observer, body) for body in bodies])
+    sep = _separation_deg(vectors[first], vectors[second])  # (pairs, time)
+
+    inner = sep[:, 1:-1]
+    pair_ids, steps = np.nonzero((inner < sep[:, :-2]) & (inner <= sep[:, 2:]))
+    steps += 1
+
+    results = {tuple(pair): [] for pair in pairs}
+    if not len(steps):
+        return results
+
+    tt, separation = refine_minima(
+        earth, bodies, first[pair_ids], second[pair_ids], t.tt[steps - 1], t.tt[steps + 1],
+    )
+    moments = ts.tt_jd(tt).utc_datetime()
+    for pair_id, moment, value in zip(pair_ids, moments, separation):
+        if max_separation is None or value <= max_separation:
+            results[tuple(pairs[pair_id])].append((moment, float(value)))
+    return results
+
+
+def find_all_conjunctions(start_dt: datetime, end_dt: datetime, max_separation: float,
+                          step_minutes: int = 60, ephemeris: str = 'de440s',
+                          body_names: Sequence[str] = CATALOGUE_BODIES) -> Dict[Tuple[str, str], List[Tuple[datetime, float]]]:
+    """Conjunctions closer than max_separation degrees between every pair of body_names"""
+    pairs = list(combinations(body_names, 2))
+    return find_conjunctions(pairs, start_dt, end_dt, step_minutes, ephemeris, max_separation)
+
+
+def conjunction_record(body1: str, body2: str, moment: datetime, separation: float, ephemeris: str) -> dict:
+    """CelestialEvent field values for a conjunction of body1 and body2"""
+    return {
+        'name': f"{body1} and {body2} conjunction",
+        'event_type': 'conjunction',
+        'date_time': moment,
+        'description': f"{body1} passes {separation:.2f}° from {body2}",
+        'external_id': f"conjunction_{body1}_{body2}_{moment:%Y%m%d}",
+        'raw_api_data': {
+            'bodies': [body1, body2],
+            'separation_degrees': separation,
+            'ephemeris': ephemeris,
+        },
+        'importance_level': 3 if separation < 1.0 else 2,
+        'viewing_difficulty': 'easy',
+    }
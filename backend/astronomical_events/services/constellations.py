@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from skyfield.api import load_constellation_map, load_constellation_names
+
+from .ephemeris import get_ephemeris, get_timescale
+
+J2000 = 2451545.0  # Julian date of 2000-01-01 12:00 UT
+J2000_DATETIME = datetime(2000, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+PLANETS = ['Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn', 'Uranus', 'Neptune']
+
+# Ephemeris targets in de421 (outer planets only have barycenters)
+BODY_TARGETS = {
+    'Sun': 'sun',
+    'Moon': 'moon',
+    'Mercury': 'mercury',
+    'Venus': 'venus',
+    'Mars': 'mars',
+    'Jupiter': 'jupiter barycenter',
+    'Saturn': 'saturn barycenter',
+    'Uranus': 'uranus barycenter',
+    'Neptune': 'neptune barycenter',
+}
+
+_constellation_at = None
+_constellation_names = None
+
+
+def _constellation_lookup():
+    global _constellation_at, _constellation_names
+    if _constellation_at is None:
+        _constellation_names = dict(load_constellation_names())
+        _constellation_at = load_constellation_map()
+    return _constellation_at, _constellation_names
+
+
+def find_constellation_transitions(body_names: Sequence[str], start_ut: float, days: float,
+                                   increment: float = 0.1, tolerance_seconds: float = 0.1) -> Dict[str, List[dict]]:
+    """
+    Find every constellation boundary crossing for `body_names`.
+
+    Geocentric astrometric positions are evaluated for all bodies over one
+    `increment`-day Time grid, mapped to constellations in bulk against Skyfield's
+    precomputed boundary table, and crossings are located by diffing the ID array.
+    Only the crossing intervals are then refined, all together, by bisection.
+    `start_ut` is in days since J2000 (astronomy.Time.ut).
+    """
+    ts = get_timescale()
+    eph = get_ephemeris('de421')
+    earth = eph['earth']
+    constellation_at, _ = _constellation_lookup()
+
+    jd = J2000 + start_ut + np.arange(0.0, days + increment, increment)
+    jd = jd[jd <= J2000 + start_ut + days]
+    observer = earth.at(ts.ut1_jd(jd))
+
+    transitions = {}
+    for body_name in body_names:
+        target = eph[BODY_TARGETS[body_name]]
+        ids = constellation_at(observer.observe(target))
+        crossings = np.flatnonzero(ids[1:] != ids[:-1])
+        transitions[body_name] = _refine_crossings(
+            target, jd[crossings], jd[crossings + 1], ids[crossings], ids[crossings + 1],
+            tolerance_seconds / 86400.0,
+        )
+    return transitions
+
+
+def _refine_crossings(target, start_jd, end_jd, old_ids, end_ids, tolerance) -> List[dict]:
+    """Bisect all crossing intervals at once; intervals hiding a second crossing are re-queued"""
+    ts = get_timescale()
+    earth = get_ephemeris('de421')['earth']
+    constellation_at, names = _constellation_lookup()
+
+    found = []
+    while len(start_jd):
+        lo, hi = start_jd, end_jd
+        while np.max(hi - lo) > tolerance:
+            mid = (lo + hi) / 2
+            same = constellation_at(earth.at(ts.ut1_jd(mid)).observe(target)) == old_ids
+            lo = np.where(same, mid, lo)
+            hi = np.where(same, hi, mid)
+
+        position = earth.at(ts.ut1_jd(hi)).observe(target)
+        new_ids = constellation_at(position)
+        ra, dec, _ = position.radec()
+        for i in range(len(hi)):
+            found.append({
+                'ut': float(hi[i] - J2000),
+                'old': (str(old_ids[i]), names[old_ids[i]]),
+                'new': (str(new_ids[i]), names[new_ids[i]]),
+                'right_ascension': float(ra.hours[i]),
+                'declination': float(dec.degrees[i]),
+            })
+
+        # The body changed constellation again before the end of its coarse step
+        pending = new_ids != end_ids
+        start_jd, end_jd = hi[pending], end_jd[pending]
+        old_ids, end_ids = new_ids[pending], end_ids[pending]
+    return sorted(found, key=lambda transition: transition['ut'])
+
+
+def transition_external_id(body_name: str, old_symbol: str, new_symbol: str, date_time: datetime) -> str:
+    """
+    One key per crossing whichever engine, kernel or grid found it: the instant
+    itself moves by seconds between runs, its UTC date and the boundary do not.
+    """
+    return f"constellation_{body_name}_{old_symbol}_{new_symbol}_{date_time.astimezone(timezone.utc):%Y%m%d}"
+
+
+def transition_record(body_name: str, ut: float, old: Tuple[str, str], new: Tuple[str, str],
+                      coordinates: dict) -> dict:
+    """Field values for a body entering a new constellation at `ut` days since J2000"""
+    coordinates = {'constellation_symbol': new[0], **coordinates}
+    date_time = J2000_DATETIME + timedelta(days=ut)
+    record = {
+        'name': f"{body_name} enters {new[1]}",
+        'event_type': 'planetary_event' if body_name in PLANETS else 'conjunction',
+        'date_time': date_time,
+        'description': f"{body_name} leaves {old[1]} and enters {new[1]}",
+        'external_id': transition_external_id(body_name, old[0], new[0], date_time),
+        'raw_api_data': {
+            'body': body_name,
+            'transition_time_ut': ut,
+            'old_constellation': {'symbol': old[0], 'name': old[1]},
+            'new_constellation': {'symbol': new[0], 'name': new[1]}
+        },
+        'coordinates': coordinates,
+        'importance_level': 2,
+        'viewing_difficulty': 'easy'
+    }
+
+    # PlanetaryEvent fields for planets
+    if body_name in PLANETS:
+        record.update({
+            'planet_name': body_name,
+            'constellation': new[1],
+            'apparent_magnitude': 0.0,
+            'right_ascension': coordinates.get('right_ascension', 0.0),
+            'declination': coordinates.get('declination', 0.0)
+        })
+    return record
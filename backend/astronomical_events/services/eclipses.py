@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from astronomy import (
+    EclipseKind, NextGlobalSolarEclipse, NextLocalSolarEclipse, NextLunarEclipse, Observer,
+    SearchGlobalSolarEclipse, SearchLocalSolarEclipse, SearchLunarEclipse, Time,
+)
+from skyfield.api import wgs84
+
+from .constellations import J2000_DATETIME
+from .ephemeris import get_ephemeris, get_timescale
+
+KINDS = {
+    EclipseKind.Penumbral: 'penumbral',
+    EclipseKind.Partial: 'partial',
+    EclipseKind.Annular: 'annular',
+    EclipseKind.Total: 'total',
+}
+
+# Contact names in chronological order, matching the Eclipse *_altitude fields where they exist
+CONTACTS = ['penumbral_begin', 'partial_begin', 'total_begin', 'peak', 'total_end', 'partial_end', 'penumbral_end']
+
+
+def _time(moment: datetime) -> Time:
+    return Time((moment - J2000_DATETIME).total_seconds() / 86400.0)
+
+
+def _datetime(t: Time) -> datetime:
+    return J2000_DATETIME + timedelta(days=t.ut)
+
+
+def find_lunar_eclipses(start: datetime, end: datetime) -> List[Dict]:
+    """Every lunar eclipse peaking between start and end, with contact times derived from the semi-durations"""
+    eclipses = []
+    info = SearchLunarEclipse(_time(start))
+    while _datetime(info.peak) < end:
+        peak = _datetime(info.peak)
+        contacts = {'peak': peak}
+        for stage, semi_duration in (('penumbral', info.sd_penum), ('partial', info.sd_partial), ('total', info.sd_total)):
+            if semi_duration > 0:
+                contacts[f'{stage}_begin'] = peak - timedelta(minutes=semi_duration)
+                contacts[f'{stage}_end'] = peak + timedelta(minutes=semi_duration)
+        eclipses.append({
+            'body': 'lunar',
+            'kind': KINDS[info.kind],
+            'peak': peak,
+            'obscuration': info.obscuration,
+            'contacts': contacts,
+            'duration_seconds': int(info.sd_total * 120) if info.sd_total > 0 else None,
+        })
+        info = NextLunarEclipse(info.peak)
+    return eclipses
+
+
+def find_global_solar_eclipses(start: datetime, end: datetime) -> List[Dict]:
+    """Every solar eclipse peaking between start and end; total/annular ones carry the peak's ground position"""
+    eclipses = []
+    info = SearchGlobalSolarEclipse(_time(start))
+    while _datetime(info.peak) < end:
+        peak = _datetime(info.peak)
+        eclipses.append({
+            'body': 'solar',
+            'kind': KINDS[info.kind],
+            'peak': peak,
+            'obscuration': info.obscuration,
+            'contacts': {'peak': peak},
+            'duration_seconds': None,
+            'peak_latitude': None if np.isnan(info.latitude) else info.latitude,
+            'peak_longitude': None if np.isnan(info.longitude) else info.longitude,
+        })
+        info = NextGlobalSolarEclipse(info.peak)
+    return eclipses
+
+
+def find_local_solar_eclipses(latitude: float, longitude: float, elevation: float,
+                              start: datetime, end: datetime) -> List[Dict]:
+    """Solar eclipses seen from one site, with the Sun's altitude at every contact"""
+    observer = Observer(latitude, longitude, elevation or 0)
+    eclipses = []
+    info = SearchLocalSolarEclipse(_time(start), observer)
+    while _datetime(info.peak.time) < end:
+        contacts, altitudes = {}, {}
+        for name in ('partial_begin', 'total_begin', 'peak', 'total_end', 'partial_end'):
+            event = getattr(info, name)
+            if event is not None:
+                contacts[name] = _datetime(event.time)
+                altitudes[name] = event.altitude
+        duration = None
+        if 'total_begin' in contacts and 'total_end' in contacts:
+            duration = int((contacts['total_end'] - contacts['total_begin']).total_seconds())
+        eclipses.append({
+            'body': 'solar',
+            'kind': KINDS[info.kind],
+            'peak': contacts['peak'],
+            'obscuration': info.obscuration,
+            'contacts': contacts,
+            'altitudes': altitudes,
+            'duration_seconds': duration,
+        })
+        info = NextLocalSolarEclipse(info.peak.time, observer)
+    return eclipses
+
+
+def lunar_contact_altitudes(eclipses: List[Dict], latitude: float, longitude: float,
+                            elevation: float) -> List[Dict[str, float]]:
+    """The Moon's apparent altitude at every contact of every eclipse, from one Skyfield call per site"""
+    names = [(i, name) for i, eclipse in enumerate(eclipses) for name in eclipse['contacts']]
+    if not names:
+        return [{} for _ in eclipses]
+    ts = get_timescale()
+    eph = get_ephemeris('de440s')  # 1849-2150, wide enough to precompute a century
+    site = eph['earth'] + wgs84.latlon(latitude, longitude, elevation_m=elevation or 0)
+    t = ts.from_datetimes([eclipses[i]['contacts'][name] for i, name in names])
+    altitude, _, _ = site.at(t).observe(eph['moon']).apparent().altaz()
+
+    altitudes = [{} for _ in eclipses]
+    for (i, name), degrees in zip(names, altitude.degrees):
+        altitudes[i][name] = float(degrees)
+    return altitudes
+
+
+def event_name(eclipse: Dict) -> str:
+    """AstronomyAPI-style event name, e.g. total_lunar_eclipse"""
+    return f"{eclipse['kind']}_{eclipse['body']}_eclipse"
+
+
+def eclipse_record(eclipse: Dict, altitudes: Optional[Dict[str, float]] = None,
+                   latitude: float = None, longitude: float = None) -> Dict:
+    """
+    Eclipse field values. Without a site this is the shared (global) eclipse;
+    with one, the external_id and altitude fields are those of that site.
+    """
+    kind = eclipse['kind']
+    body = 'Moon' if eclipse['body'] == 'lunar' else 'Sun'
+    peak_day = eclipse['peak'].date().isoformat()
+    external_id = f"{event_name(eclipse)}_{peak_day}"
+    if latitude is not None:
+        external_id = f"{external_id}_{latitude}_{longitude}"
+
+    obscuration = eclipse['obscuration']
+    description = f"{kind.title()} {eclipse['body']} eclipse"
+    if obscuration is not None:
+        description += f" with {obscuration * 100:.1f}% obscuration"
+    description += "."
+    altitudes = altitudes or {}
+    if 'peak' in altitudes:
+        position = 'above' if altitudes['peak'] > 0 else 'below'
+        description += f" At peak the {body} is {abs(altitudes['peak']):.1f}° {position} the horizon."
+
+    coordinates = {}
+    if latitude is not None:
+        coordinates = {'latitude': latitude, 'longitude': longitude}
+    elif eclipse.get('peak_latitude') is not None:
+        coordinates = {'latitude': eclipse['peak_latitude'], 'longitude': eclipse['peak_longitude']}
+
+    contacts = eclipse['contacts']
+    return {
+        'name': f"{kind.title()} {eclipse['body'].title()} Eclipse",
+        'event_type': 'eclipse',
+        'date_time': eclipse['peak'],
+        'end_time': max(contacts.values()),
+        'description': description,
+        'external_id': external_id,
+        'raw_api_data': {
+            'type': event_name(eclipse),
+            'contacts': {name: moment.isoformat() for name, moment in contacts.items()},
+            'altitudes': altitudes,
+        },
+        'eclipse_type': f"{eclipse['body']}_{kind}",
+        'obscuration_percentage': obscuration * 100 if obscuration is not None else None,
+        'coordinates': coordinates,
+        'importance_level': 3 if kind == 'total' else 2,
+        'partial_begin_altitude': altitudes.get('partial_begin'),
+        'total_begin_altitude': altitudes.get('total_begin'),
+        'peak_altitude': altitudes.get('peak'),
+        'total_end_altitude': altitudes.get('total_end'),
+        'partial_end_altitude': altitudes.get('partial_end'),
+        'duration_seconds': eclipse['duration_seconds'],
+    }
+
+
+def visibility_record(eclipse: Dict, altitudes: Dict[str, float]) -> Dict:
+    """VisibilityDetail values for one site: visible while the body is above the horizon at any contact"""
+    above = sorted(
+        eclipse['contacts'][name] for name, altitude in altitudes.items() if altitude > 0
+    )
+    body = 'Moon' if eclipse['body'] == 'lunar' else 'Sun'
+    notes = ", ".join(
+        f"{name} {altitudes[name]:.1f}°" for name in CONTACTS if name in altitudes
+    )
+    return {
+        'visible': bool(above),
+        'best_viewing_start': above[0] if above else None,
+        'best_viewing_end': above[-1] if above else None,
+        'notes': f"{body} altitude at {notes}" if notes else "",
+    }
@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import Dict
+
+from django.conf import settings
+from skyfield.api import Loader
+
+SUPPORTED_EPHEMERIDES = ('de421.bsp', 'de440s.bsp')
+
+_lock = threading.Lock()
+_loader = None
+_timescale = None
+_kernels = {}
+_stats = {}
+
+
+def _normalize_name(name: str) -> str:
+    name = (name or settings.SKYFIELD_EPHEMERIS).lower()
+    if not name.endswith('.bsp'):
+        name = f"{name}.bsp"
+    if name not in SUPPORTED_EPHEMERIDES:
+        raise ValueError(
+            f"Unsupported ephemeris '{name}'. Choose one of: {', '.join(SUPPORTED_EPHEMERIDES)}"
+        )
+    return name
+
+
+def _get_loader() -> Loader:
+    global _loader
+    if _loader is None:
+        _loader = Loader(str(settings.SKYFIELD_DATA_DIR), verbose=False)
+    return _loader
+
+
+def _record(key: str, loaded: bool, seconds: float = 0.0):
+    entry = _stats.setdefault(key, {'loads': 0, 'hits': 0, 'load_seconds': 0.0})
+    if loaded:
+        entry['loads'] += 1
+        entry['load_seconds'] += seconds
+    else:
+        entry['hits'] += 1
+
+
+def get_timescale():
+    """Return the process-wide Skyfield timescale, building it on first use."""
+    global _timescale
+    with _lock:
+        if _timescale is None:
+            start = time.perf_counter()
+            _timescale = _get_loader().timescale()
+            _record('timescale', True, time.perf_counter() - start)
+        else:
+            _record('timescale', False)
+        return _timescale
+
+
+def get_ephemeris(name: str = None):
+    """
+    Return the shared SpiceKernel for `name` (de421 or de440s).
+
+    The kernel is opened once per process; jplephem memory-maps the segment
+    data so later lookups cost nothing but a dictionary access.
+    """
+    name = _normalize_name(name)
+    with _lock:
+        kernel = _kernels.get(name)
+        if kernel is None:
+            start = time.perf_counter()
+            kernel = _get_loader()(name)
+            _kernels[name] = kernel
+            _record(name, True, time.perf_counter() - start)
+        else:
+            _record(name, False)
+        return kernel
+
+
+def ephemeris_stats() -> Dict[str, Dict]:
+    """Snapshot of load counts, cache hits and seconds spent loading, per resource."""
+    with _lock:
+        return {key: dict(value) for key, value in _stats.items()}
+
+
+def reset_ephemeris_registry():
+    """Drop every cached kernel and counter (used after a worker fork)."""
+    global _loader, _timescale
+    with _lock:
+        for kernel in _kernels.values():
+            kernel.close()
+        _kernels.clear()
+        _stats.clear()
+        _loader = None
+        _timescale = None
@@ -1,5 +1,6 @@
 import requests
-from skyfield.api import load,wgs84
+from .ephemeris import get_ephemeris, get_timescale
+from .http_client import http_get
 import math
 import numpy as np
 from datetime import datetime
@@ -10,9 +11,9 @@ M = 1.9885e30    # mass of the sun in kg
 AU = 1.496e11    # 1 Astronomical Unit in meters (semi-major axis of Earth's orbit)
 
 def fetchEarthPosition(year: int):
-    api_url = f'https://aa.usno.navy.mil/api/seasons?year={year}'
+    api_url = 'https://aa.usno.navy.mil/api/seasons'
     try:
-        response = requests.get(api_url, timeout=10)
+        response = http_get(api_url, params={'year': year}, source='usno', timeout=10)
         response.raise_for_status()
         data = response.json()
         return data['data']
@@ -20,25 +21,66 @@ def fetchEarthPosition(year: int):
         print(f"Request failed: {e}")
         return []
 
-def get_earth_sun_distance(date_str):
-    ts = load.timescale()
-    t = ts.utc(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]))
-    planets = load('de421.bsp')
+def _times_from_dates(date_strs):
+    ts = get_timescale()
+    years = [int(d[:4]) for d in date_strs]
+    months = [int(d[5:7]) for d in date_strs]
+    days = [int(d[8:10]) for d in date_strs]
+    return ts.utc(years, months, days)
+
+def compute_orbit_parameters(t):
+    """
+    Evaluate Earth's orbital state for every instant in the Skyfield Time array `t`
+    with a single observe() call; each value comes back as a NumPy array. As
+    before, the distance is the apparent one and the orbital elements are astrometric.
+    """
+    planets = get_ephemeris('de421')
     earth, sun = planets['earth'], planets['sun']
-    astrometric = earth.at(t).observe(sun).apparent()
-    distance_km = astrometric.distance().km
-    return round(distance_km / 1_000_000, 4), distance_km * 1000  
+    astrometric = earth.at(t).observe(sun)
+
+    day_sec = 86400
+    mu = 1.32712440018e20  # Sun's gravitational parameter
+
+    distance_m = np.atleast_1d(astrometric.apparent().distance().km) * 1000
+    r_vec = np.atleast_2d(np.asarray(astrometric.position.au).T) * AU
+    v_vec = np.atleast_2d(np.asarray(astrometric.velocity.au_per_d).T) * AU / day_sec
+
+    r_mag = np.linalg.norm(r_vec, axis=1)
+    h_vec = np.cross(r_vec, v_vec)
+    e_vec = (np.cross(v_vec, h_vec) / mu) - (r_vec / r_mag[:, None])
+    e_mag = np.linalg.norm(e_vec, axis=1)
+
+    cos_nu = np.clip(np.einsum('ij,ij->i', e_vec, r_vec) / (e_mag * r_mag), -1.0, 1.0)
+    nu_rad = np.arccos(cos_nu)
+    nu_rad = np.where(np.einsum('ij,ij->i', r_vec, v_vec) < 0, 2 * np.pi - nu_rad, nu_rad)
+
+    x, y, _ = np.asarray(astrometric.ecliptic_position().au).reshape(3, -1)
+    longitude_deg = np.degrees(np.arctan2(y, x)) % 360
+
+    return {
+        'distance_m': distance_m,
+        'distance_million_km': np.round(distance_m / 1e9, 4),
+        'orbital_speed_km_s': calculate_orbital_speed(distance_m),
+        'solar_irradiance_w_m2': calculate_solar_irradiance(distance_m),
+        'eccentricity': np.round(e_mag, 5),
+        'heliocentric_longitude': np.round(longitude_deg, 3),
+        'true_anomaly': np.round(np.degrees(nu_rad), 3),
+    }
+
+def get_earth_sun_distance(date_str):
+    orbit = compute_orbit_parameters(_times_from_dates([date_str]))
+    return float(orbit['distance_million_km'][0]), float(orbit['distance_m'][0])
 
 def calculate_orbital_speed(r_meters):
-    # v = sqrt(G * M * (2/r - 1/a))
-    v = math.sqrt(G * M * (2 / r_meters - 1 / AU))
-    return round(v / 1000, 2) 
+    # v = sqrt(G * M * (2/r - 1/a)); r_meters may be a NumPy array
+    v = np.sqrt(G * M * (2 / r_meters - 1 / AU))
+    return np.round(v / 1000, 2)
 
 def calculate_solar_irradiance(r_meters):
     I_0 = 1361  # W/m²
     r_0 = 1.496e11  # meters (1 AU)
     irradiance = I_0 * (r_0 / r_meters) ** 2
-    return round(irradiance, 2) 
+    return np.round(irradiance, 2)
 
 
 def get_season_from_date(month: int, day: int) -> str:
@@ -100,52 +142,10 @@ def generate_event_overview(event):
         )
 
 def get_orbital_eccentricity(date_str):
-    ts = load.timescale()
-    t = ts.utc(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]))
-    planets = load('de421.bsp')
-
-    earth = planets['earth']
-    sun = planets['sun']
-
-    astrometric = earth.at(t).observe(sun)
-    pos_au = astrometric.position.au  
-    vel_au_per_d = astrometric.velocity.au_per_d  
-
-    AU = 1.496e11  
-    day_sec = 86400 
-
-    r_vec = np.array(pos_au) * AU  
-    v_vec = np.array(vel_au_per_d) * AU / day_sec 
-
-    mu = 1.32712440018e20  
-
-    h_vec = np.cross(r_vec, v_vec)
-    e_vec = (np.cross(v_vec, h_vec) / mu) - (r_vec / np.linalg.norm(r_vec))
-    eccentricity = np.linalg.norm(e_vec)
-    return round(eccentricity, 5)
+    return float(compute_orbit_parameters(_times_from_dates([date_str]))['eccentricity'][0])
 
 def get_heliocentric_longitude(date_str):
-    ts = load.timescale()
-    t = ts.utc(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]))
-    planets = load('de421.bsp')
-
-    earth = planets['earth']
-    sun = planets['sun']
-
-    # Position of Earth relative to Sun
-    astrometric = earth.at(t).observe(sun)
-    # ecliptic position
-    ecliptic_pos = astrometric.ecliptic_position()
-
-    x, y, z = ecliptic_pos.au  # AU in ecliptic cartesian coords
-
-    # Computed longitude as arctangent(y/x) in degrees, normalized to 0-360°
-    longitude_rad = math.atan2(y, x)
-    longitude_deg = math.degrees(longitude_rad)
-    if longitude_deg < 0:
-        longitude_deg += 360
-
-    return round(longitude_deg, 3)
+    return float(compute_orbit_parameters(_times_from_dates([date_str]))['heliocentric_longitude'][0])
 
 def calculate_solar_declination(date_str):
     date_obj = datetime.strptime(date_str, "%Y-%m-%d")
@@ -167,57 +167,38 @@ def calculate_day_length_equator(solar_declination_deg):
     return round(day_length, 3)
 
 def calculate_true_anomaly(date_str):
-    ts = load.timescale()
-    t = ts.utc(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]))
-    planets = load('de421.bsp')
-
-    earth = planets['earth']
-    sun = planets['sun']
-
-    astrometric = earth.at(t).observe(sun)
-    pos_au = np.array(astrometric.position.au)
-    vel_au_per_d = np.array(astrometric.velocity.au_per_d)
-
-    AU = 1.496e11
-    day_sec = 86400
-
-    r_vec = pos_au * AU  
-    v_vec = vel_au_per_d * AU / day_sec  
-
-    mu = 1.32712440018e20  # Sun's gravitational parameter
-
-    h_vec = np.cross(r_vec, v_vec)
-    e_vec = (np.cross(v_vec, h_vec) / mu) - (r_vec / np.linalg.norm(r_vec))
-    e_mag = np.linalg.norm(e_vec)
-
-    # True anomaly calculation
-    dot_er = np.dot(e_vec, r_vec)
-    r_mag = np.linalg.norm(r_vec)
-    cos_nu = dot_er / (e_mag * r_mag)
-    cos_nu = np.clip(cos_nu, -1.0, 1.0) 
-    nu_rad = math.acos(cos_nu)
-
-    if np.dot(r_vec, v_vec) < 0:
-        nu_rad = 2 * math.pi - nu_rad
-
-    return round(math.degrees(nu_rad), 3)
+    return float(compute_orbit_parameters(_times_from_dates([date_str]))['true_anomaly'][0])
 
 
 def get_annotated_earth_positions(year: int):
-    events = fetchEarthPosition(year)
-    for event in events:
-        date_str = f"{event['year']}-{str(event['month']).zfill(2)}-{str(event['day']).zfill(2)}"
-        distance_million_km, r_meters = get_earth_sun_distance(date_str)
-        event['distance_million_km'] = distance_million_km
-        event['orbital_speed_km_s'] = calculate_orbital_speed(r_meters)
+    return annotate_earth_events(fetchEarthPosition(year))
+
+def get_annotated_earth_positions_range(start_year: int, end_year: int):
+    events = []
+    for year in range(start_year, end_year + 1):
+        events.extend(fetchEarthPosition(year))
+    return annotate_earth_events(events)
+
+def annotate_earth_events(events):
+    """Annotate USNO season events in place, evaluating every instant in one array pass."""
+    if not events:
+        return events
+
+    # Evaluated at 00:00 UTC of each event's date, as the per-event helpers always were
+    date_strs = [
+        f"{event['year']}-{str(event['month']).zfill(2)}-{str(event['day']).zfill(2)}" for event in events
+    ]
+    orbit = compute_orbit_parameters(_times_from_dates(date_strs))
+    for i, (event, date_str) in enumerate(zip(events, date_strs)):
+        event['distance_million_km'] = float(orbit['distance_million_km'][i])
+        event['orbital_speed_km_s'] = float(orbit['orbital_speed_km_s'][i])
         event['season'] = get_season_from_date(event['month'], event['day'])
         event['overview'] = generate_event_overview(event)
-        event['solar_irradiance_w_m2'] = calculate_solar_irradiance(r_meters)
-        event['eccentricity'] = get_orbital_eccentricity(date_str)
-        event['heliocentric_longitude'] = get_heliocentric_longitude(date_str)
+        event['solar_irradiance_w_m2'] = float(orbit['solar_irradiance_w_m2'][i])
+        event['eccentricity'] = float(orbit['eccentricity'][i])
+        event['heliocentric_longitude'] = float(orbit['heliocentric_longitude'][i])
         event['solar_declination'] = calculate_solar_declination(date_str)
         event['day_length_equator'] = calculate_day_length_equator(event['solar_declination'])
-        event['true_anomaly'] = calculate_true_anomaly(date_str)
+        event['true_anomaly'] = float(orbit['true_anomaly'][i])
  
     return events
-
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+DAY = 24 * 3600
+
+# Per-source politeness and freshness: minimum seconds between live requests and cache TTL
+SOURCES = {
+    'farmsense': {'min_interval': 0.0, 'ttl': 365 * DAY},
+    'ipgeolocation': {'min_interval': 0.0, 'ttl': 3600},
+    'sunrise-sunset': {'min_interval': 0.0, 'ttl': 365 * DAY},
+    'usno': {'min_interval': 0.0, 'ttl': 30 * DAY},
+    'astronomyapi': {'min_interval': 0.0, 'ttl': 30 * DAY},
+    'nominatim': {'min_interval': 1.0, 'ttl': 30 * DAY},  # Nominatim usage policy: 1 request/second
+    'google-elevation': {'min_interval': 0.0, 'ttl': 365 * DAY},
+}
+DEFAULT_POLICY = {'min_interval': 0.0, 'ttl': DAY}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Longest single wait between retries, whatever the server asks for in Retry-After
+MAX_BACKOFF_SECONDS = 30
+
+_lock = threading.Lock()
+_sessions = {}
+_last_request = {}
+_source_locks = {}
+_stats = {}
+
+
+def _session_for(url: str) -> requests.Session:
+    """Keep-alive session per scheme://host"""
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            session.mount(host, HTTPAdapter(pool_connections=1, pool_maxsize=settings.HTTP_POOL_SIZE))
+            _sessions[host] = session
+        return session
+
+
+def _throttle(source: str, min_interval: float):
+    """Block until at least min_interval seconds have passed since the source's previous live request"""
+    if not min_interval:
+        return
+    with _lock:
+        source_lock = _source_locks.setdefault(source, threading.Lock())
+    with source_lock:
+        wait = _last_request.get(source, 0.0) + min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request[source] = time.monotonic()
+
+
+def _count(source: str, key: str):
+    with _lock:
+        entry = _stats.setdefault(source, {'hits': 0, 'misses': 0, 'retries': 0})
+        entry[key] += 1
+
+
+def cache_key(method: str, url: str, params: Dict = None) -> str:
+    """Content address of a request: sha256 of method, URL and sorted query parameters"""
+    query = urlencode(sorted((params or {}).items()), doseq=True)
+    return hashlib.sha256(f"{method.upper()} {url}?{query}".encode()).hexdigest()
+
+
+def _cache_path(key: str) -> Path:
+    return Path(settings.HTTP_CACHE_DIR) / key[:2] / f"{key}.json"
+
+
+def _read_cache(key: str, ttl: float):
+    path = _cache_path(key)
+    try:
+        entry = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry['fetched_at'] > ttl:
+        return None
+    response = requests.Response()
+    response.status_code = entry['status_code']
+    response._content = entry['body'].encode('utf-8')
+    response.encoding = 'utf-8'
+    response.headers.update(entry['headers'])
+    response.url = entry['url']
+    response.from_cache = True
+    return response
+
+
+def _write_cache(key: str, response: requests.Response):
+    path = _cache_path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({
+            'url': response.url,
+            'status_code': response.status_code,
+            'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+            'body': response.text,
+            'fetched_at': time.time(),
+        }))
+        tmp.replace(path)
+    except OSError as e:
+        print(f"Could not write HTTP cache entry {key}: {e}")
+
+
+def _backoff(attempt: int, response: requests.Response = None) -> float:
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF_SECONDS)
+    return random.uniform(0, min(settings.HTTP_RETRY_BACKOFF * 2 ** attempt, MAX_BACKOFF_SECONDS))
+
+
+def http_get(url: str, params: Dict = None, source: str = None, headers: Dict = None, auth=None,
+             timeout: float = 10, use_cache: bool = True) -> requests.Response:
+    """
+    GET through the shared client layer.
+
+    Successful responses are served from the on-disk cache while younger than
+    the source's TTL. Live requests reuse one keep-alive session per host, wait
+    for the source's rate limit, and retry connection errors, timeouts, 429 and
+    5xx with jittered exponential backoff (honouring Retry-After). The final
+    response is returned as-is; the last network error is re-raised.
+    """
+    policy = SOURCES.get(source, DEFAULT_POLICY)
+    source = source or urlsplit(url).netloc
+    key = cache_key('GET', url, params)
+    caching = use_cache and settings.HTTP_CACHE_ENABLED
+
+    if caching:
+        cached = _read_cache(key, policy['ttl'])
+        if cached is not None:
+            _count(source, 'hits')
+            return cached
+    _count(source, 'misses')
+
+    session = _session_for(url)
+    attempts = settings.HTTP_MAX_RETRIES + 1
+    for attempt in range(attempts):
+        _throttle(source, policy['min_interval'])
+        try:
+            response = session.get(url, params=params, headers=headers, auth=auth, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == attempts - 1:
+                raise
+            _count(source, 'retries')
+            time.sleep(_backoff(attempt))
+            continue
+        if response.status_code in RETRY_STATUSES and attempt < attempts - 1:
+            _count(source, 'retries')
+            time.sleep(_backoff(attempt, response))
+            continue
+        break
+
+    response.from_cache = False
+    if caching and response.status_code == 200:
+        _write_cache(key, response)
+    return response
+
+
+def http_stats() -> Dict[str, Dict]:
+    """Cache hits, misses and retries per source since the process started"""
+    with _lock:
+        return {source: dict(entry) for source, entry in _stats.items()}
@@ -0,0 +1,194 @@
+import time
+from itertools import islice
+from typing import Dict, Iterable, List, Sequence
+
+from django.db import transaction
+from django.db.models import Q, UniqueConstraint
+from django.db.models.constants import OnConflict
+from django.utils.text import slugify
+
+from ..models import CelestialEvent
+from .response_cache import invalidate_responses
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def ingest_events(model, rows: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE,
+                  update_existing: bool = True, key_fields: Sequence[str] = ('external_id',),
+                  update_fields: Sequence[str] = None) -> Dict:
+    """
+    Upsert a stream of field dicts into `model`, batch_size rows at a time.
+
+    CelestialEvent and its multi-table subclasses are keyed on external_id: the
+    celestial_events row and the child row are written with INSERT ... ON CONFLICT
+    DO UPDATE. Other models are keyed on `key_fields`, and are upserted the same
+    way when a unique constraint covers exactly those fields. Rows that already exist are
+    skipped when update_existing is False; update_fields limits which columns of a
+    plain model an existing row has overwritten (default: all of them). Each batch runs in its own transaction;
+    wrap the call in transaction.atomic() to make the whole stream all-or-nothing. Cached
+    responses that read `model` are invalidated once anything was written.
+    """
+    result = {'inserted': 0, 'updated': 0, 'skipped': 0, 'batches': [], 'seconds': 0.0}
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        start = time.perf_counter()
+        with transaction.atomic():
+            if issubclass(model, CelestialEvent):
+                counts = _ingest_celestial_batch(model, batch, update_existing)
+            else:
+                counts = _ingest_plain_batch(model, batch, update_existing, list(key_fields), update_fields)
+        counts['rows'] = len(batch)
+        counts['seconds'] = time.perf_counter() - start
+        result['batches'].append(counts)
+        for key in ('inserted', 'updated', 'skipped'):
+            result[key] += counts[key]
+        result['seconds'] += counts['seconds']
+    if result['inserted'] or result['updated']:
+        invalidate_responses(model)
+    return result
+
+
+def _dedupe(rows: List[dict], key_fields: List[str]):
+    """Keep the last row per key; return (rows_by_key, number_of_dropped_duplicates)"""
+    unique = {}
+    for row in rows:
+        unique[tuple(row[field] for field in key_fields)] = row
+    return unique, len(rows) - len(unique)
+
+
+def _ingest_celestial_batch(model, rows: List[dict], update_existing: bool) -> Dict:
+    unique, skipped = _dedupe(rows, ['external_id'])
+    existing = dict(
+        CelestialEvent.objects.filter(external_id__in=[key[0] for key in unique]).values_list('external_id', 'id')
+    )
+
+    objs = []
+    for (external_id,), row in unique.items():
+        if external_id in existing:
+            if not update_existing:
+                skipped += 1
+                continue
+            row = {**row, 'id': existing[external_id]}
+        obj = model(**row)
+        if not obj.slug:
+            obj.slug = slugify(f"{obj.name}-{obj.date_time.strftime('%Y-%m-%d')}")
+        objs.append(obj)
+
+    if objs:
+        parent_fields = [
+            field.name for field in CelestialEvent._meta.concrete_fields
+            if field.name not in ('id', 'external_id')
+        ]
+        CelestialEvent.objects.bulk_create(
+            [_parent_row(obj) for obj in objs],
+            update_conflicts=True,
+            unique_fields=['external_id'],
+            update_fields=parent_fields,
+        )
+        if model is not CelestialEvent:
+            # Another writer may have created an external_id since `existing` was read; the
+            # parent upsert then kept that row's id, so point the children at what is stored
+            ids = dict(
+                CelestialEvent.objects.filter(external_id__in=[obj.external_id for obj in objs])
+                .values_list('external_id', 'id')
+            )
+            _upsert_child_rows(model, objs, ids)
+
+    updated = sum(1 for obj in objs if obj.external_id in existing)
+    return {'inserted': len(objs) - updated, 'updated': updated, 'skipped': skipped}
+
+
+def _parent_row(obj) -> CelestialEvent:
+    return CelestialEvent(**{
+        field.attname: getattr(obj, field.attname)
+        for field in CelestialEvent._meta.concrete_fields
+    })
+
+
+def _upsert_child_rows(model, objs, ids: Dict):
+    """Write only the subclass table, each row pointing at the stored parent id of its external_id"""
+    ptr_field = model._meta.pk
+    local_fields = model._meta.local_concrete_fields
+    for obj in objs:
+        obj.id = ids[obj.external_id]
+        setattr(obj, ptr_field.attname, obj.id)
+    _insert_on_conflict(model, objs, local_fields, [field for field in local_fields if field is not ptr_field], ptr_field)
+
+
+def _insert_on_conflict(model, objs, fields, update_fields, conflict_field):
+    """
+    INSERT ... ON CONFLICT (conflict_field) DO UPDATE of `fields` into model's own table.
+
+    bulk_create() raises for multi-table subclasses, and save() costs a query per row,
+    so this calls the private Manager._insert() that bulk_create() itself uses. It is
+    the only use of that API here; IngestionUpsertTests covers it.
+    """
+    model._base_manager._insert(
+        objs,
+        fields=fields,
+        on_conflict=OnConflict.UPDATE if update_fields else OnConflict.IGNORE,
+        update_fields=update_fields or None,
+        unique_fields=[conflict_field],
+    )
+
+
+def _ingest_plain_batch(model, rows: List[dict], update_existing: bool, key_fields: List[str],
+                        only_fields: Sequence[str] = None) -> Dict:
+    unique, skipped = _dedupe(rows, key_fields)
+
+    lookup = Q()
+    for key in unique:
+        lookup |= Q(**dict(zip(key_fields, key)))
+    existing = {
+        tuple(values[:-1]): values[-1]
+        for values in model.objects.filter(lookup).values_list(*key_fields, 'pk')
+    }
+
+    update_fields = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and not getattr(field, 'auto_now_add', False)
+        and field.name not in key_fields and field.attname not in key_fields
+        and (only_fields is None or field.name in only_fields or field.attname in only_fields)
+    ]
+    if update_existing and update_fields and _has_unique_key(model, key_fields):
+        model.objects.bulk_create(
+            [model(**row) for row in unique.values()],
+            update_conflicts=True,
+            unique_fields=key_fields,
+            update_fields=update_fields,
+        )
+        updated = sum(1 for key in unique if key in existing)
+        return {'inserted': len(unique) - updated, 'updated': updated, 'skipped': skipped}
+
+    new_objs, changed_objs = [], []
+    for key, row in unique.items():
+        obj = model(**row)
+        if key in existing:
+            if not update_existing:
+                skipped += 1
+                continue
+            obj.pk = existing[key]
+            changed_objs.append(obj)
+        else:
+            new_objs.append(obj)
+
+    model.objects.bulk_create(new_objs)
+    if changed_objs:
+        model.objects.bulk_update(changed_objs, update_fields)
+
+    return {'inserted': len(new_objs), 'updated': len(changed_objs), 'skipped': skipped}
+
+
+def _has_unique_key(model, key_fields: List[str]) -> bool:
+    """Whether the database enforces uniqueness on exactly key_fields (so ON CONFLICT can target it)"""
+    wanted = {model._meta.get_field(name).name for name in key_fields}
+    if any(set(fields) == wanted for fields in model._meta.unique_together):
+        return True
+    return any(
+        isinstance(constraint, UniqueConstraint) and constraint.condition is None
+        and set(constraint.fields) == wanted
+        for constraint in model._meta.constraints
+    )
@@ -0,0 +1,154 @@
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from ..models import Location
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+# Cell size of the lat/lon grid; a query within max_km looks only at the cells that radius can reach
+CELL_DEGREES = 1.0
+
+_lock = threading.Lock()
+_index = None
+
+
+def _cell(latitude: float, longitude: float):
+    return math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES)
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def build_location_index() -> Dict:
+    """Snapshot every Location into float arrays plus a {cell: [row, ...]} grid (one query)"""
+    rows = list(Location.objects.values_list('id', 'name', 'latitude', 'longitude'))
+    latitudes = np.array([float(row[2]) for row in rows])
+    longitudes = np.array([float(row[3]) for row in rows])
+    cells = {}
+    for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes)):
+        cells.setdefault(_cell(latitude, longitude), []).append(i)
+    return {
+        'ids': [row[0] for row in rows],
+        'names': [row[1] for row in rows],
+        'latitudes': latitudes,
+        'longitudes': longitudes,
+        'cells': {cell: np.array(members) for cell, members in cells.items()},
+        'built_at': time.monotonic(),
+    }
+
+
+def get_location_index() -> Dict:
+    """
+    The process-wide index, rebuilt when a Location changed in this process or
+    after LOCATION_INDEX_TTL seconds (to pick up changes made by other processes).
+    """
+    global _index
+    with _lock:
+        if _index is None or time.monotonic() - _index['built_at'] > settings.LOCATION_INDEX_TTL:
+            _index = build_location_index()
+        return _index
+
+
+def invalidate_location_index(*args, **kwargs):
+    """Drop the index; connected to Location's post_save and post_delete signals"""
+    global _index
+    with _lock:
+        _index = None
+
+
+def _candidates(index: Dict, latitude: float, longitude: float, max_km: float):
+    """Rows in the grid cells a circle of max_km around the point can touch, or None when that is most of the globe"""
+    lat_span = max_km / KM_PER_DEGREE
+    nearest_pole = min(90.0, abs(latitude) + lat_span)
+    if nearest_pole >= 89.0 or lat_span > 20:
+        return None
+    lon_span = lat_span / math.cos(math.radians(nearest_pole))
+    if lon_span >= 180:
+        return None
+
+    lat_cells = range(math.floor((latitude - lat_span) / CELL_DEGREES), math.floor((latitude + lat_span) / CELL_DEGREES) + 1)
+    lon_cells = range(math.floor((longitude - lon_span) / CELL_DEGREES), math.floor((longitude + lon_span) / CELL_DEGREES) + 1)
+    columns = int(360 / CELL_DEGREES)
+    offset = int(180 / CELL_DEGREES)
+    members = [
+        index['cells'][(lat_cell, (lon_cell + offset) % columns - offset)]
+        for lat_cell in lat_cells
+        for lon_cell in lon_cells
+        if (lat_cell, (lon_cell + offset) % columns - offset) in index['cells']
+    ]
+    return np.concatenate(members) if members else np.array([], dtype=int)
+
+
+def _nearest_in_index(index: Dict, latitude: float, longitude: float, max_km: float = None) -> Optional[Dict]:
+    if not index['ids']:
+        return None
+    rows = None if max_km is None else _candidates(index, latitude, longitude, max_km)
+    if rows is None:
+        rows = np.arange(len(index['ids']))
+    if not len(rows):
+        return None
+
+    distances = _haversine_km(latitude, longitude, index['latitudes'][rows], index['longitudes'][rows])
+    best = int(np.argmin(distances))
+    if max_km is not None and distances[best] > max_km:
+        return None
+    row = int(rows[best])
+    return {'id': index['ids'][row], 'name': index['names'][row], 'distance_km': float(distances[best])}
+
+
+def _nearest_in_db(latitude: float, longitude: float, max_km: float) -> Optional[Dict]:
+    """
+    The same lookup against the database: a latitude/longitude bounding box
+    (served by the (latitude, longitude) index), then exact distances.
+    """
+    lat_span = max_km / KM_PER_DEGREE
+    lon_span = min(180.0, lat_span / max(math.cos(math.radians(min(90.0, abs(latitude) + lat_span))), 1e-6))
+    west, east = longitude - lon_span, longitude + lon_span
+    if lon_span >= 180:
+        longitudes = Q()
+    elif west < -180:
+        longitudes = Q(longitude__gte=round(west + 360, 6)) | Q(longitude__lte=round(east, 6))
+    elif east > 180:
+        longitudes = Q(longitude__gte=round(west, 6)) | Q(longitude__lte=round(east - 360, 6))
+    else:
+        longitudes = Q(longitude__range=(round(west, 6), round(east, 6)))
+    rows = list(Location.objects.filter(
+        longitudes, latitude__range=(round(latitude - lat_span, 6), round(latitude + lat_span, 6)),
+    ).values_list('id', 'name', 'latitude', 'longitude'))
+    if not rows:
+        return None
+
+    distances = _haversine_km(
+        latitude, longitude, np.array([float(row[2]) for row in rows]), np.array([float(row[3]) for row in rows])
+    )
+    best = int(np.argmin(distances))
+    if distances[best] > max_km:
+        return None
+    return {'id': rows[best][0], 'name': rows[best][1], 'distance_km': float(distances[best])}
+
+
+def nearest_location(latitude: float, longitude: float, max_km: float = None) -> Optional[Dict]:
+    """
+    The known location closest to (latitude, longitude), as {'id', 'name',
+    'distance_km'}, or None when there is none within max_km (default: any distance).
+
+    With max_km, a miss in this process's index is confirmed against the
+    database, since another process may have added a location the index has
+    not picked up yet; the index is then dropped so the next call rebuilds it.
+    """
+    match = _nearest_in_index(get_location_index(), latitude, longitude, max_km)
+    if match is None and max_km is not None:
+        match = _nearest_in_db(latitude, longitude, max_km)
+        if match is not None:
+            invalidate_location_index()
+    return match
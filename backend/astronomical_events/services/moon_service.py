@@ -1,40 +1,145 @@
 import requests
-from datetime import datetime, timezone, timedelta
-from typing import List, Dict
+from datetime import date, datetime, time, timezone, timedelta
+from typing import Iterator, List, Dict
 import calendar
-from skyfield.api import load
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from skyfield import almanac
 from skyfield.searchlib import find_maxima, find_minima
-from ..models import MoonPhase, Location, ApiSource
+from ..models import MoonPhase, Location
+from .api_sources import get_api_source
+from .ephemeris import get_ephemeris, get_timescale
+from .async_fetch import iter_fetch
+from .http_client import http_get
+from .ingestion import DEFAULT_BATCH_SIZE, ingest_events
 from django.utils.timezone import make_aware, is_aware, now
 from django.utils.text import slugify
 
-api_source = ApiSource.objects.get_or_create(name="FarmSense", base_url="https://api.farmsense.net/v1/moonphases/")[0]
+PROVIDERS = ('skyfield', 'farmsense')
+
+# ApiSource name recorded for phases from each provider
+PROVIDER_SOURCES = {'skyfield': 'Skyfield', 'farmsense': 'FarmSense'}
+
+# Names for the four quadrants of the Moon-Sun ecliptic longitude difference
+INTERMEDIATE_PHASES = np.array(['Waxing Crescent', 'Waxing Gibbous', 'Waning Gibbous', 'Waning Crescent'])
 
 class MoonPhaseService:
     
-    def __init__(self, timezone_offset: int = 4):
+    def __init__(self, timezone_offset: int = 4, provider: str = None, fallback: bool = None):
 
         self.apis = {
             'farmsense': 'https://api.farmsense.net/v1/moonphases/',
             'ipgeolocation': 'https://api.ipgeolocation.io/astronomy'
         }
+        self.provider = (provider or settings.MOON_PHASE_PROVIDER).lower()
+        if self.provider not in PROVIDERS:
+            raise ValueError(f"Unknown moon phase provider '{self.provider}'. Choose one of: {', '.join(PROVIDERS)}")
+        self.fallback = settings.MOON_PHASE_FARMSENSE_FALLBACK if fallback is None else fallback
         self.timezone = timezone(timedelta(hours=timezone_offset))
-        self.ts = load.timescale()
-        self.eph = load('de421.bsp') 
+        self.timezone_label = f"GMT{timezone_offset:+d}"
+        self.ts = get_timescale()
+        self.eph = get_ephemeris('de421')
         self.earth = self.eph['earth']
         self.moon = self.eph['moon']
 
+    def get_moon_phases(self, start_date: date, end_date: date) -> List[Dict]:
+        """Daily phases from start_date to end_date (inclusive) using the configured provider"""
+        if self.provider == 'skyfield':
+            try:
+                return self.get_moon_phases_skyfield(start_date, end_date)
+            except Exception as e:
+                if not self.fallback:
+                    raise
+                print(f"Local moon phase computation failed, falling back to FarmSense: {e}")
+
+        return sorted(self.iter_moon_phases_farmsense(start_date, end_date), key=lambda phase: phase['date'])
+
+    def get_moon_phases_yearly(self, year: int = None) -> List[Dict]:
+        if year is None:
+            year = datetime.now(timezone.utc).astimezone(self.timezone).year
+        return self.get_moon_phases(date(year, 1, 1), date(year, 12, 31))
+
+    def get_moon_phases_skyfield(self, start_date: date, end_date: date) -> List[Dict]:
+        """
+        Compute one phase per day (sampled at local noon) from the local ephemeris.
+
+        Days that contain a principal phase are named after it and carry its
+        exact instant instead of the noon sample.
+        """
+        days = (end_date - start_date).days + 1
+        if days <= 0:
+            return []
+
+        noons = [
+            datetime.combine(start_date + timedelta(days=i), time(12, 0), tzinfo=self.timezone)
+            for i in range(days)
+        ]
+        t = self.ts.from_datetimes(noons)
+        angles = almanac.moon_phase(self.eph, t).degrees
+        illumination = almanac.fraction_illuminated(self.eph, 'moon', t) * 100
+        names = INTERMEDIATE_PHASES[(angles // 90).astype(int) % 4]
+
+        principal = {
+            phase['date']: phase
+            for phase in self.get_principal_moon_phases(start_date, end_date)
+        }
+
+        moon_phases = []
+        for i, noon in enumerate(noons):
+            exact = principal.get(noon.date())
+            if exact:
+                moon_phases.append(exact)
+                continue
+            moon_phases.append({
+                'date': noon.date(),
+                'datetime': noon,
+                'phase': str(names[i]),
+                'illumination': round(float(illumination[i]), 2),
+                'type': 'Moon Phase',
+                'icon': self._get_moon_icon(str(names[i])),
+                'timezone': self.timezone_label,
+                'provider': 'skyfield',
+                'exact': False,
+            })
+        return moon_phases
+
+    def get_principal_moon_phases(self, start_date: date, end_date: date) -> List[Dict]:
+        """Exact New Moon, First Quarter, Full Moon and Last Quarter instants in the local date range"""
+        t0 = self.ts.from_datetime(datetime.combine(start_date, time.min, tzinfo=self.timezone))
+        t1 = self.ts.from_datetime(datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=self.timezone))
+        times, quarters = almanac.find_discrete(t0, t1, almanac.moon_phases(self.eph))
+        if not len(times):
+            return []
+
+        illumination = almanac.fraction_illuminated(self.eph, 'moon', times) * 100
+        moon_phases = []
+        for t, quarter, lit in zip(times, quarters, illumination):
+            local_dt = t.utc_datetime().astimezone(self.timezone)
+            phase_name = almanac.MOON_PHASES[quarter]
+            moon_phases.append({
+                'date': local_dt.date(),
+                'datetime': local_dt,
+                'phase': phase_name,
+                'illumination': round(float(lit), 2),
+                'type': 'Moon Phase',
+                'icon': self._get_moon_icon(phase_name),
+                'timezone': self.timezone_label,
+                'provider': 'skyfield',
+                'exact': True,
+            })
+        return moon_phases
+
     def get_moon_phases_yearly_farmsense(self, year: int = None) -> List[Dict]:
         current_time = datetime.now(timezone.utc).astimezone(self.timezone)
         if year is None:
             year = current_time.year
 
-        all_phases = []
-        for month in range(1, 13):  
-            print(f"📆 Fetching moon phases for {year}-{month:02d}")
-            monthly_phases = self.get_moon_phases_farmsense(year=year, month=month)
-            all_phases.extend(monthly_phases)
-        return all_phases
+        print(f"📆 Fetching moon phases for {year}")
+        return sorted(
+            self.iter_moon_phases_farmsense(date(year, 1, 1), date(year, 12, 31)),
+            key=lambda phase: phase['date']
+        )
     
     def get_moon_phases_farmsense(self, year: int = None, month: int = None) -> List[Dict]:
 
@@ -46,15 +151,32 @@ class MoonPhaseService:
             month = current_time.month
             
         days_in_month = calendar.monthrange(year, month)[1]
-        moon_phases = []
-        
-        for day in range(1, days_in_month + 1):
-            date_obj = datetime(year, month, day, 12, 0, 0, tzinfo=self.timezone)
-            timestamp = int(date_obj.timestamp())
-            
-            url = f"{self.apis['farmsense']}?d={timestamp}"
+        return sorted(
+            self.iter_moon_phases_farmsense(date(year, month, 1), date(year, month, days_in_month)),
+            key=lambda phase: phase['date']
+        )
+
+    def iter_moon_phases_farmsense(self, start_date: date, end_date: date) -> Iterator[Dict]:
+        """
+        One FarmSense request per day (local noon), issued concurrently; phases are
+        yielded in completion order as responses arrive.
+        """
+        jobs = []
+        for i in range((end_date - start_date).days + 1):
+            date_obj = datetime.combine(start_date + timedelta(days=i), time(12, 0), tzinfo=self.timezone)
+            jobs.append({
+                'url': self.apis['farmsense'],
+                'params': {'d': int(date_obj.timestamp())},
+                'source': 'farmsense',
+                'timeout': 10,
+                'date_obj': date_obj,
+            })
+
+        for job, response, error in iter_fetch(jobs):
+            date_obj = job['date_obj']
             try:
-                response = requests.get(url)
+                if error:
+                    raise error
                 response.raise_for_status()
                 data = response.json()
                 
@@ -64,7 +186,7 @@ class MoonPhaseService:
                     phase_name = phase_data.get('Phase', 'Unknown')
                     illumination = phase_data.get('Illumination', 0)
                     
-                    moon_phases.append({
+                    yield {
                         'date': date_obj.date(),
                         'datetime': date_obj,
                         'phase': phase_name,
@@ -72,15 +194,13 @@ class MoonPhaseService:
                         'type': 'Moon Phase',
                         'icon': self._get_moon_icon(phase_name),
                         'timezone': 'GMT+4'
-                    })
+                    }
             except requests.RequestException as e:
-                print(f"Error fetching moon phase for {year}-{month:02d}-{day:02d}: {e}")
+                print(f"Error fetching moon phase for {date_obj.date()}: {e}")
                 continue
             except (KeyError, IndexError) as e:
-                print(f"Error parsing moon phase data for {year}-{month:02d}-{day:02d}: {e}")
+                print(f"Error parsing moon phase data for {date_obj.date()}: {e}")
                 continue
-        
-        return moon_phases
     
     def get_moon_phase_for_date(self, target_date: datetime) -> Dict:
         
@@ -92,9 +212,8 @@ class MoonPhaseService:
         date_with_time = target_date.replace(hour=12, minute=0, second=0, microsecond=0)
         timestamp = int(date_with_time.timestamp())
         
-        url = f"{self.apis['farmsense']}?d={timestamp}"
         try:
-            response = requests.get(url)
+            response = http_get(self.apis['farmsense'], params={'d': timestamp}, source='farmsense')
             response.raise_for_status()
             data = response.json()
             
@@ -127,7 +246,7 @@ class MoonPhaseService:
             'long': longitude
         }
         try:
-            response = requests.get(self.apis['ipgeolocation'], params=params)
+            response = http_get(self.apis['ipgeolocation'], params=params, source='ipgeolocation')
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -149,61 +268,92 @@ class MoonPhaseService:
         return icons.get(phase, '🌙')
 
 
-def save_moon_phases_to_db(phases: List[dict], location: Location):
-    
-    for phase in phases:
-        dt = phase['datetime']
-        if not is_aware(dt):
-            dt = make_aware(dt)  
-        
-        if MoonPhase.objects.filter(date_time=dt, location=location).exists():
-            continue
-        
-        phase_mapping = {
-            'New Moon': 'new_moon',
-            'Waxing Crescent': 'waxing_crescent',
-            'First Quarter': 'first_quarter',
-            'Waxing Gibbous': 'waxing_gibbous',
-            'Full Moon': 'full_moon',
-            'Waning Gibbous': 'waning_gibbous',
-            'Last Quarter': 'last_quarter',
-            'Third Quarter': 'last_quarter',
-            'Waning Crescent': 'waning_crescent'
-        }
-        
-        phase_choice = phase_mapping.get(phase['phase'], 'new_moon')
-        
-        serializable_phase = {
-            'date': phase['date'].isoformat() if hasattr(phase['date'], 'isoformat') else str(phase['date']),
-            'datetime': phase['datetime'].isoformat() if hasattr(phase['datetime'], 'isoformat') else str(phase['datetime']),
-            'phase': phase['phase'],
-            'illumination': phase['illumination'],
-            'type': phase['type'],
-            'icon': phase['icon'],
-            'timezone': phase['timezone']
-        }
-        
-        moon_event = MoonPhase.objects.create(
-            name=f"{phase['phase']} ({dt.strftime('%Y-%m-%d')})",
-            event_type='moon_phase',
-            date_time=dt,
-            description=f"Moon phase is {phase['phase']} with illumination {phase['illumination']}%.",
-            location=location,
-            importance_level=1,
-            slug=slugify(f"{phase['phase']}-{dt.date()}"),
-            external_id=f"moon_phase_{location.id}_{dt.strftime('%Y%m%d')}_{phase_choice}",
-            raw_api_data=serializable_phase,  
-            last_updated_from_api=now(),  
-            phase=phase_choice,
-            illumination_percentage=float(phase['illumination']),
-            api_source=api_source,
-        )
-        print(f"✅ Saved: {moon_event}")
+PHASE_MAPPING = {
+    'New Moon': 'new_moon',
+    'Waxing Crescent': 'waxing_crescent',
+    'First Quarter': 'first_quarter',
+    'Waxing Gibbous': 'waxing_gibbous',
+    'Full Moon': 'full_moon',
+    'Waning Gibbous': 'waning_gibbous',
+    'Last Quarter': 'last_quarter',
+    'Third Quarter': 'last_quarter',
+    'Waning Crescent': 'waning_crescent'
+}
+
+def build_moon_phase(phase: dict, location: Location) -> dict:
+    """
+    Build MoonPhase field values from a provider phase dict. The key is the location
+    and local date only, so either provider's phase for a day replaces the other's.
+    """
+    dt = phase['datetime']
+    if not is_aware(dt):
+        dt = make_aware(dt)
+
+    phase_choice = PHASE_MAPPING.get(phase['phase'], 'new_moon')
+
+    serializable_phase = {
+        'date': phase['date'].isoformat() if hasattr(phase['date'], 'isoformat') else str(phase['date']),
+        'datetime': phase['datetime'].isoformat() if hasattr(phase['datetime'], 'isoformat') else str(phase['datetime']),
+        'phase': phase['phase'],
+        'illumination': phase['illumination'],
+        'type': phase['type'],
+        'icon': phase['icon'],
+        'timezone': phase['timezone']
+    }
+
+    return {
+        'name': f"{phase['phase']} ({dt.strftime('%Y-%m-%d')})",
+        'event_type': 'moon_phase',
+        'date_time': dt,
+        'description': f"Moon phase is {phase['phase']} with illumination {phase['illumination']}%.",
+        'location': location,
+        'importance_level': 1,
+        'slug': slugify(f"{phase['phase']}-{dt.date()}"),
+        'external_id': f"moon_phase_{location.id}_{dt.strftime('%Y%m%d')}",
+        'raw_api_data': serializable_phase,
+        'last_updated_from_api': now(),
+        'phase': phase_choice,
+        'illumination_percentage': float(phase['illumination']),
+        'api_source': get_api_source(PROVIDER_SOURCES[phase.get('provider', 'farmsense')]),
+    }
+
+
+def save_moon_phases_to_db(phases: List[dict], location: Location, batch_size: int = DEFAULT_BATCH_SIZE,
+                           update_existing: bool = True) -> Dict[str, int]:
+    """
+    Bulk-write phases for one location through the shared ingestion layer.
+
+    A location's existing row for a day is overwritten unless update_existing is
+    False. All phases are written in one transaction; a streamed source is
+    drained first, so its HTTP calls never run inside it.
+    """
+    rows = [build_moon_phase(phase, location) for phase in phases]
+    with transaction.atomic():
+        result = ingest_events(MoonPhase, rows, batch_size=batch_size, update_existing=update_existing)
+
+    counts = {key: result[key] for key in ('inserted', 'updated', 'skipped')}
+    print(f"✅ Moon phases for {location.name}: {counts['inserted']} inserted, "
+          f"{counts['updated']} updated, {counts['skipped']} skipped")
+    return counts
 
 
 def fetch_and_save_yearly_moon_phases(location: Location, year: int = None):
     service = MoonPhaseService()
-    phases = service.get_moon_phases_yearly_farmsense(year)
+    if service.provider == 'farmsense':
+        # One FarmSense request per day, all made before the write transaction opens
+        year = year or datetime.now(timezone.utc).astimezone(service.timezone).year
+        phases = service.iter_moon_phases_farmsense(date(year, 1, 1), date(year, 12, 31))
+        return sum(save_moon_phases_to_db(phases, location).values())
+    phases = service.get_moon_phases_yearly(year)
+    save_moon_phases_to_db(phases, location)
+    return len(phases)
+
+
+def fetch_and_save_moon_phases(location: Location, year: int, month: int):
+    service = MoonPhaseService()
+    start_date = date(year, month, 1)
+    end_date = date(year, month, calendar.monthrange(year, month)[1])
+    phases = service.get_moon_phases(start_date, end_date)
     save_moon_phases_to_db(phases, location)
     return len(phases)
 
@@ -0,0 +1,161 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+# Endpoints whose hit/miss counters are reported by response_cache_stats()
+RESPONSE_CACHE_ENDPOINTS = (
+    'moonphases', 'moon_calendar', 'eclipses', 'earth', 'constellations', 'planetary', 'sun_today',
+)
+
+VERSION_PREFIX = 'response_cache:version'
+STATS_PREFIX = 'response_cache:stats'
+
+
+def response_cache_enabled() -> bool:
+    """False when no shared cache is configured (CACHE_URL empty gives a DummyCache)"""
+    return not isinstance(caches['default'], DummyCache)
+
+
+def namespaces_for(*models) -> List[str]:
+    """
+    Namespaces a read of `models` depends on: each model plus its multi-table
+    parents, since rows written through CelestialEvent alone change its children too.
+    """
+    names = []
+    for model in models:
+        for name in [model._meta.model_name] + [parent._meta.model_name for parent in model._meta.get_parent_list()]:
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def namespace_versions(namespaces: Iterable[str]) -> Optional[str]:
+    """
+    Current generation of each namespace, joined for use in a cache key (one cache
+    round trip). None when the cache cannot be reached, so callers skip it.
+    """
+    keys = [f'{VERSION_PREFIX}:{name}' for name in namespaces]
+    try:
+        versions = cache.get_many(keys)
+        missing = {key: 1 for key in keys if key not in versions}
+        if missing:
+            for key in missing:
+                cache.add(key, 1, timeout=None)
+            versions.update(cache.get_many(list(missing)))
+    except Exception as e:
+        print(f"❌ Could not read response cache versions: {e}")
+        return None
+    return '.'.join(str(versions.get(key, 1)) for key in keys)
+
+
+def bump_namespaces(*namespaces: str):
+    """Start a new generation of each namespace, orphaning every response cached under the old one"""
+    for name in namespaces:
+        key = f'{VERSION_PREFIX}:{name}'
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 2, timeout=None)
+        except Exception as e:
+            # The rows are committed either way; cached pages then age out after RESPONSE_CACHE_TTL
+            print(f"❌ Could not invalidate cached {name} responses: {e}")
+
+
+def invalidate_responses(sender, **kwargs):
+    """
+    Bump sender's namespace once the surrounding transaction commits, so no reader
+    can cache pre-commit rows under the new version. Connected to post_save and
+    post_delete of every model a cached endpoint reads; also called by ingest_events.
+    """
+    name = sender._meta.model_name
+    transaction.on_commit(lambda: bump_namespaces(name))
+
+
+def response_cache_key(endpoint: str, namespaces: Iterable[str], host: str, path: str, params,
+                       extra: str = '') -> Optional[str]:
+    """
+    Key for one response: the namespace versions plus a digest of the path and
+    query params, normalized so that param order and empty values do not matter.
+    None when the versions cannot be read.
+    """
+    versions = namespace_versions(namespaces)
+    if versions is None:
+        return None
+    query = sorted(
+        (name, value.strip()) for name in params for value in params.getlist(name) if value.strip()
+    )
+    digest = hashlib.sha1(json.dumps([host, path, query, extra]).encode()).hexdigest()
+    return f'response_cache:{endpoint}:{versions}:{digest}'
+
+
+def cached_response(endpoint: str, key: Optional[str]) -> Any:
+    """
+    The response stored under key, or None on a miss. An unreachable cache counts
+    as a miss, so the caller serves from the database instead of failing.
+    """
+    data = None
+    if key is not None:
+        try:
+            data = cache.get(key)
+        except Exception as e:
+            print(f"❌ Could not read cached {endpoint} response: {e}")
+    record_lookup(endpoint, hit=data is not None)
+    return data
+
+
+def store_response(key: Optional[str], data, timeout: int):
+    """Keep data under key; a cache outage only costs the next request a database read"""
+    if key is None:
+        return
+    try:
+        cache.set(key, data, timeout)
+    except Exception as e:
+        print(f"❌ Could not store cached response: {e}")
+
+
+def to_cacheable(data):
+    """JSON-native copy of serializer output, so warm hits skip UUID/Decimal pickling and encoding"""
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def record_lookup(endpoint: str, hit: bool):
+    key = f"{STATS_PREFIX}:{endpoint}:{'hits' if hit else 'misses'}"
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+    except Exception:
+        # Counters are best effort; the read or write they describe has already been reported
+        pass
+
+
+def response_cache_stats() -> Dict[str, Dict]:
+    """
+    Hits, misses and hit rate per cached endpoint, across every process sharing
+    the cache. Empty when the cache cannot be reached.
+    """
+    keys = [
+        f'{STATS_PREFIX}:{endpoint}:{kind}' for endpoint in RESPONSE_CACHE_ENDPOINTS for kind in ('hits', 'misses')
+    ]
+    try:
+        counts = cache.get_many(keys)
+    except Exception as e:
+        print(f"❌ Could not read response cache stats: {e}")
+        return {}
+    stats = {}
+    for endpoint in RESPONSE_CACHE_ENDPOINTS:
+        hits = counts.get(f'{STATS_PREFIX}:{endpoint}:hits', 0)
+        misses = counts.get(f'{STATS_PREFIX}:{endpoint}:misses', 0)
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
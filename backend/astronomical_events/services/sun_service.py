@@ -0,0 +1,119 @@
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+from typing import Dict, List
+
+import numpy as np
+from skyfield import almanac
+from skyfield.api import wgs84
+
+from ..models import Location, SunData
+from .ephemeris import get_ephemeris, get_timescale
+from .ingestion import DEFAULT_BATCH_SIZE, ingest_events
+
+# Standard sunrise altitude: 34' refraction plus the 16' solar semi-diameter
+SUNRISE_ALTITUDE = -0.8333
+
+# Altitude of the Sun's centre at the start of morning / end of evening twilight
+TWILIGHT_ALTITUDES = {'civil': -6.0, 'nautical': -12.0, 'astronomical': -18.0}
+
+SUN_EVENTS = ['sunrise', 'sunset'] + [
+    f"{kind}_{edge}" for kind in TWILIGHT_ALTITUDES for edge in ('dawn', 'dusk')
+]
+
+
+def horizon_degrees(elevation_meters: float) -> float:
+    """Apparent altitude of the Sun's centre at rise/set, lowered by the horizon dip seen from elevation"""
+    return SUNRISE_ALTITUDE - 0.0353 * np.sqrt(max(elevation_meters or 0, 0))
+
+
+def compute_sun_times(location, start_date: date, end_date: date) -> List[Dict]:
+    """
+    Sunrise, sunset and twilight boundaries for every local date from start_date
+    to end_date (inclusive) at `location`.
+
+    Each event is one find_risings/find_settings search over the whole range at
+    its own altitude, so a year costs about as much as a day. Times are aware datetimes in the location's
+    timezone; an event that does not happen that day (polar day or night) is None.
+    """
+    ts = get_timescale()
+    eph = get_ephemeris('de421')
+    tz = location.timezone
+
+    position = wgs84.latlon(
+        float(location.latitude), float(location.longitude), elevation_m=location.elevation_meters or 0
+    )
+    observer = eph['earth'] + position
+    t0 = ts.from_datetime(datetime.combine(start_date, time(), tz))
+    t1 = ts.from_datetime(datetime.combine(end_date + timedelta(days=1), time(), tz))
+
+    days = {}
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=offset)
+        days[day] = {'date': day, **{name: None for name in SUN_EVENTS}}
+
+    def record(name, moments):
+        for moment in moments:
+            local = moment.astimezone(tz)
+            if local.date() in days:
+                days[local.date()][name] = local
+
+    searches = [('sunrise', 'sunset', horizon_degrees(location.elevation_meters))] + [
+        (f"{kind}_dawn", f"{kind}_dusk", altitude) for kind, altitude in TWILIGHT_ALTITUDES.items()
+    ]
+    for rising_name, setting_name, altitude in searches:
+        risings, rises = almanac.find_risings(observer, eph['sun'], t0, t1, horizon_degrees=altitude)
+        settings, sets = almanac.find_settings(observer, eph['sun'], t0, t1, horizon_degrees=altitude)
+        record(rising_name, risings[rises].utc_datetime())
+        record(setting_name, settings[sets].utc_datetime())
+
+    return list(days.values())
+
+
+def save_sun_data(days: List[Dict], location, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict:
+    """Upsert SunData rows (local sunrise/sunset times) keyed on location and date"""
+    rows = (
+        {
+            'location_id': location.id,
+            'date': day['date'],
+            'sunrise': day['sunrise'].time(),
+            'sunset': day['sunset'].time(),
+        }
+        for day in days
+        if day['sunrise'] and day['sunset']
+    )
+    return ingest_events(SunData, rows, batch_size=batch_size, key_fields=('location_id', 'date'))
+
+
+def fetch_and_save_sun_data(location, start_date: date, end_date: date = None) -> Dict:
+    """Compute and store sun data for location from start_date to end_date (default: start_date only)"""
+    days = compute_sun_times(location, start_date, end_date or start_date)
+    return save_sun_data(days, location)
+
+
+def precompute_sun_data(years: int = 3, start_date: date = None, locations=None) -> List[Dict]:
+    """
+    Fill SunData `years` ahead of start_date (default: today) for every location.
+
+    Returns one summary per location with the upsert counts and seconds taken.
+    """
+    start_date = start_date or date.today()
+    try:
+        end_date = start_date.replace(year=start_date.year + years) - timedelta(days=1)
+    except ValueError:  # 29 February
+        end_date = start_date.replace(year=start_date.year + years, day=28)
+    if locations is None:
+        locations = Location.objects.all()
+
+    summaries = []
+    for location in locations:
+        started = perf_counter()
+        result = fetch_and_save_sun_data(location, start_date, end_date)
+        summaries.append({
+            'location': location.name,
+            'start_date': start_date,
+            'end_date': end_date,
+            'inserted': result['inserted'],
+            'updated': result['updated'],
+            'seconds': perf_counter() - started,
+        })
+    return summaries
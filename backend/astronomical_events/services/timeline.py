@@ -0,0 +1,126 @@
+import base64
+import heapq
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Q
+
+from ..models import CelestialEvent, EarthOrbitEvent, Eclipse, MoonPhase
+
+# Timeline item types, and the source each is read from
+TIMELINE_TYPES = {
+    'moon_phase': 'moon_phase',
+    'eclipse': 'eclipse',
+    'earth_orbit': 'earth_orbit',
+    'moon_apogee': 'moon_apsis',
+    'moon_perigee': 'moon_apsis',
+}
+
+# (moment, source, id) of the last item already returned; items are ordered by exactly this tuple
+Cursor = Tuple[datetime, str, str]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    moment, source, pk = cursor
+    raw = json.dumps([moment.isoformat(), source, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        moment, source, pk = json.loads(raw)
+        moment = datetime.fromisoformat(moment)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if moment.tzinfo is None or source not in TIMELINE_TYPES.values():
+        raise ValueError("Invalid cursor")
+    return moment, source, str(pk)
+
+
+def _after_datetime(source: str, cursor: Optional[Cursor]) -> Q:
+    """Rows of a date_time source that sort after cursor in (moment, source, id) order"""
+    if cursor is None:
+        return Q()
+    moment, cursor_source, pk = cursor
+    if source > cursor_source:
+        return Q(date_time__gte=moment)
+    if source < cursor_source:
+        return Q(date_time__gt=moment)
+    return Q(date_time__gt=moment) | Q(date_time=moment, id__gt=pk)
+
+
+def _after_date_and_time(source: str, cursor: Optional[Cursor]) -> Q:
+    """The same for EarthOrbitEvent, whose moment is split over date and time (UTC)"""
+    if cursor is None:
+        return Q()
+    moment, cursor_source, pk = cursor
+    moment = moment.astimezone(timezone.utc)
+    day, clock = moment.date(), moment.time().replace(tzinfo=None)
+    later = Q(date__gt=day) | Q(date=day, time__gt=clock)
+    if source > cursor_source:
+        return later | Q(date=day, time=clock)
+    if source < cursor_source:
+        return later
+    return later | Q(date=day, time=clock, id__gt=pk)
+
+
+def _location_filter(location_id):
+    # Events for the location plus the location-independent ones
+    return Q(location_id=location_id) | Q(location__isnull=True) if location_id else Q()
+
+
+def _earth_moment(event: EarthOrbitEvent) -> datetime:
+    return datetime.combine(event.date, event.time, timezone.utc)
+
+
+def timeline_sources(start: datetime, end: datetime, types: Iterable[str], location_id=None,
+                     cursor: Cursor = None, limit: int = 100) -> Dict[str, List[Tuple[Cursor, object]]]:
+    """
+    Up to `limit` rows (pass one more than the page size) from each requested
+    source in [start, end) after cursor, each list already in (moment, source, id)
+    order from one indexed range query.
+    """
+    types = set(types)
+    sources = {}
+    if 'moon_phase' in types:
+        rows = MoonPhase.objects.select_related('location').filter(
+            _location_filter(location_id), _after_datetime('moon_phase', cursor),
+            date_time__gte=start, date_time__lt=end,
+        ).order_by('date_time', 'id')[:limit]
+        sources['moon_phase'] = [((row.date_time, 'moon_phase', str(row.id)), row) for row in rows]
+    if 'eclipse' in types:
+        rows = Eclipse.objects.filter(
+            _location_filter(location_id), _after_datetime('eclipse', cursor),
+            date_time__gte=start, date_time__lt=end,
+        ).order_by('date_time', 'id')[:limit]
+        sources['eclipse'] = [((row.date_time, 'eclipse', str(row.id)), row) for row in rows]
+    if 'earth_orbit' in types:
+        start_utc, end_utc = start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+        rows = EarthOrbitEvent.objects.filter(
+            _after_date_and_time('earth_orbit', cursor),
+            Q(date__gt=start_utc.date()) | Q(date=start_utc.date(), time__gte=start_utc.time().replace(tzinfo=None)),
+            Q(date__lt=end_utc.date()) | Q(date=end_utc.date(), time__lt=end_utc.time().replace(tzinfo=None)),
+        ).order_by('date', 'time', 'id')[:limit]
+        sources['earth_orbit'] = [((_earth_moment(row), 'earth_orbit', str(row.id)), row) for row in rows]
+    apsides = [name for name in ('moon_apogee', 'moon_perigee') if name in types]
+    if apsides:
+        rows = CelestialEvent.objects.prefetch_related('event_images').filter(
+            _location_filter(location_id), _after_datetime('moon_apsis', cursor),
+            event_type__in=apsides, date_time__gte=start, date_time__lt=end,
+        ).order_by('date_time', 'id')[:limit]
+        sources['moon_apsis'] = [((row.date_time, 'moon_apsis', str(row.id)), row) for row in rows]
+    return sources
+
+
+def merge_timeline(sources: Dict[str, List[Tuple[Cursor, object]]], limit: int):
+    """
+    k-way merge of the per-source lists by (moment, source, id). Returns the first
+    `limit` (cursor, row) pairs and the cursor to resume from, or None at the end.
+    """
+    merged = list(heapq.merge(*sources.values(), key=lambda item: item[0]))
+    page = merged[:limit]
+    next_cursor = page[-1][0] if len(merged) > limit else None
+    return page, next_cursor
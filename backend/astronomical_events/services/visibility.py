@@ -0,0 +1,257 @@
+from datetime import datetime, timedelta
+from itertools import islice
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from skyfield.api import Star
+
+from ..models import CelestialEvent, Location, VisibilityDetail
+from .conjunctions import resolve_body
+from .ephemeris import get_ephemeris, get_timescale
+from .ingestion import ingest_events
+from .sun_service import SUNRISE_ALTITUDE, TWILIGHT_ALTITUDES
+
+EARTH_RADIUS_KM = 6378.137
+SUN_RADIUS_KM = 696000.0
+MOON_RADIUS_KM = 1737.4
+
+# Altitude of the target's centre at rise/set: refraction, plus the semi-diameter for the Sun and Moon
+RISE_ALTITUDES = {'sun': SUNRISE_ALTITUDE, 'moon': SUNRISE_ALTITUDE}
+DEFAULT_RISE_ALTITUDE = -0.5667
+
+# A target counts as visible while it is this high and, unless it is the Sun, the sky is past civil dusk
+VIEWING_ALTITUDE = 5.0
+DARK_SUN_ALTITUDE = TWILIGHT_ALTITUDES['civil']
+
+# Half-width of the window searched around an event without a usable end_time
+DEFAULT_HALF_WINDOW = timedelta(hours=12)
+
+# Fields the engine owns; notes and weather written by other sources are left alone
+VISIBILITY_FIELDS = (
+    'visible', 'rise_time', 'set_time', 'best_viewing_start', 'best_viewing_end', 'light_pollution_level',
+)
+
+
+def event_target(event: CelestialEvent):
+    """
+    What to look at for an event: a body name from the ephemeris, a (ra_degrees, dec_degrees)
+    pair for a fixed point such as a meteor radiant, or None when the event has no sky target.
+    """
+    if hasattr(event, 'eclipse'):
+        return 'sun' if event.eclipse.eclipse_type.startswith('solar') else 'moon'
+    if hasattr(event, 'meteorshower'):
+        shower = event.meteorshower
+        if shower.radiant_ra is None or shower.radiant_dec is None:
+            return None
+        return shower.radiant_ra, shower.radiant_dec
+    if hasattr(event, 'planetaryevent'):
+        return event.planetaryevent.planet_name.lower()
+    if event.event_type in ('moon_phase', 'moon_apogee', 'moon_perigee'):
+        return 'moon'
+    if event.event_type == 'sunrise_sunset':
+        return 'sun'
+    bodies = (event.raw_api_data or {}).get('bodies')
+    if event.event_type == 'conjunction' and bodies:
+        return bodies[0].lower()
+    return None
+
+
+def event_window(event: CelestialEvent):
+    """
+    The time span to search. Events with an end_time within half a day of date_time (eclipses:
+    peak to last contact) get a window symmetric about the peak; others get the day around date_time.
+    """
+    half = DEFAULT_HALF_WINDOW
+    if event.end_time and timedelta(0) < event.end_time - event.date_time < DEFAULT_HALF_WINDOW:
+        half = event.end_time - event.date_time
+    return event.date_time - half, event.date_time + half
+
+
+def _geocentric(eph, target, t) -> np.ndarray:
+    """Apparent position of target at times t in km, equator-of-date axes, shape (3, len(t))"""
+    if isinstance(target, tuple):
+        body = Star(ra_hours=target[0] / 15.0, dec_degrees=target[1])
+    else:
+        body = resolve_body(eph, target)
+    ra, dec, distance = eph['earth'].at(t).observe(body).apparent().radec(epoch='date')
+    ra, dec = ra.radians, dec.radians
+    return distance.km * np.array([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)])
+
+
+def _zenith(gast_hours, latitudes, longitudes) -> np.ndarray:
+    """Unit vector to each observer's zenith at each time, shape (3, locations, times)"""
+    lat = np.radians(np.asarray(latitudes, dtype=float))[:, None]
+    sidereal = np.radians(gast_hours * 15.0 + np.asarray(longitudes, dtype=float)[:, None])
+    return np.array(np.broadcast_arrays(np.cos(lat) * np.cos(sidereal), np.cos(lat) * np.sin(sidereal), np.sin(lat)))
+
+
+def topocentric(position: np.ndarray, zenith: np.ndarray):
+    """
+    Distance (km) and altitude (degrees) of a geocentric position seen from each
+    observer, plus the unit vector towards it, all shaped (locations, times).
+    The shift from Earth's centre to its surface is what moves the Moon by up to
+    a degree; for everything else it is negligible.
+    """
+    vector = position[:, None, :] - EARTH_RADIUS_KM * zenith
+    distance = np.linalg.norm(vector, axis=0)
+    unit = vector / distance
+    altitude = np.degrees(np.arcsin(np.clip(np.sum(unit * zenith, axis=0), -1.0, 1.0)))
+    return distance, altitude, unit
+
+
+def _first_crossing(altitude: np.ndarray, horizon: float, rising: bool, after_index=None):
+    """
+    Fractional sample index of each row's first upward (or downward) crossing of
+    horizon, at or after after_index when given; NaN where there is none.
+    """
+    below, above = altitude[:, :-1] - horizon, altitude[:, 1:] - horizon
+    crossing = (below < 0) & (above >= 0) if rising else (below >= 0) & (above < 0)
+    if after_index is not None:
+        floor = np.nan_to_num(after_index, nan=0.0)[:, None]
+        crossing &= np.arange(crossing.shape[1]) >= np.floor(floor)
+    found = crossing.any(axis=1)
+    index = crossing.argmax(axis=1)
+    rows = np.arange(altitude.shape[0])
+    a, b = below[rows, index], above[rows, index]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(b != a, -a / (b - a), 0.0)
+    return np.where(found, index + fraction, np.nan)
+
+
+def _longest_run(mask: np.ndarray):
+    """First and last sample index of each row's longest run of True, and that run's length"""
+    samples = np.arange(mask.shape[1])
+    last_false = np.maximum.accumulate(np.where(mask, -1, samples), axis=1)
+    run = np.where(mask, samples - last_false, 0)
+    end = run.argmax(axis=1)
+    length = run.max(axis=1)
+    return end - length + 1, end, length
+
+
+def _at(start: datetime, step: timedelta, index) -> Optional[datetime]:
+    if index is None or np.isnan(index):
+        return None
+    return start + step * float(index)
+
+
+def is_solar_eclipse(event: CelestialEvent) -> bool:
+    return hasattr(event, 'eclipse') and event.eclipse.eclipse_type.startswith('solar')
+
+
+def viewing_mask(target, altitude: np.ndarray, sun, moon=None) -> np.ndarray:
+    """
+    Where the target can be seen, shaped like altitude. sun and moon are the
+    (distance, altitude, unit) triples from topocentric(); passing moon makes the
+    target a solar eclipse, seen only where the Moon's disc overlaps the Sun's.
+    """
+    if target != 'sun':
+        return (altitude > VIEWING_ALTITUDE) & (sun[1] < DARK_SUN_ALTITUDE)
+    mask = altitude > VIEWING_ALTITUDE
+    if moon is not None:
+        separation = np.arccos(np.clip(np.sum(sun[2] * moon[2], axis=0), -1.0, 1.0))
+        mask &= separation < np.arcsin(SUN_RADIUS_KM / sun[0]) + np.arcsin(MOON_RADIUS_KM / moon[0])
+    return mask
+
+
+def compute_visibility(events: List[CelestialEvent], locations: List[Location],
+                       step_minutes: int = None) -> Iterator[Dict]:
+    """
+    VisibilityDetail rows for every (event, location) pair.
+
+    Each event gets a time grid over event_window(). Every body's position is
+    computed in one Skyfield call across all the events' grids that need it, then
+    altitudes for all locations come from one broadcast per event. Events
+    without a sky target are skipped.
+    """
+    step = timedelta(minutes=step_minutes or settings.VISIBILITY_STEP_MINUTES)
+    ts = get_timescale()
+    eph = get_ephemeris()  # SKYFIELD_EPHEMERIS
+
+    grids = []
+    for event in events:
+        target = event_target(event)
+        if target is None:
+            continue
+        start, end = event_window(event)
+        bodies = {target, 'sun'} | ({'moon'} if is_solar_eclipse(event) else set())
+        grids.append((event, target, bodies, start, int((end - start) / step) + 1))
+    if not grids or not locations:
+        return
+
+    offsets = np.cumsum([0] + [count for *_, count in grids])
+    days = step.total_seconds() / 86400.0
+    t = ts.tt_jd(np.concatenate([
+        ts.from_datetime(start).tt + np.arange(count) * days for *_, start, count in grids
+    ]))
+    gast = t.gast
+
+    positions = {}
+    for body in set().union(*(bodies for _, _, bodies, _, _ in grids)):
+        indices = np.concatenate([
+            np.arange(offsets[i], offsets[i + 1]) for i, grid in enumerate(grids) if body in grid[2]
+        ])
+        positions[body] = np.full((3, len(t)), np.nan)
+        positions[body][:, indices] = _geocentric(eph, body, t[indices])
+
+    latitudes = [float(location.latitude) for location in locations]
+    longitudes = [float(location.longitude) for location in locations]
+
+    for i, (event, target, bodies, start, count) in enumerate(grids):
+        window = slice(offsets[i], offsets[i + 1])
+        zenith = _zenith(gast[window], latitudes, longitudes)
+        seen = {body: topocentric(positions[body][:, window], zenith) for body in bodies}
+        altitude = seen[target][1]
+        good = viewing_mask(target, altitude, seen['sun'], seen.get('moon'))
+
+        horizon = RISE_ALTITUDES.get(target, DEFAULT_RISE_ALTITUDE) if isinstance(target, str) else DEFAULT_RISE_ALTITUDE
+        rises = _first_crossing(altitude, horizon, rising=True)
+        sets = _first_crossing(altitude, horizon, rising=False, after_index=rises)
+        first, last, length = _longest_run(good)
+
+        for j, location in enumerate(locations):
+            visible = bool(length[j])
+            yield {
+                'celestial_event_id': event.id,
+                'location_id': location.id,
+                'visible': visible,
+                'rise_time': _at(start, step, rises[j]),
+                'set_time': _at(start, step, sets[j]),
+                'best_viewing_start': _at(start, step, first[j]) if visible else None,
+                'best_viewing_end': _at(start, step, last[j]) if visible else None,
+                'light_pollution_level': location.light_pollution_level,
+            }
+
+
+def refresh_visibility(events: Iterable[CelestialEvent] = None, locations: Iterable[Location] = None,
+                       step_minutes: int = None, chunk_size: int = 200) -> Dict:
+    """
+    Recompute and upsert VisibilityDetail for events × locations, chunk_size events at a time
+    (default: every event from now on, every location). Returns upsert counts and seconds taken.
+    """
+    started = perf_counter()
+    if events is None:
+        events = CelestialEvent.objects.filter(date_time__gte=timezone.now())
+    if hasattr(events, 'select_related'):
+        events = events.select_related('eclipse', 'meteorshower', 'planetaryevent').iterator(chunk_size=chunk_size)
+    locations = list(Location.objects.all() if locations is None else locations)
+
+    result = {'events': 0, 'locations': len(locations), 'inserted': 0, 'updated': 0}
+    events = iter(events)
+    while True:
+        chunk = list(islice(events, chunk_size))
+        if not chunk:
+            break
+        counts = ingest_events(
+            VisibilityDetail,
+            compute_visibility(chunk, locations, step_minutes),
+            key_fields=('celestial_event_id', 'location_id'),
+            update_fields=VISIBILITY_FIELDS,
+        )
+        result['events'] += len(chunk)
+        result['inserted'] += counts['inserted']
+        result['updated'] += counts['updated']
+    result['seconds'] = perf_counter() - started
+    return result
@@ -1,49 +1,216 @@
-from celery import shared_task
-from .models import Location
-from .services.api_service import fetch_sunrise_sunset
+import calendar
+import logging
+from celery import chord, group, shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.db.models import Max
+from .models import Location, MoonPhase, SunData
+from .services.sun_service import fetch_and_save_sun_data
 from django.utils import timezone
-from datetime import datetime
-from astronomical_events.services.moon_service import fetch_and_save_moon_phases
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from astronomical_events.services.moon_service import MoonPhaseService, save_moon_phases_to_db
 
+logger = logging.getLogger(__name__)
+
+
+def _retry_or_report(task, exc, summary):
+    """Retry the subtask with jittered exponential backoff; once retries run out, report the error instead of raising"""
+    if task.request.retries < settings.REFRESH_MAX_RETRIES:
+        countdown = get_exponential_backoff_interval(
+            factor=settings.REFRESH_RETRY_BACKOFF,
+            retries=task.request.retries,
+            maximum=settings.REFRESH_RETRY_BACKOFF_MAX,
+            full_jitter=True,
+        )
+        raise task.retry(exc=exc, countdown=countdown, max_retries=settings.REFRESH_MAX_RETRIES)
+    logger.error("Error refreshing %s for %s: %s", summary['kind'], summary['location'], exc)
+    summary['error'] = str(exc)
+    return summary
+
+
+@shared_task(bind=True)
+def refresh_location_sun_data(self, location_id, start_date, end_date=None):
+    """Sun data for one location; returns its summary for summarize_refresh"""
+    started = perf_counter()
+    summary = {'kind': 'sunrise_sunset', 'location': location_id, 'period': f"{start_date}..{end_date or start_date}"}
+    try:
+        location = Location.objects.get(pk=location_id)
+        summary['location'] = location.name
+        result = fetch_and_save_sun_data(
+            location, date.fromisoformat(start_date), date.fromisoformat(end_date or start_date)
+        )
+        summary.update(inserted=result['inserted'], updated=result['updated'])
+    except Exception as e:
+        summary = _retry_or_report(self, e, summary)
+    summary['seconds'] = perf_counter() - started
+    return summary
+
+
+@shared_task(bind=True)
+def refresh_location_moon_phases(self, location_id, start_date, end_date):
+    """Moon phases for one location and date range; returns its summary for summarize_refresh"""
+    started = perf_counter()
+    summary = {'kind': 'moon_phases', 'location': location_id, 'period': f"{start_date}..{end_date}"}
+    try:
+        location = Location.objects.get(pk=location_id)
+        summary['location'] = location.name
+        phases = MoonPhaseService().get_moon_phases(date.fromisoformat(start_date), date.fromisoformat(end_date))
+        result = save_moon_phases_to_db(phases, location)
+        summary.update(inserted=result['inserted'], updated=result['updated'])
+    except Exception as e:
+        summary = _retry_or_report(self, e, summary)
+    summary['seconds'] = perf_counter() - started
+    return summary
+
+
+@shared_task
+def summarize_refresh(summaries, kind, started_at):
+    """Chord callback: per-location and per-source totals across every subtask of a fan-out"""
+    per_location, per_kind = {}, {}
+    for summary in summaries:
+        totals = per_kind.setdefault(summary['kind'], {'subtasks': 0, 'inserted': 0, 'updated': 0, 'errors': 0})
+        totals['subtasks'] += 1
+        totals['inserted'] += summary.get('inserted', 0)
+        totals['updated'] += summary.get('updated', 0)
+        totals['errors'] += 'error' in summary
+        entry = per_location.setdefault(
+            summary['location'], {'subtasks': 0, 'inserted': 0, 'updated': 0, 'seconds': 0.0, 'errors': []}
+        )
+        entry['subtasks'] += 1
+        entry['inserted'] += summary.get('inserted', 0)
+        entry['updated'] += summary.get('updated', 0)
+        entry['seconds'] += summary['seconds']
+        if 'error' in summary:
+            entry['errors'].append(f"{summary['period']}: {summary['error']}")
+
+    report = {
+        'kind': kind,
+        'locations': per_location,
+        'sources': per_kind,
+        'subtasks': sum(entry['subtasks'] for entry in per_location.values()),
+        'inserted': sum(entry['inserted'] for entry in per_location.values()),
+        'updated': sum(entry['updated'] for entry in per_location.values()),
+        'failed_locations': sorted(name for name, entry in per_location.items() if entry['errors']),
+        'wall_seconds': (timezone.now() - datetime.fromisoformat(started_at)).total_seconds(),
+    }
+    logger.info("%s refresh: %d subtasks over %d locations, %d inserted, %d updated in %.1fs",
+                kind, report['subtasks'], len(per_location), report['inserted'], report['updated'],
+                report['wall_seconds'])
+    return report
+
+
+def fan_out(jobs, kind):
+    """
+    Run task(*args) for every (task, args) job as one chord.
+
+    The refresh subtasks are routed to REFRESH_QUEUE (see CELERY_TASK_ROUTES), whose
+    worker pool of REFRESH_CONCURRENCY processes pulls the next queued job as soon
+    as one is free. A slow job or one waiting out a retry countdown therefore holds
+    up nothing but itself, and no more than REFRESH_CONCURRENCY subtasks run at once
+    across every fan-out. The chord callback receives every job's summary.
+    """
+    started_at = timezone.now().isoformat()
+    return chord(group(task.s(*args) for task, args in jobs))(summarize_refresh.s(kind, started_at))
+
+
+def _location_ids():
+    return [str(pk) for pk in Location.objects.values_list('id', flat=True)]
 
 
 @shared_task
 def update_sunrise_sunset_events():
-    """Update sunrise/sunset data for all locations"""
-    from datetime import date
-    locations = Location.objects.all()
-    
-    for location in locations:
-        try:
-            fetch_sunrise_sunset(location, date.today().isoformat())
-        except Exception as e:
-            print(f"Error fetching sunrise/sunset for {location.name}: {e}")
+    """Update sunrise/sunset data for all locations (computed locally, no HTTP)"""
+    today = date.today().isoformat()
+    items = [(location_id, today) for location_id in _location_ids()]
+    if items:
+        fan_out([(refresh_location_sun_data, item) for item in items], 'sunrise_sunset')
+    return len(items)
 
 @shared_task
 def update_moon_phases():
-    """Update moon phase data for all locations"""
+    """Update current and next month's moon phases, one subtask per location and month"""
     current_time = datetime.now()
-    locations = Location.objects.all()
-    
-    for location in locations:
-        try:
-            # Fetch current month's moon phases
-            fetch_and_save_moon_phases(location, current_time.year, current_time.month)
-            
-            # Also fetch next month's data
-            next_month = current_time.month + 1
-            year = current_time.year
-            if next_month > 12:
-                next_month = 1
-                year += 1
-            
-            fetch_and_save_moon_phases(location, year, next_month)
-            
-        except Exception as e:
-            print(f"Error fetching moon phases for {location.name}: {e}")
+    next_month = current_time.month + 1
+    year = current_time.year
+    if next_month > 12:
+        next_month = 1
+        year += 1
+    months = [(current_time.year, current_time.month), (year, next_month)]
+
+    items = [
+        (location_id, date(y, m, 1).isoformat(), date(y, m, calendar.monthrange(y, m)[1]).isoformat())
+        for location_id in _location_ids()
+        for y, m in months
+    ]
+    if items:
+        fan_out([(refresh_location_moon_phases, item) for item in items], 'moon_phases')
+    return len(items)
 
 @shared_task
 def update_all_astronomical_data():
     """Update all astronomical data (sunrise/sunset and moon phases)"""
     update_sunrise_sunset_events.delay()
-    update_moon_phases.delay()
\ No newline at end of file
+    update_moon_phases.delay()
+
+
+def materialised_horizons():
+    """Latest date already stored per source and location (two grouped queries)"""
+    sun = SunData.objects.filter(location__isnull=False).values('location').annotate(last=Max('date'))
+    moon = MoonPhase.objects.filter(location__isnull=False).values('location').annotate(last=Max('date_time'))
+    return {
+        'sunrise_sunset': {str(row['location']): row['last'] for row in sun},
+        # Daily phases are stamped at local noon, which falls on the same UTC date
+        'moon_phases': {str(row['location']): row['last'].date() for row in moon},
+    }
+
+
+def plan_incremental_refresh(today: date = None, horizon_days: int = None):
+    """
+    The window each location still needs per source so data reaches today + horizon_days.
+
+    Returns {source: [(location_id, start_date, end_date), ...]} with ISO dates;
+    locations already materialised up to the horizon are left out.
+    """
+    today = today or date.today()
+    target = today + timedelta(days=horizon_days or settings.REFRESH_HORIZON_DAYS)
+    horizons = materialised_horizons()
+    location_ids = _location_ids()
+
+    plan = {}
+    for source, last_dates in horizons.items():
+        plan[source] = []
+        for location_id in location_ids:
+            last = last_dates.get(location_id)
+            start = max(today, last + timedelta(days=1)) if last else today
+            if start <= target:
+                plan[source].append((location_id, start.isoformat(), target.isoformat()))
+    return plan
+
+
+REFRESH_TASKS = {
+    'sunrise_sunset': refresh_location_sun_data,
+    'moon_phases': refresh_location_moon_phases,
+}
+
+
+@shared_task
+def update_daily_astronomical_data():
+    """
+    Scheduled incremental refresh: compute only the days each location is
+    missing up to the horizon. Every source shares one fan-out on the refresh
+    queue, so at most REFRESH_CONCURRENCY subtasks run at once in total. Returns the plan size per
+    source; summarize_refresh reports rows added and timing per source.
+    """
+    started = perf_counter()
+    plan = plan_incremental_refresh()
+    jobs = [(REFRESH_TASKS[source], item) for source, items in plan.items() for item in items]
+    if jobs:
+        fan_out(jobs, 'daily')
+    for source, items in plan.items():
+        days = sum((date.fromisoformat(end) - date.fromisoformat(start)).days + 1 for _, start, end in items)
+        logger.info("%s: %d locations behind, %d location-days to materialise", source, len(items), days)
+    return {
+        'planned': {source: len(items) for source, items in plan.items()},
+        'planning_seconds': perf_counter() - started,
+    }
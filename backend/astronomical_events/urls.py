@@ -23,5 +23,6 @@ urlpatterns = [
     path('set-location/', views.SetLocationView.as_view(), name='set_location'),
     path('sun/today/', views.TodaysSunDataView.as_view(), name='todays-sun-data'),
     path('constellations/', views.ConstellationTransitionList.as_view(), name='constellation-events'),
+    path('timeline/', views.TimelineView.as_view(), name='timeline'),
     path('constellations/planetary/', views.PlanetaryTransitionList.as_view(), name='planetary-events'),
 ]
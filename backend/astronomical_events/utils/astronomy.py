@@ -1,13 +1,19 @@
-from skyfield.api import load, Topos
-from datetime import datetime, timezone
+from skyfield.api import wgs84
+from ..services.ephemeris import get_ephemeris, get_timescale
+from ..services.visibility import _geocentric, _zenith, topocentric, viewing_mask
 
 def is_event_visible(event_time, location):
-    ts = load.timescale()
+    """
+    Whether the Sun is above the horizon at location during event_time's UTC hour.
+    Kept only for compatibility: nothing in this project calls it any more, and
+    new code should use is_target_observable, which applies the engine's rules.
+    """
+    ts = get_timescale()
     t = ts.utc(event_time.year, event_time.month, event_time.day, event_time.hour)
     
-    planets = load('de421.bsp')
+    planets = get_ephemeris('de421')
     earth = planets['earth']
-    observer = earth + Topos(latitude_degrees=location.latitude, longitude_degrees=location.longitude)
+    observer = earth + wgs84.latlon(location.latitude, location.longitude)
     
     sun = planets['sun']
     difference = sun - observer
@@ -15,3 +21,19 @@ def is_event_visible(event_time, location):
     
     return alt.degrees > 0  # Above the horizon
 
+
+def is_target_observable(event_time, location, target='sun'):
+    """
+    Whether `target` (an ephemeris body name or an (ra, dec) pair in degrees) can be
+    seen from location at exactly event_time, by the VisibilityDetail engine's rules:
+    at least VIEWING_ALTITUDE high and, for anything but the Sun, against a sky
+    darker than civil twilight. Unlike is_event_visible this uses the exact time, not the hour.
+    """
+    ts = get_timescale()
+    eph = get_ephemeris()  # SKYFIELD_EPHEMERIS
+    t = ts.tt_jd([ts.from_datetime(event_time).tt])
+    zenith = _zenith(t.gast, [float(location.latitude)], [float(location.longitude)])
+
+    sun = topocentric(_geocentric(eph, 'sun', t), zenith)
+    seen = sun if target == 'sun' else topocentric(_geocentric(eph, target, t), zenith)
+    return bool(viewing_mask(target, seen[1], sun)[0, 0])
@@ -1,11 +1,17 @@
+import json
 import logging
+import math
+import uuid
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
 from rest_framework import viewsets , generics, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 from datetime import datetime, date, timedelta
-from rest_framework.pagination import PageNumberPagination 
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
 from django.db.models import Q
 from .models import *
 from .serializers import (
@@ -22,21 +28,129 @@ from .serializers import (
     VisibilityDetailSerializer,
     SunDataSerializer,
     MoonPhaseSerializer,
+    time_until,
 )
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from astronomical_events.services.moon_service import fetch_and_save_yearly_moon_phases
+from astronomical_events.services.locations import nearest_location
+from astronomical_events.services.moon_service import fetch_and_save_moon_phases
+from astronomical_events.services.response_cache import (
+    cached_response, namespace_versions, namespaces_for, response_cache_enabled, response_cache_key,
+    response_cache_stats, store_response, to_cacheable,
+)
+from astronomical_events.services.timeline import (
+    TIMELINE_TYPES, decode_cursor, encode_cursor, merge_timeline, timeline_sources,
+)
 from .serializers import MoonPhaseSerializer
 from datetime import datetime
 
-class LargeResultsSetPagination(PageNumberPagination):
-    page_size = 1000 
-    page_size_query_param = 'page_size' 
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on (ordering field, pk). The cursor holds the last row's
+    values, so every page is one indexed range read whatever its depth, and a
+    client can stop and resume from any `next` link. The ordering is the
+    view's OrderingFilter field (first one only) or `date_time`.
+    """
+    ordering = 'date_time'
+    page_size_query_param = 'page_size'
     max_page_size = 1000
 
+    def position(self, instance):
+        value = getattr(instance, self.field)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        return json.dumps([value, str(instance.pk)])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.field = self.ordering[0].lstrip('-')
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        # A `previous` cursor reads backwards from its row and flips the page afterwards
+        backwards = self.ordering[0].startswith('-') != reverse
+        sign = '-' if backwards else ''
+        queryset = queryset.order_by(f'{sign}{self.field}', f'{sign}pk')
+        if self.cursor:
+            try:
+                value, pk = json.loads(self.cursor.position)
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if backwards else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'pk__{lookup}': pk})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.page = rows[:self.page_size]
+        more = len(rows) > self.page_size
+        if reverse:
+            self.page.reverse()
+        self.has_next = more if not reverse else bool(self.page)
+        self.has_previous = more if reverse else bool(self.cursor and self.page)
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.position(self.page[0])))
+
+
+class LargeResultsSetPagination(KeysetPagination):
+    page_size = 1000
+
+
+class CachedListMixin:
+    """
+    Serve list() from the shared response cache. Keys carry the versions of
+    the cache_models namespaces, which every write to those models bumps from
+    whichever process makes it, so a cached page is never stale;
+    RESPONSE_CACHE_TTL only bounds memory. Without a shared cache every request
+    goes straight to the database.
+    """
+    cache_name = None
+    cache_models = ()
+
+    def cache_key_extra(self, request):
+        """Anything besides the query params that the response depends on"""
+        return ''
+
+    def refresh_cached(self, data):
+        """Bring time-relative values of a cached response up to date"""
+        return data
+
+    def list(self, request, *args, **kwargs):
+        if not response_cache_enabled():
+            return super().list(request, *args, **kwargs)
+        key = response_cache_key(
+            self.cache_name, namespaces_for(*self.cache_models), request.get_host(), request.path,
+            request.query_params, self.cache_key_extra(request),
+        )
+        data = cached_response(self.cache_name, key)
+        if data is not None:
+            response = Response(self.refresh_cached(data))
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            store_response(key, to_cacheable(response.data), settings.RESPONSE_CACHE_TTL)
+        response['X-Cache'] = 'MISS'
+        return response
+
 class CelestialEventViewSet(viewsets.ModelViewSet):
-    queryset = CelestialEvent.objects.all()
+    queryset = CelestialEvent.objects.prefetch_related('event_images')
     serializer_class = CelestialEventSerializer
     pagination_class = LargeResultsSetPagination
 
@@ -69,13 +183,41 @@ class CelestialEventViewSet(viewsets.ModelViewSet):
 class LocationViewSet(viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
+
+    @action(detail=False, methods=['get'])
+    def nearest(self, request):
+        """Closest known location to ?lat=&lon=, optionally only within ?max_km="""
+        try:
+            latitude = float(request.query_params['lat'])
+            longitude = float(request.query_params['lon'])
+            max_km = request.query_params.get('max_km')
+            max_km = float(max_km) if max_km else None
+        except (KeyError, ValueError):
+            return Response(
+                {"detail": "Provide numeric lat and lon (and optionally max_km) query parameters."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # float() accepts 'nan' and 'inf', which would match nothing or everything
+        if not (math.isfinite(latitude) and -90 <= latitude <= 90
+                and math.isfinite(longitude) and -180 <= longitude <= 180
+                and (max_km is None or (math.isfinite(max_km) and max_km >= 0))):
+            return Response(
+                {"detail": "lat must be within ±90, lon within ±180 and max_km a non-negative number."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        match = nearest_location(latitude, longitude, max_km)
+        if match is None:
+            return Response({"detail": "No location found within range."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({**match, "id": str(match["id"])})
 logger = logging.getLogger(__name__ )
 
 class HealthCheckView(APIView):
     def get(self, request):
         return JsonResponse({
             "status": "healthy",
-            "timestamp": timezone.now().isoformat()
+            "timestamp": timezone.now().isoformat(),
+            "response_cache": response_cache_stats(),
         })
 
 class SetLocationView(APIView):
@@ -96,6 +238,19 @@ class SetLocationView(APIView):
             
             serializer = LocationSerializer(data=request.data)
             if serializer.is_valid():
+                match = nearest_location(
+                    float(serializer.validated_data['latitude']),
+                    float(serializer.validated_data['longitude']),
+                    settings.LOCATION_MATCH_KM,
+                )
+                if match:
+                    logger.info(f"Reusing location {match['id']} ({match['distance_km']:.2f} km away)")
+                    return Response({
+                        "message": "Location already exists",
+                        "location_id": str(match['id']),
+                        "reused": True,
+                    }, status=status.HTTP_200_OK)
+
                 location = serializer.save()
                 logger.info(f"Location saved successfully: {location.id}")
                 return Response({
@@ -142,11 +297,11 @@ class VisibilityDetailList(generics.ListAPIView):
         return VisibilityDetail.objects.all()
     
 class SunDataViewSet(viewsets.ModelViewSet):
-      queryset = SunData.objects.all()
+      queryset = SunData.objects.select_related('location')
       serializer_class = SunDataSerializer
     
       def get_queryset(self):
-        queryset = SunData.objects.all()
+        queryset = SunData.objects.select_related('location')
         
         # Filter by location if provided
         location_id = self.request.query_params.get('location')
@@ -169,12 +324,17 @@ class SunDataViewSet(viewsets.ModelViewSet):
         
         return queryset.order_by('-date')
 
-class TodaysSunDataView(generics.ListAPIView):
+class TodaysSunDataView(CachedListMixin, generics.ListAPIView):
     serializer_class = SunDataSerializer
+    cache_name = 'sun_today'
+    cache_models = (SunData, Location)
+
+    def cache_key_extra(self, request):
+        return date.today().isoformat()
     
     def get_queryset(self):
         today = date.today()
-        queryset = SunData.objects.filter(date=today)
+        queryset = SunData.objects.select_related('location').filter(date=today)
         
         location_id = self.request.query_params.get('location')
         if location_id:
@@ -183,12 +343,28 @@ class TodaysSunDataView(generics.ListAPIView):
         return queryset.order_by('location__name')
     
 
-class MoonPhaseViewSet(viewsets.ModelViewSet):
-    queryset = MoonPhase.objects.all()
+class MoonPhaseViewSet(CachedListMixin, viewsets.ModelViewSet):
+    queryset = MoonPhase.objects.select_related('location')
     serializer_class = MoonPhaseSerializer
+    pagination_class = KeysetPagination
+    cache_name = 'moonphases'
+    cache_models = (MoonPhase, Location)
+
+    def cache_key_extra(self, request):
+        # upcoming/current_month filter on the clock; let such pages roll over hourly
+        params = request.query_params
+        if 'true' in (params.get('upcoming', '').lower(), params.get('current_month', '').lower()):
+            return timezone.now().strftime('%Y-%m-%dT%H')
+        return ''
+
+    def refresh_cached(self, data):
+        now = timezone.now()
+        for phase in data['results'] if isinstance(data, dict) else data:
+            phase['time_until'] = time_until(datetime.fromisoformat(phase['date_time']), now)
+        return data
     
     def get_queryset(self):
-        queryset = MoonPhase.objects.all()
+        queryset = MoonPhase.objects.select_related('location')
         
         # Filter by location if provided
         location_id = self.request.query_params.get('location')
@@ -227,7 +403,7 @@ class MoonPhaseViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def next_full_moon(self, request):
         """Get the next full moon"""
-        next_full_moon = MoonPhase.objects.filter(
+        next_full_moon = MoonPhase.objects.select_related('location').filter(
             phase='full_moon',
             date_time__gt=timezone.now()
         ).order_by('date_time').first()
@@ -244,7 +420,7 @@ class MoonPhaseViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def next_new_moon(self, request):
         """Get the next new moon"""
-        next_new_moon = MoonPhase.objects.filter(
+        next_new_moon = MoonPhase.objects.select_related('location').filter(
             phase='new_moon',
             date_time__gt=timezone.now()
         ).order_by('date_time').first()
@@ -262,7 +438,7 @@ class MoonPhaseViewSet(viewsets.ModelViewSet):
     def current_phase(self, request):
         """Get the current moon phase"""
         now = timezone.now()
-        current_phase = MoonPhase.objects.filter(
+        current_phase = MoonPhase.objects.select_related('location').filter(
             date_time__lte=now
         ).order_by('-date_time').first()
         
@@ -298,7 +474,7 @@ class MoonPhaseViewSet(viewsets.ModelViewSet):
                     }
                 )[0]
             
-            phases_count = fetch_and_save_yearly_moon_phases(location, year, month)
+            phases_count = fetch_and_save_moon_phases(location, int(year), int(month))
             
             return Response({
                 'message': f'Successfully fetched {phases_count} moon phases',
@@ -315,65 +491,164 @@ class MoonPhaseViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def calendar(self, request):
-        """Get moon phases for the entire year, grouped by month"""
+        """
+        Get moon phases for the entire year, grouped by month (one range query).
+        With a shared cache the result is kept per year and location until a
+        write to MoonPhase or Location, from any process, bumps their versions.
+        """
         year = int(request.query_params.get('year', datetime.now().year))
         location_id = request.query_params.get('location')
 
-        # Prepare response container
-        calendar_data = []
-
-        # Loop through all 12 months
-        for month in range(1, 13):
-            start_date = datetime(year, month, 1)
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-            
-            queryset = MoonPhase.objects.filter(
-                date_time__date__range=[start_date.date(), end_date.date()]
+        key = calendar_data = None
+        if response_cache_enabled():
+            versions = namespace_versions(namespaces_for(MoonPhase, Location))
+            if versions is not None:
+                key = f"moon_calendar:{versions}:{year}:{location_id or 'all'}"
+            calendar_data = cached_response('moon_calendar', key)
+        if calendar_data is None:
+            # A plain range on date_time (rather than date_time__date) can use its index
+            tz = timezone.get_current_timezone()
+            queryset = MoonPhase.objects.select_related('location').filter(
+                date_time__gte=datetime(year, 1, 1, tzinfo=tz),
+                date_time__lt=datetime(year + 1, 1, 1, tzinfo=tz),
             )
-
             if location_id:
                 queryset = queryset.filter(location_id=location_id)
 
-            phases = queryset.order_by('date_time')
-            serializer = self.get_serializer(phases, many=True)
-
-            calendar_data.append({
-                'month': month,
-                'phases': serializer.data
-            })
+            phases = list(queryset.order_by('date_time'))
+            calendar_data = [{'month': month, 'phases': []} for month in range(1, 13)]
+            for phase, data in zip(phases, self.get_serializer(phases, many=True).data):
+                calendar_data[timezone.localtime(phase.date_time, tz).month - 1]['phases'].append(data)
+            if key:
+                store_response(key, to_cacheable(calendar_data), settings.MOON_CALENDAR_CACHE_TTL)
+        else:
+            now = timezone.now()
+            for month in calendar_data:
+                for phase in month['phases']:
+                    phase['time_until'] = time_until(datetime.fromisoformat(phase['date_time']), now)
 
         return Response({
             'year': year,
             'calendar': calendar_data
         })
     
-class EarthOrbitEventViewSet(viewsets.ModelViewSet):
+class EarthOrbitEventViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = EarthOrbitEvent.objects.all().order_by('-date')
     serializer_class = EarthOrbitEventSerializer
+    cache_name = 'earth'
+    cache_models = (EarthOrbitEvent,)
 
-class ConstellationTransitionList(generics.ListAPIView):
+class ConstellationTransitionList(CachedListMixin, generics.ListAPIView):
     """All constellation transitions for major bodies."""
-    queryset = CelestialEvent.objects.filter(event_type__in=['conjunction', 'planetary_event']).order_by('-date_time')
+    queryset = CelestialEvent.objects.filter(
+        event_type__in=['conjunction', 'planetary_event']
+    ).prefetch_related('event_images').order_by('-date_time')
     serializer_class = CelestialEventSerializer
+    pagination_class = KeysetPagination
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
     ordering_fields = ['date_time', 'name']
+    ordering = '-date_time'
+    cache_name = 'constellations'
+    cache_models = (CelestialEvent, PlanetaryEvent, EventImage)
     search_fields = ['name', 'description', 'external_id']
 
 
-class PlanetaryTransitionList(generics.ListAPIView):
+class PlanetaryTransitionList(CachedListMixin, generics.ListAPIView):
     """Detailed view of planetary transitions."""
-    queryset = PlanetaryEvent.objects.select_related('celestialevent_ptr').all().order_by('-date_time')
+    queryset = PlanetaryEvent.objects.select_related('celestialevent_ptr').prefetch_related(
+        'celestialevent_ptr__event_images'
+    ).order_by('-date_time')
     serializer_class = PlanetaryEventSerializer
+    pagination_class = KeysetPagination
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
     ordering_fields = ['date_time', 'planet_name']
+    ordering = '-date_time'
+    cache_name = 'planetary'
+    cache_models = (PlanetaryEvent, EventImage)
     search_fields = ['planet_name', 'constellation']
 
-class EclipseViewSet(viewsets.ModelViewSet):
+class EclipseViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Eclipse.objects.all().order_by('date_time')
     serializer_class = EclipseSerializer
+    pagination_class = KeysetPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'eclipse_type']
-    ordering_fields = ['date_time', 'importance_level']
\ No newline at end of file
+    ordering_fields = ['date_time', 'importance_level']
+    ordering = 'date_time'
+    cache_name = 'eclipses'
+    cache_models = (Eclipse,)
+
+
+class TimelineView(APIView):
+    """
+    Moon phases, eclipses, Earth orbit events and lunar apogee/perigee merged into
+    one time-ordered feed. Query params: start/end (ISO date or datetime, end
+    exclusive; default the year from today), types (comma-separated TIMELINE_TYPES),
+    location, limit and cursor (the `next_cursor` of the previous page).
+    """
+    SERIALIZERS = {
+        'moon_phase': MoonPhaseSerializer,
+        'eclipse': EclipseSerializer,
+        'earth_orbit': EarthOrbitEventSerializer,
+        'moon_apsis': CelestialEventSerializer,
+    }
+
+    def parse_moment(self, value, default):
+        if not value:
+            return default
+        moment = datetime.fromisoformat(value)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def item(self, source, moment, row):
+        data = self.SERIALIZERS[source](row, context={'request': self.request}).data
+        if source == 'moon_phase':
+            title = row.get_phase_display()
+        elif source == 'earth_orbit':
+            title = f"Earth at {row.phenom}"
+        else:
+            title = row.name
+        location_id = getattr(row, 'location_id', None)
+        return {
+            'id': str(row.id),
+            'type': row.event_type if source == 'moon_apsis' else source,
+            'title': title,
+            'date_time': moment.isoformat(),
+            'location': str(location_id) if location_id else None,
+            'data': data,
+        }
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+            start = self.parse_moment(params.get('start'), today)
+            end = self.parse_moment(params.get('end'), start + timedelta(days=365))
+            types = params['types'].split(',') if params.get('types') else list(TIMELINE_TYPES)
+            unknown = [name for name in types if name not in TIMELINE_TYPES]
+            if unknown:
+                raise ValueError(f"Unknown types: {', '.join(unknown)}")
+            limit = min(int(params.get('limit', settings.TIMELINE_PAGE_SIZE)), settings.TIMELINE_MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError("limit must be positive")
+            cursor = decode_cursor(params['cursor']) if params.get('cursor') else None
+            location_id = uuid.UUID(params['location']) if params.get('location') else None
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        sources = timeline_sources(start, end, types, location_id, cursor, limit + 1)
+        page, next_cursor = merge_timeline(sources, limit)
+
+        next_url = None
+        if next_cursor:
+            query = params.copy()
+            query['cursor'] = encode_cursor(next_cursor)
+            next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'next': next_url,
+            'next_cursor': encode_cursor(next_cursor) if next_cursor else None,
+            'results': [self.item(source, moment, row) for (moment, source, _), row in page],
+        })
@@ -10,6 +10,23 @@ const phenomDescriptions = {
   "True Anomaly": "The angle between the direction of perihelion and the current position of Earth in its orbit."
 };
 
+export const toEarthEvent = (event) => {
+  const normalizedDate = new Date(event.date);
+  return {
+    ...event,
+    id: event.id,
+    type: 'Orbital',
+    title: `Earth at ${event.phenom}`,
+    date: normalizedDate,
+    color: '#5e232a',
+    icon: '🌏',
+    description: phenomDescriptions[event.phenom] || 'No description available.',
+    season:event.season,
+    distance:event.distance_million_km,
+    overview:event.overview
+  };
+};
+
 const useEarthService = () => {
   const [events, setEvents] = useState([]);
   const [typedEvents, setTypedEvents] = useState([]);
@@ -21,22 +38,7 @@ const useEarthService = () => {
       try {
         const response = await axios.get(`http://localhost:8000/earth/`);
 
-        const transformed = response.data.results.map(event => {
-          const normalizedDate = new Date(event.date);
-          return {
-            ...event,
-            id: event.id,
-            type: 'Orbital',
-            title: `Earth at ${event.phenom}`,
-            date: normalizedDate,
-            color: '#5e232a',
-            icon: '🌏',
-            description: phenomDescriptions[event.phenom] || 'No description available.',
-            season:event.season,
-            distance:event.distance_million_km,
-            overview:event.overview
-          };
-        });
+        const transformed = response.data.results.map(toEarthEvent);
 
         setEvents(response.data.results);
         setTypedEvents(transformed);
@@ -2,6 +2,44 @@ import { useEffect, useState } from 'react';
 import axios from 'axios';
 
 
+const truncateDescription = (text, wordLimit) => {
+    if (!text) return 'No description available.';
+    const words = text.split(' ');
+    return words.length > wordLimit
+        ? words.slice(0, wordLimit).join(' ') 
+        : text;
+    };
+
+export const toEclipseEvent = (event) => {
+  const normalizedDate = new Date(event.date_time);
+  return {
+    ...event,
+    id: event.id,
+    type: 'Eclipse',
+    title: event.raw_api_data?.type
+        .replace(/_/g, ' ')        
+        .replace(/\b\w/g, c => c.toUpperCase()),
+    date: normalizedDate,
+    icon: '🌕',
+    color:'red',
+    description: truncateDescription(event.description, 26),
+    overview: `Obscuration: ${event.obscuration_percentage}% • Duration: ${(event.duration_seconds / 60).toFixed(1)} mins • Type: ${event.eclipse_type.replace('_', ' ')}`,
+    timings: {
+        rise: event.raw_api_data?.rise,
+        set: event.raw_api_data?.set,
+        highlights: event.raw_api_data?.eventHighlights || {},
+        },
+    altitudes: {
+        partialBegin: event.partial_begin_altitude,
+        totalBegin: event.total_begin_altitude,
+        peak: event.peak_altitude,
+        totalEnd: event.total_end_altitude,
+        partialEnd: event.partial_end_altitude,
+    },
+    visibility: event.visibility_regions,
+    };
+};
+
 const useEclipseService = () => {
   const [events, setEvents] = useState([]);
   const [typedEvents, setTypedEvents] = useState([]);
@@ -12,42 +50,7 @@ const useEclipseService = () => {
     const fetchEclipseEvents = async () => {
       try {
         const response = await axios.get(`http://localhost:8000/eclipses/`);
-        const truncateDescription = (text, wordLimit) => {
-            if (!text) return 'No description available.';
-            const words = text.split(' ');
-            return words.length > wordLimit
-                ? words.slice(0, wordLimit).join(' ') 
-                : text;
-            };
-        const transformed = response.data.results.map(event => {
-          const normalizedDate = new Date(event.date_time);
-          return {
-            ...event,
-            id: event.id,
-            type: 'Eclipse',
-            title: event.raw_api_data?.type
-                .replace(/_/g, ' ')        
-                .replace(/\b\w/g, c => c.toUpperCase()),
-            date: normalizedDate,
-            icon: '🌕',
-            color:'red',
-            description: truncateDescription(event.description, 26),
-            overview: `Obscuration: ${event.obscuration_percentage}% • Duration: ${(event.duration_seconds / 60).toFixed(1)} mins • Type: ${event.eclipse_type.replace('_', ' ')}`,
-            timings: {
-                rise: event.raw_api_data?.rise,
-                set: event.raw_api_data?.set,
-                highlights: event.raw_api_data?.eventHighlights || {},
-                },
-            altitudes: {
-                partialBegin: event.partial_begin_altitude,
-                totalBegin: event.total_begin_altitude,
-                peak: event.peak_altitude,
-                totalEnd: event.total_end_altitude,
-                partialEnd: event.partial_end_altitude,
-            },
-            visibility: event.visibility_regions,
-            };
-        });
+        const transformed = response.data.results.map(toEclipseEvent);
 
         setEvents(response.data.results);
         setTypedEvents(transformed);
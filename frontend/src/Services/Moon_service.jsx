@@ -1,6 +1,54 @@
 import { useEffect, useState } from 'react';
 import axios from 'axios';
 
+// Collapse consecutive daily rows of the same phase into one calendar event per phase
+export const toMoonEvents = (rawMoonData) => {
+  const uniquePhases = new Map();
+  const lastSeenPhaseDate = new Map();
+
+  const sortedMoonData = [...rawMoonData].sort(
+    (a, b) => new Date(a.date_time).getTime() - new Date(b.date_time).getTime()
+  );
+
+  sortedMoonData.forEach(item => {
+    const date = new Date(item.date_time);
+    const normalizedDate = new Date(date.getFullYear(), date.getMonth(), date.getDate());
+    const phaseDisplay = item.phase_display;
+
+    const lastDateForThisPhase = lastSeenPhaseDate.get(phaseDisplay);
+    let shouldAdd = true;
+
+    if (lastDateForThisPhase) {
+      const dayBefore = new Date(normalizedDate);
+      dayBefore.setDate(normalizedDate.getDate() - 1);
+
+      if (lastDateForThisPhase.getTime() === dayBefore.getTime()) {
+        shouldAdd = false;
+      }
+    }
+
+    if (shouldAdd) {
+      const dateKey = `${normalizedDate.toISOString().split('T')[0]}-${phaseDisplay}`;
+      if (!uniquePhases.has(dateKey)) {
+        uniquePhases.set(dateKey, {
+          id: item.id,
+          title: `${phaseDisplay}`,
+          date: normalizedDate,
+          type: 'Moon Phase',
+          color: '#253A7C',
+          icon: item.icon || '🌙',
+          description: item.description,
+          illumination: item.illumination_percentage,
+        });
+      }
+    }
+
+    lastSeenPhaseDate.set(phaseDisplay, normalizedDate);
+  });
+
+  return Array.from(uniquePhases.values());
+};
+
 const useMoonService = () => {
   const [rawMoonData, setRawMoonData] = useState([]); 
   const [processedMoonEvents, setProcessedMoonEvents] = useState([]); 
@@ -29,50 +77,7 @@ const useMoonService = () => {
 
   useEffect(() => {
     if (rawMoonData && Array.isArray(rawMoonData)) {
-      const uniquePhases = new Map();
-      const lastSeenPhaseDate = new Map();
-
-      const sortedMoonData = [...rawMoonData].sort(
-        (a, b) => new Date(a.date_time).getTime() - new Date(b.date_time).getTime()
-      );
-
-      sortedMoonData.forEach(item => {
-        const date = new Date(item.date_time);
-        const normalizedDate = new Date(date.getFullYear(), date.getMonth(), date.getDate());
-        const phaseDisplay = item.phase_display;
-
-        const lastDateForThisPhase = lastSeenPhaseDate.get(phaseDisplay);
-        let shouldAdd = true;
-
-        if (lastDateForThisPhase) {
-          const dayBefore = new Date(normalizedDate);
-          dayBefore.setDate(normalizedDate.getDate() - 1);
-
-          if (lastDateForThisPhase.getTime() === dayBefore.getTime()) {
-            shouldAdd = false;
-          }
-        }
-
-        if (shouldAdd) {
-          const dateKey = `${normalizedDate.toISOString().split('T')[0]}-${phaseDisplay}`;
-          if (!uniquePhases.has(dateKey)) {
-            uniquePhases.set(dateKey, {
-              id: item.id,
-              title: `${phaseDisplay}`,
-              date: normalizedDate,
-              type: 'Moon Phase',
-              color: '#253A7C',
-              icon: item.icon || '🌙',
-              description: item.description,
-              illumination: item.illumination_percentage,
-            });
-          }
-        }
-
-        lastSeenPhaseDate.set(phaseDisplay, normalizedDate);
-      });
-
-      setProcessedMoonEvents(Array.from(uniquePhases.values()));
+      setProcessedMoonEvents(toMoonEvents(rawMoonData));
     }
   }, [rawMoonData]);
 
@@ -0,0 +1,63 @@
+import { useEffect, useMemo, useState } from 'react';
+import axios from 'axios';
+import { toMoonEvents } from './Moon_service';
+import { toEarthEvent } from './Earth_service';
+import { toEclipseEvent } from './Eclipse_service';
+import { toMoonPosEvent } from './moon_pos_service';
+
+// One request (plus follow-up pages) to /timeline/ per year window instead of one per event service
+const useTimelineService = (year = new Date().getFullYear()) => {
+  const [items, setItems] = useState([]);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    // Ignore a slow response for a year the caller has already navigated away from
+    let cancelled = false;
+    const fetchTimeline = async () => {
+      setLoading(true);
+      setError(null);
+      try {
+        const collected = [];
+        // The year plus the neighbouring months shown as padding days in its first and last month
+        let url = `http://localhost:8000/timeline/?start=${year - 1}-12-01&end=${year + 1}-02-01&limit=1000`;
+        while (url && !cancelled) {
+          const response = await axios.get(url);
+          collected.push(...response.data.results);
+          url = response.data.next;
+        }
+        if (!cancelled) setItems(collected);
+      } catch (err) {
+        console.error('Error fetching timeline:', err);
+        if (!cancelled) setError(err);
+      } finally {
+        if (!cancelled) setLoading(false);
+      }
+    };
+
+    fetchTimeline();
+    return () => {
+      cancelled = true;
+    };
+  }, [year]);
+
+  const split = useMemo(() => {
+    const ofType = (...types) => items.filter(item => types.includes(item.type)).map(item => item.data);
+    const earthEvents = ofType('earth_orbit');
+    const EclipsEvents = ofType('eclipse');
+    const MoonPosEvents = ofType('moon_apogee', 'moon_perigee');
+    return {
+      moonEvents: toMoonEvents(ofType('moon_phase')),
+      earthEvents,
+      EarthEventsT: earthEvents.map(toEarthEvent),
+      EclipsEvents,
+      EclipseEventsT: EclipsEvents.map(toEclipseEvent),
+      MoonPosEvents,
+      MoonPosEventsT: MoonPosEvents.map(toMoonPosEvent),
+    };
+  }, [items]);
+
+  return { ...split, loading, error };
+};
+
+export default useTimelineService;
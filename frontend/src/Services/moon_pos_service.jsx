@@ -1,6 +1,21 @@
 import { useEffect, useState } from 'react';
 import axios from 'axios';
 
+export const toMoonPosEvent = (event) => {
+  const normalizedDate = new Date(event.date_time);
+  return {
+    ...event,
+    id: event.id,
+    type: 'Planets',
+    title: event.name,
+    date: normalizedDate,
+    color: 'purple',
+    icon: '🌑',
+    description: event.description || 'No description available.',
+    distance_km: event.raw_api_data?.distance_km,
+  };
+};
+
 const useMoonPosService = () => {
   const [events, setEvents] = useState([]);
   const [typedEvents, setTypedEvents] = useState([]);
@@ -12,20 +27,7 @@ const useMoonPosService = () => {
       try {
         const response = await axios.get(`http://localhost:8000/events/moon-apogee-perigee`);
 
-        const transformed = response.data.results.map(event => {
-          const normalizedDate = new Date(event.date_time);
-          return {
-            ...event,
-            id: event.id,
-            type: 'Planets',
-            title: event.name,
-            date: normalizedDate,
-            color: 'purple',
-            icon: '🌑',
-            description: event.description || 'No description available.',
-            distance_km: event.raw_api_data?.distance_km,
-          };
-        });
+        const transformed = response.data.results.map(toMoonPosEvent);
 
         setEvents(response.data.results);
         setTypedEvents(transformed);
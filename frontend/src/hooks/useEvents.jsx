@@ -1,14 +1,8 @@
 import { useMemo } from 'react';
-import useMoonService from '../Services/Moon_service';
-import useEarthService from '../Services/Earth_service';
-import useEclipseService from '../Services/Eclipse_service';
-import useMoonPosService from '../Services/moon_pos_service';
+import useTimelineService from '../Services/Timeline_service';
 
 const useEvents = () => {
-  const { moonEvents, loading: moonLoading, error: moonError } = useMoonService();
-  const { earthEvents, EarthEventsT, loading: earthLoading, error: earthError } = useEarthService();
-  const { EclipsEvents, EclipseEventsT, loading: EclipseLoading, error: EclipseError } = useEclipseService();
-  const { MoonPosEvents, MoonPosEventsT, loading: MoonLoading, error: MoonError } = useMoonPosService();
+  const { moonEvents, EarthEventsT, EclipseEventsT, MoonPosEventsT, loading, error } = useTimelineService();
 
 
   const events = useMemo(() => {
@@ -17,9 +11,6 @@ const useEvents = () => {
     return combinedEvents.sort((a, b) => new Date(a.date) - new Date(b.date));
   }, [moonEvents, EarthEventsT, EclipseEventsT, MoonPosEventsT]);
 
-  const loading = moonLoading || earthLoading || EclipseLoading || MoonLoading;
-  const error = moonError || earthError || EclipseError || MoonError;
-
   const filterEventsByType = (eventType) => {
     return events.filter(event => event.type === eventType);
   };
@@ -6,10 +6,7 @@ import Button from '../../components/common/Button/Button';
 import DatePicker from 'react-datepicker';
 import 'react-datepicker/dist/react-datepicker.css';
 import Sidebar from './Sidebar';
-import useMoonService from '../../Services/Moon_service';
-import useEarthService from '../../Services/Earth_service';
-import useEclipseService from '../../Services/Eclipse_service';
-import useMoonPosService from '../../Services/moon_pos_service';
+import useTimelineService from '../../Services/Timeline_service';
 import moment from 'moment-hijri';
 
 const hijriMonths = [
@@ -39,11 +36,8 @@ const AstroCalendar = () => {
   const todayRef = useRef(null);
   const [calendarView, setCalendarView] = useState('Month');
   const [isSidebarOpen, setIsSidebarOpen] = useState(false);
-  const {moonEvents, loading, error } = useMoonService();
+  const { moonEvents, EarthEventsT, EclipseEventsT, MoonPosEventsT, loading, error } = useTimelineService(currentDate.getFullYear());
   const [showHijri, setShowHijri] = useState(false);
-  const {earthEvents, EarthEventsT, loading2, error2} = useEarthService();
-  const { EclipsEvents, EclipseEventsT, loading: EclipseLoading, error: EclipseError } = useEclipseService();
-  const { MoonPosEvents, MoonPosEventsT, loading: MoonLoading, error: MoonError } = useMoonPosService();
 
   const months = useMemo(() => [...Array(12).keys()].map(i => 
     new Date(0, i).toLocaleString('default', { month: 'long' })